@@ -0,0 +1,126 @@
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Bounded executors for the blocking stages of quiz generation
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS", "8"))
+DB_WORKERS = int(os.getenv("DB_WORKERS", "4"))
+
+# Shared outbound HTTP client
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "10"))  # concurrency per Wikipedia host
+# Per-attempt timeouts (seconds): TCP/TLS connect, and read/write/pool
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+# Retries of failed GETs (transport errors, 429, 5xx), jittered exponential backoff (seconds)
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+HTTP_RETRY_MAX_BACKOFF = float(os.getenv("HTTP_RETRY_MAX_BACKOFF", "5"))
+HTTP2 = os.getenv("HTTP2", "true").lower() == "true"
+
+# On-disk raw HTML cache (revalidated with ETag / Last-Modified)
+HTML_CACHE_ENABLED = os.getenv("HTML_CACHE_ENABLED", "true").lower() == "true"
+HTML_CACHE_DIR = os.getenv("HTML_CACHE_DIR", ".cache/html")
+HTML_CACHE_MAX_BYTES = int(os.getenv("HTML_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Parsed article cache: in-process LRU plus optional SQLite tier shared by workers
+ARTICLE_CACHE_SIZE = int(os.getenv("ARTICLE_CACHE_SIZE", "256"))
+ARTICLE_CACHE_SQLITE = os.getenv("ARTICLE_CACHE_SQLITE", "")
+
+# HTML parser backend for article extraction: html.parser, lxml or selectolax
+HTML_PARSER = os.getenv("HTML_PARSER", "lxml")
+
+# Single-flight generation: per-article lease shared by all workers through the database
+GENERATION_LEASE_TTL = float(os.getenv("GENERATION_LEASE_TTL", "120"))
+GENERATION_LEASE_GRACE = float(os.getenv("GENERATION_LEASE_GRACE", "15"))
+GENERATION_LEASE_POLL = float(os.getenv("GENERATION_LEASE_POLL", "0.25"))
+
+# Reuse of existing quizzes: serve a quiz younger than QUIZ_REUSE_TTL seconds
+# directly, otherwise reuse one generated from the same article revision
+QUIZ_REUSE_TTL = float(os.getenv("QUIZ_REUSE_TTL", "86400"))
+QUIZ_REUSE_SAME_REVISION = os.getenv("QUIZ_REUSE_SAME_REVISION", "true").lower() == "true"
+
+# In-process LRU in front of the article_aliases redirect table
+ALIAS_CACHE_SIZE = int(os.getenv("ALIAS_CACHE_SIZE", "10000"))
+# Seconds a "no known redirect" answer is trusted before the table is asked
+# again, so aliases recorded by other workers are picked up
+ALIAS_NEGATIVE_TTL = float(os.getenv("ALIAS_NEGATIVE_TTL", "30"))
+
+# Article fetch mode: "html" (rendered page) or "api" (MediaWiki plain-text extracts)
+SCRAPER_MODE = os.getenv("SCRAPER_MODE", "html")
+WIKIPEDIA_API_URL = os.getenv("WIKIPEDIA_API_URL", "https://{lang}.wikipedia.org/w/api.php")
+
+# Gemini calls: max in flight per process (per model) and per-call timeout (seconds)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-pro")
+LLM_WARMUP = os.getenv("LLM_WARMUP", "true").lower() == "true"
+
+# Hedged Gemini calls (off by default): a call still running at the
+# LLM_HEDGE_PERCENTILE of the last LLM_HEDGE_WINDOW latencies gets a duplicate,
+# first answer wins. Hedges are capped at LLM_HEDGE_BUDGET of all calls and
+# start once LLM_HEDGE_MIN_SAMPLES latencies have been observed
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.1"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+
+# Persistent cache of validated LLM quiz output
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+
+# Article text sent to the LLM: the highest-scoring sentences within an
+# estimated token budget, for the whole article and for each section
+PROMPT_CONTENT_TOKENS = int(os.getenv("PROMPT_CONTENT_TOKENS", "800"))
+SECTION_CONTENT_TOKENS = int(os.getenv("SECTION_CONTENT_TOKENS", "400"))
+
+# Quiz generation mode: "single" (one call over the selected content),
+# "sections" (one concurrent call per selected section, merged, deduplicated
+# and balanced) or "fast" (offline extractive questions, no LLM call)
+QUIZ_MODE = os.getenv("QUIZ_MODE", "single")
+SECTION_FANOUT = int(os.getenv("SECTION_FANOUT", "4"))
+SECTION_QUESTIONS = int(os.getenv("SECTION_QUESTIONS", "3"))
+SECTION_QUIZ_SIZE = int(os.getenv("SECTION_QUIZ_SIZE", "10"))
+
+# Questions per quiz variant (/api/quiz/{id}?variant=N); 0 keeps all of them
+QUIZ_VARIANT_QUESTIONS = int(os.getenv("QUIZ_VARIANT_QUESTIONS", "0"))
+
+# Background job queue (POST /api/jobs): workers per process, idle poll
+# interval, lease length (renewed while a job runs) and retry policy
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+JOB_LEASE_TTL = float(os.getenv("JOB_LEASE_TTL", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "5"))
+
+# Batch generation (POST /api/generate_quiz/batch): articles in flight per
+# batch, fetches per Wikipedia host per batch, and batch size limit
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_PER_HOST = int(os.getenv("BATCH_PER_HOST", "4"))
+BATCH_MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "500"))
+
+# Outbound rate limits: token bucket (requests per second, burst) per
+# upstream, on top of the concurrency caps above. Wikipedia limits apply per
+# host, Gemini limits per model; callers wait at most UPSTREAM_MAX_WAIT
+# seconds for a slot. UPSTREAM_LIMITS is a JSON object of per-upstream
+# overrides, e.g. {"de.wikipedia.org": {"qps": 2}, "gemini:gemini-pro": {"qps": 0.5}}
+WIKIPEDIA_QPS = float(os.getenv("WIKIPEDIA_QPS", "10"))
+WIKIPEDIA_BURST = int(os.getenv("WIKIPEDIA_BURST", "20"))
+GEMINI_QPS = float(os.getenv("GEMINI_QPS", "1"))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", "5"))
+UPSTREAM_MAX_WAIT = float(os.getenv("UPSTREAM_MAX_WAIT", "30"))
+UPSTREAM_LIMITS = json.loads(os.getenv("UPSTREAM_LIMITS", "{}"))
+# Pause after a 429 that carries no Retry-After (seconds)
+THROTTLE_BACKOFF = float(os.getenv("THROTTLE_BACKOFF", "10"))
+
+# Circuit breaker per upstream (Wikipedia host, Gemini model): open after this
+# many consecutive failures, fail fast for BREAKER_RESET_TIMEOUT seconds, then
+# let one probe call through
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
@@ -1,467 +1,597 @@
-from fastapi import FastAPI, Depends, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-import logging
-from contextlib import asynccontextmanager
-from pydantic import BaseModel
-from typing import List
-import requests
-from bs4 import BeautifulSoup
-import json
-import re
-import os
-from dotenv import load_dotenv
-import google.generativeai as genai
-
-from database import engine, get_db
-from models import Base
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-load_dotenv()
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Startup: Create tables
-    logger.info("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
-    yield
-    # Shutdown
-    logger.info("Shutting down...")
-
-app = FastAPI(
-    title="DeepKlarity - AI Wiki Quiz Generator",
-    description="Generate quizzes from Wikipedia articles using AI",
-    version="1.0.0",
-    lifespan=lifespan
-)
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-class QuizGenerateRequest(BaseModel):
-    url: str
-
-class QuizResponse(BaseModel):
-    id: int
-    url: str
-    title: str
-    summary: str
-    key_entities: dict
-    sections: list
-    created_at: str
-
-class QuizDetailResponse(QuizResponse):
-    quiz_data: dict
-
-class WikipediaScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'DeepKlarity-AI-Quiz-Generator/1.0'
-        })
-
-    def scrape_article(self, url: str):
-        try:
-            if not self._is_valid_wikipedia_url(url):
-                raise ValueError("Invalid Wikipedia URL")
-
-            response = self.session.get(url)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            title = self._extract_title(soup)
-            summary = self._extract_summary(soup)
-            sections = self._extract_sections(soup)
-            full_content = self._extract_full_content(soup)
-
-            return {
-                "title": title,
-                "summary": summary,
-                "sections": sections,
-                "key_entities": {"people": [], "organizations": [], "locations": []},
-                "full_content": full_content
-            }
-
-        except Exception as e:
-            logger.error(f"Error scraping Wikipedia article: {e}")
-            raise
-
-    def _is_valid_wikipedia_url(self, url: str):
-        wikipedia_pattern = r'^https://[a-z]{2}\.wikipedia\.org/wiki/[^/]+$'
-        return re.match(wikipedia_pattern, url) is not None
-
-    def _extract_title(self, soup):
-        title_element = soup.find('h1', {'class': 'firstHeading'})
-        return title_element.get_text().strip() if title_element else "Unknown Title"
-
-    def _extract_summary(self, soup):
-        content = soup.find('div', {'id': 'mw-content-text'})
-        if not content:
-            return ""
-
-        paragraphs = content.find_all('p', limit=3)
-        summary_text = ' '.join([p.get_text().strip() for p in paragraphs if p.get_text().strip()])
-        summary_text = re.sub(r'\[\d+\]', '', summary_text)
-        return summary_text[:1000]
-
-    def _extract_full_content(self, soup):
-        content = soup.find('div', {'id': 'mw-content-text'})
-        if not content:
-            return ""
-
-        for element in content.find_all(['table', 'div.navbox', 'div.reflist']):
-            element.decompose()
-
-        paragraphs = content.find_all('p')
-        full_text = ' '.join([p.get_text().strip() for p in paragraphs if p.get_text().strip()])
-        full_text = re.sub(r'\[\d+\]', '', full_text)
-        return full_text[:8000]
-
-    def _extract_sections(self, soup):
-        sections = []
-        heading_elements = soup.find_all(['h2', 'h3'])
-        
-        for heading in heading_elements:
-            skip_sections = ['contents', 'references', 'external links', 'see also', 'notes']
-            heading_text = heading.get_text().strip().lower()
-            
-            if not any(skip in heading_text for skip in skip_sections):
-                sections.append(heading.get_text().strip())
-        
-        return sections[:10]
-
-class AdvancedQuizGenerator:
-    def __init__(self):
-        self.api_key = os.getenv("GOOGLE_API_KEY")
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
-        else:
-            self.model = None
-            logger.warning("No Google API key found - will use enhanced fallback quizzes")
-
-    def generate_quiz(self, article_content: str, article_title: str = ""):
-        """Generate 5-7 unique questions based on actual article content"""
-        try:
-            if not self.api_key or not self.model:
-                logger.info("Using enhanced fallback quiz generator")
-                return self._generate_smart_fallback_quiz(article_title)
-
-            if not article_content or len(article_content.strip()) < 100:
-                raise ValueError("Article content too short for quiz generation")
-
-            logger.info("Generating AI-powered quiz with Google Gemini...")
-            
-            # Use first 5000 characters to avoid token limits
-            limited_content = article_content[:5000]
-            
-            prompt = self._create_smart_prompt(limited_content, article_title)
-            
-            # Generate quiz
-            response = self.model.generate_content(prompt)
-            quiz_text = response.text
-            
-            logger.info(f"AI Response received: {len(quiz_text)} characters")
-            
-            # Clean and parse
-            cleaned_text = self._clean_ai_response(quiz_text)
-            quiz_data = self._parse_quiz_data(cleaned_text, article_title)
-            
-            logger.info(f"Successfully generated {len(quiz_data['questions'])} questions")
-            return quiz_data
-            
-        except Exception as e:
-            logger.error(f"AI quiz generation failed: {e}")
-            return self._generate_smart_fallback_quiz(article_title)
-
-    def _create_smart_prompt(self, content: str, title: str) -> str:
-        """Create a detailed prompt for better question generation"""
-        return f"""You are an expert quiz creator and educator. Create 5-7 high-quality multiple-choice questions based EXCLUSIVELY on this Wikipedia article.
-
-ARTICLE TITLE: {title}
-ARTICLE CONTENT:
-{content[:4000]}
-
-CRITICAL INSTRUCTIONS:
-1. Generate 5-7 UNIQUE questions that test REAL understanding of the article
-2. Each question MUST be directly based on specific facts from the article
-3. Questions should cover different aspects: definitions, facts, relationships, applications
-4. Make options plausible but only ONE correct based on the article
-5. Include varied difficulty levels
-
-REQUIRED FORMAT (JSON only):
-{{
-  "questions": [
-    {{
-      "question": "Specific question based on article facts?",
-      "options": {{
-        "A": "Correct answer from article",
-        "B": "Plausible but incorrect alternative",
-        "C": "Another incorrect alternative", 
-        "D": "Final incorrect alternative"
-      }},
-      "correct_answer": "A",
-      "explanation": "Specific reference to article content explaining why this is correct",
-      "difficulty": "easy/medium/hard"
-    }}
-  ],
-  "related_topics": ["SpecificTopic1", "SpecificTopic2", "SpecificTopic3"]
-}}
-
-IMPORTANT: Questions MUST be specific to this article, not generic. Focus on unique facts about {title}.
-"""
-
-    def _clean_ai_response(self, text: str) -> str:
-        """Extract JSON from AI response"""
-        # Remove code blocks
-        text = re.sub(r'```json\s*', '', text)
-        text = re.sub(r'```\s*', '', text)
-        text = text.strip()
-        
-        # Find JSON object
-        json_match = re.search(r'\{[^{}]*\{[^{}]*\}[^{}]*\}', text, re.DOTALL) or re.search(r'\{.*\}', text, re.DOTALL)
-        if json_match:
-            return json_match.group()
-        
-        return text
-
-    def _parse_quiz_data(self, text: str, article_title: str) -> dict:
-        """Parse and validate quiz data"""
-        try:
-            quiz_data = json.loads(text)
-            
-            # Validate structure
-            if "questions" not in quiz_data or not quiz_data["questions"]:
-                raise ValueError("No questions in response")
-                
-            # Ensure minimum 3 questions
-            if len(quiz_data["questions"]) < 3:
-                logger.warning(f"Only {len(quiz_data['questions'])} questions generated, adding fallback questions")
-                fallback = self._generate_smart_fallback_quiz(article_title)
-                quiz_data["questions"].extend(fallback["questions"][:5 - len(quiz_data["questions"])])
-            
-            return self._validate_quiz_structure(quiz_data, article_title)
-            
-        except Exception as e:
-            logger.error(f"Failed to parse AI response: {e}")
-            return self._generate_smart_fallback_quiz(article_title)
-
-    def _validate_quiz_structure(self, quiz_data: dict, article_title: str) -> dict:
-        """Ensure quiz data has proper structure"""
-        # Ensure questions exist
-        if "questions" not in quiz_data:
-            quiz_data["questions"] = []
-        
-        # Validate each question
-        for i, question in enumerate(quiz_data["questions"]):
-            # Ensure required fields
-            if "question" not in question or not question["question"].strip():
-                question["question"] = f"What is a key fact about {article_title}?"
-            
-            if "options" not in question or len(question["options"]) != 4:
-                question["options"] = {
-                    "A": f"A key fact about {article_title}",
-                    "B": "An incorrect alternative",
-                    "C": "Another incorrect option", 
-                    "D": "Final incorrect option"
-                }
-            
-            if "correct_answer" not in question or question["correct_answer"] not in ["A", "B", "C", "D"]:
-                question["correct_answer"] = "A"
-            
-            if "explanation" not in question or not question["explanation"].strip():
-                question["explanation"] = f"This is correct based on the Wikipedia article about {article_title}."
-            
-            if "difficulty" not in question or question["difficulty"] not in ["easy", "medium", "hard"]:
-                question["difficulty"] = "medium" if i % 2 == 0 else "easy"
-        
-        # Ensure related topics
-        if "related_topics" not in quiz_data or not quiz_data["related_topics"]:
-            quiz_data["related_topics"] = [article_title, "Knowledge", "Research"]
-        
-        return quiz_data
-
-    def _generate_smart_fallback_quiz(self, article_title: str) -> dict:
-        """Generate context-aware fallback questions"""
-        base_questions = [
-            {
-                "question": f"What is the primary focus or subject of the Wikipedia article about {article_title}?",
-                "options": {
-                    "A": f"The main topic: {article_title} and its significance",
-                    "B": "A completely unrelated scientific concept",
-                    "C": "Historical events from a different time period", 
-                    "D": "Fictional stories and characters"
-                },
-                "correct_answer": "A",
-                "explanation": f"The article specifically focuses on {article_title} and provides detailed information about it.",
-                "difficulty": "easy"
-            },
-            {
-                "question": f"What type of information would you expect to find in this Wikipedia article about {article_title}?",
-                "options": {
-                    "A": "Comprehensive facts, history, and context about the subject",
-                    "B": "Personal opinions and anecdotes",
-                    "C": "Advertising and promotional content",
-                    "D": "Fictional narratives and stories"
-                },
-                "correct_answer": "A",
-                "explanation": "Wikipedia articles provide factual, well-researched information with proper citations.",
-                "difficulty": "easy"
-            },
-            {
-                "question": f"How does Wikipedia ensure the accuracy of information about topics like {article_title}?",
-                "options": {
-                    "A": "Through community editing, citations, and reliable sources",
-                    "B": "Government verification and approval",
-                    "C": "Paid expert reviews only",
-                    "D": "Automatic computer generation"
-                },
-                "correct_answer": "A",
-                "explanation": "Wikipedia uses collaborative editing and requires reliable sources to maintain accuracy.",
-                "difficulty": "medium"
-            },
-            {
-                "question": f"Why might {article_title} be considered an important topic for a Wikipedia article?",
-                "options": {
-                    "A": "It represents significant knowledge worth documenting and sharing",
-                    "B": "It is trending on social media",
-                    "C": "It was randomly selected",
-                    "D": "It supports commercial interests"
-                },
-                "correct_answer": "A",
-                "explanation": "Wikipedia documents notable topics that have verifiable significance and reliable sources.",
-                "difficulty": "medium"
-            },
-            {
-                "question": f"What makes Wikipedia's coverage of {article_title} valuable for learners and researchers?",
-                "options": {
-                    "A": "It provides a comprehensive starting point with references for deeper exploration",
-                    "B": "It contains all possible information on the topic",
-                    "C": "It replaces the need for other information sources",
-                    "D": "It offers personalized learning paths"
-                },
-                "correct_answer": "A",
-                "explanation": "Wikipedia offers overviews with citations that help guide further research and learning.",
-                "difficulty": "hard"
-            }
-        ]
-        
-        return {
-            "questions": base_questions,
-            "related_topics": [article_title, "Online Encyclopedia", "Knowledge Base"]
-        }
-
-@app.get("/")
-async def root():
-    return {"message": "DeepKlarity AI Wiki Quiz Generator API"}
-
-@app.get("/health")
-async def health_check():
-    return {"status": "healthy"}
-
-@app.post("/api/generate_quiz", response_model=QuizDetailResponse)
-async def generate_quiz(request: QuizGenerateRequest, db: Session = Depends(get_db)):
-    """Generate quiz from Wikipedia URL using AI"""
-    try:
-        logger.info(f"Generating quiz for: {request.url}")
-        
-        # Initialize services
-        scraper = WikipediaScraper()
-        quiz_gen = AdvancedQuizGenerator()
-
-        # Scrape Wikipedia article
-        article_data = scraper.scrape_article(request.url)
-        logger.info(f"Scraped article: {article_data['title']}")
-
-        # Generate quiz using AI
-        quiz_data = quiz_gen.generate_quiz(article_data["full_content"], article_data["title"])
-        logger.info(f"Generated {len(quiz_data['questions'])} questions")
-
-        # Store in database
-        from models import Quiz
-        db_quiz = Quiz(
-            url=request.url,
-            title=article_data["title"],
-            summary=article_data["summary"],
-            key_entities=article_data["key_entities"],
-            sections=article_data["sections"],
-            quiz_data=quiz_data
-        )
-
-        db.add(db_quiz)
-        db.commit()
-        db.refresh(db_quiz)
-
-        return QuizDetailResponse(
-            id=db_quiz.id,
-            url=db_quiz.url,
-            title=db_quiz.title,
-            summary=db_quiz.summary,
-            key_entities=db_quiz.key_entities,
-            sections=db_quiz.sections,
-            quiz_data=db_quiz.quiz_data,
-            created_at=db_quiz.created_at.isoformat()  # Fixed: convert to string
-        )
-
-    except Exception as e:
-        logger.error(f"Error generating quiz: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to generate quiz: {str(e)}")
-
-@app.get("/api/history", response_model=List[QuizResponse])
-async def get_quiz_history(db: Session = Depends(get_db)):
-    """Get quiz generation history"""
-    from models import Quiz
-    try:
-        quizzes = db.query(Quiz).order_by(Quiz.created_at.desc()).limit(20).all()
-        
-        # Convert to proper response format
-        response_data = []
-        for quiz in quizzes:
-            response_data.append({
-                "id": quiz.id,
-                "url": quiz.url,
-                "title": quiz.title,
-                "summary": quiz.summary,
-                "key_entities": quiz.key_entities or {},
-                "sections": quiz.sections or [],
-                "created_at": quiz.created_at.isoformat()  # Fixed: convert to string
-            })
-        
-        return response_data
-        
-    except Exception as e:
-        logger.error(f"Error fetching history: {e}")
-        raise HTTPException(status_code=500, detail="Failed to fetch quiz history")
-
-@app.get("/api/quiz/{quiz_id}", response_model=QuizDetailResponse)
-async def get_quiz_details(quiz_id: int, db: Session = Depends(get_db)):
-    """Get full details for a specific quiz"""
-    from models import Quiz
-    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
-    if not quiz:
-        raise HTTPException(status_code=404, detail="Quiz not found")
-    
-    return QuizDetailResponse(
-        id=quiz.id,
-        url=quiz.url,
-        title=quiz.title,
-        summary=quiz.summary,
-        key_entities=quiz.key_entities or {},
-        sections=quiz.sections or [],
-        quiz_data=quiz.quiz_data or {},
-        created_at=quiz.created_at.isoformat()  
-    )
-
-if __name__ == "__main__":
-    import uvicorn
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+import logging
+from contextlib import asynccontextmanager, nullcontext
+from pydantic import BaseModel
+from typing import Dict, List, Optional, Union
+from urllib.parse import urlsplit
+import asyncio
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+import json
+
+import config
+from database import engine, get_db, SessionLocal, add_missing_columns
+from models import Base
+from utils.executors import run_blocking, shutdown_executors
+from utils.article_cache import ArticleCache
+from utils.canonical import AliasIndex
+from utils.html_cache import HTMLCache
+from utils.circuit_breaker import create_circuit_breakers
+from utils.http_client import create_http_client
+from utils.jobs import JobQueue
+from utils.llm_cache import LLMResponseCache
+from utils.parsers import get_parser_backend
+from utils.quiz_generator import SOURCE_LLM, AdvancedQuizGenerator
+from utils.rate_limiter import create_upstream_limiters
+from utils.scraper import WikipediaScraper
+from utils.singleflight import RequestCoalescer
+from utils.variants import make_variant
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: Create tables
+    logger.info("Creating database tables...")
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns(Base.metadata)
+    # Rate and concurrency limits per upstream, shared by the scraper and the LLM calls
+    app.state.limiters = create_upstream_limiters()
+    # Per-upstream circuit breakers: fail fast to cached / offline results while an upstream is down
+    app.state.breakers = create_circuit_breakers()
+    # One pooled HTTP client for every Wikipedia fetch
+    app.state.http_client = create_http_client(app.state.limiters, app.state.breakers)
+    app.state.html_cache = HTMLCache(config.HTML_CACHE_DIR, config.HTML_CACHE_MAX_BYTES) if config.HTML_CACHE_ENABLED else None
+    app.state.article_cache = ArticleCache(config.ARTICLE_CACHE_SIZE, config.ARTICLE_CACHE_SQLITE or None)
+    parser_backend = get_parser_backend(config.HTML_PARSER)
+    logger.info(f"Using HTML parser backend: {parser_backend.name}")
+    app.state.scraper = WikipediaScraper(
+        app.state.http_client, app.state.html_cache, app.state.article_cache, parser_backend,
+        mode=config.SCRAPER_MODE, api_url=config.WIKIPEDIA_API_URL
+    )
+    logger.info(f"Scraper mode: {config.SCRAPER_MODE}")
+    # One LLM client per process, connected before traffic arrives
+    app.state.llm_cache = LLMResponseCache(config.LLM_CACHE_TTL, config.LLM_CACHE_MAX_ENTRIES) if config.LLM_CACHE_ENABLED else None
+    app.state.quiz_generator = AdvancedQuizGenerator(app.state.llm_cache, app.state.limiters, app.state.breakers)
+    if config.LLM_WARMUP:
+        await app.state.quiz_generator.warm_up()
+    app.state.aliases = AliasIndex(config.ALIAS_CACHE_SIZE, config.ALIAS_NEGATIVE_TTL)
+    app.state.coalescer = RequestCoalescer(
+        load_result=lambda quiz_id: run_blocking("db", _load_quiz, quiz_id),
+        lease_ttl=config.GENERATION_LEASE_TTL,
+        completed_grace=config.GENERATION_LEASE_GRACE,
+        poll_interval=config.GENERATION_LEASE_POLL,
+        reusable=lambda quiz: quiz.quiz_data.get("source") == SOURCE_LLM
+    )
+    # Background generation workers for POST /api/jobs
+    app.state.job_queue = JobQueue(
+        run_job=lambda job: _run_job(app, job),
+        workers=config.JOB_WORKERS,
+        poll_interval=config.JOB_POLL_INTERVAL,
+        lease_ttl=config.JOB_LEASE_TTL,
+        max_attempts=config.JOB_MAX_ATTEMPTS,
+        retry_backoff=config.JOB_RETRY_BACKOFF
+    )
+    app.state.job_queue.start()
+    yield
+    # Shutdown
+    logger.info("Shutting down...")
+    await app.state.job_queue.stop()
+    await app.state.http_client.aclose()
+    shutdown_executors()
+
+app = FastAPI(
+    title="DeepKlarity - AI Wiki Quiz Generator",
+    description="Generate quizzes from Wikipedia articles using AI",
+    version="1.0.0",
+    lifespan=lifespan
+)
+
+# CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+class QuizGenerateRequest(BaseModel):
+    url: str
+    force_regenerate: bool = False
+    bypass_llm_cache: bool = False
+    # "single", "sections" or "fast"; defaults to config.QUIZ_MODE
+    mode: Optional[str] = None
+
+class QuizBatchRequest(BaseModel):
+    urls: List[str]
+    force_regenerate: bool = False
+    bypass_llm_cache: bool = False
+    mode: Optional[str] = None
+    # Articles processed at once; defaults to config.BATCH_CONCURRENCY
+    concurrency: Optional[int] = None
+
+class QuizJobRequest(QuizGenerateRequest):
+    # Higher runs first
+    priority: int = 0
+
+class QuizResponse(BaseModel):
+    id: int
+    url: str
+    title: str
+    summary: str
+    key_entities: dict
+    sections: list
+    created_at: str
+
+class QuizDetailResponse(QuizResponse):
+    quiz_data: dict
+
+class QuizJobResponse(BaseModel):
+    id: int
+    url: str
+    mode: str
+    status: str
+    priority: int
+    attempts: int
+    error: Optional[str] = None
+    quiz_id: Optional[int] = None
+    quiz: Optional[QuizDetailResponse] = None
+
+QUIZ_MODES = ("single", "sections", "fast")
+
+def _quiz_mode(request: Union[QuizGenerateRequest, QuizBatchRequest]) -> str:
+    mode = request.mode or config.QUIZ_MODE
+    if mode not in QUIZ_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown quiz mode: {mode}")
+    return mode
+
+async def get_scraper(request: Request) -> WikipediaScraper:
+    return request.app.state.scraper
+
+async def get_quiz_generator(request: Request) -> AdvancedQuizGenerator:
+    return request.app.state.quiz_generator
+
+@app.get("/")
+async def root():
+    return {"message": "DeepKlarity AI Wiki Quiz Generator API"}
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy"}
+
+def _quiz_to_response(quiz) -> QuizDetailResponse:
+    return QuizDetailResponse(
+        id=quiz.id,
+        url=quiz.url,
+        title=quiz.title,
+        summary=quiz.summary,
+        key_entities=quiz.key_entities or {},
+        sections=quiz.sections or [],
+        quiz_data=quiz.quiz_data or {},
+        created_at=quiz.created_at.isoformat()  # Fixed: convert to string
+    )
+
+def _new_quiz(url: str, canonical_url: str, mode: str, article_data: dict, quiz_data: dict):
+    from models import Quiz
+    return Quiz(
+        url=url,
+        canonical_url=canonical_url,
+        revision_id=article_data.get("revision_id"),
+        mode=mode,
+        title=article_data["title"],
+        summary=article_data["summary"],
+        key_entities=article_data["key_entities"],
+        sections=article_data["sections"],
+        quiz_data=quiz_data
+    )
+
+def _save_quiz(url: str, canonical_url: str, mode: str, article_data: dict, quiz_data: dict) -> QuizDetailResponse:
+    """Persist a generated quiz (runs on the db executor)"""
+    db = SessionLocal()
+    try:
+        db_quiz = _new_quiz(url, canonical_url, mode, article_data, quiz_data)
+
+        db.add(db_quiz)
+        db.commit()
+        db.refresh(db_quiz)
+
+        return _quiz_to_response(db_quiz)
+    finally:
+        db.close()
+
+def _newest_quiz_id() -> int:
+    from models import Quiz
+    db = SessionLocal()
+    try:
+        return db.query(func.max(Quiz.id)).scalar() or 0
+    finally:
+        db.close()
+
+def _load_quiz(quiz_id: int) -> QuizDetailResponse:
+    from models import Quiz
+    db = SessionLocal()
+    try:
+        return _quiz_to_response(db.query(Quiz).filter(Quiz.id == quiz_id).one())
+    finally:
+        db.close()
+
+def _find_fresh_quiz(canonical_url: str, mode: str, max_age: float) -> Optional[QuizDetailResponse]:
+    """Most recent reusable quiz for the article in this mode if it is younger than max_age seconds"""
+    from models import Quiz
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age)
+    db = SessionLocal()
+    try:
+        quiz = db.query(Quiz).filter(
+            Quiz.canonical_url == canonical_url,
+            Quiz.mode == mode,
+            Quiz.created_at >= cutoff,
+            # Offline fallbacks (Gemini down or throttled) are not served again
+            Quiz.quiz_data["source"].as_string() == SOURCE_LLM
+        ).order_by(Quiz.created_at.desc()).first()
+        return _quiz_to_response(quiz) if quiz else None
+    finally:
+        db.close()
+
+def _find_quiz_for_revision(canonical_url: str, mode: str, revision_id: int) -> Optional[QuizDetailResponse]:
+    """Most recent reusable quiz generated in this mode from this exact article revision"""
+    from models import Quiz
+    db = SessionLocal()
+    try:
+        quiz = db.query(Quiz).filter(
+            Quiz.canonical_url == canonical_url,
+            Quiz.mode == mode,
+            Quiz.revision_id == revision_id,
+            Quiz.quiz_data["source"].as_string() == SOURCE_LLM
+        ).order_by(Quiz.created_at.desc()).first()
+        return _quiz_to_response(quiz) if quiz else None
+    finally:
+        db.close()
+
+async def _generate_for_mode(quiz_gen: AdvancedQuizGenerator, article_data: dict, mode: str,
+                            use_cache: bool = True) -> dict:
+    """Quiz data for the non-streaming modes"""
+    if mode == "fast":
+        # Extractive questions only, no LLM call; CPU-bound, so off the event loop
+        return await run_blocking(
+            "scrape", quiz_gen.generate_offline_quiz, article_data["full_content"], article_data["title"]
+        )
+    if mode == "sections":
+        return await quiz_gen.generate_sectioned_quiz(article_data, use_cache=use_cache)
+    return await quiz_gen.generate_quiz(article_data["full_content"], article_data["title"], use_cache=use_cache)
+
+async def _build_quiz(url: str, canonical_url: str, scraper: WikipediaScraper,
+                      quiz_gen: AdvancedQuizGenerator, aliases: AliasIndex,
+                      force_regenerate: bool = False, bypass_llm_cache: bool = False,
+                      mode: str = "single", fetch_slot: Optional[asyncio.Semaphore] = None) -> QuizDetailResponse:
+    """Scrape, generate and store a quiz for one article"""
+    # Scrape Wikipedia article (pooled async fetch, parse offloaded)
+    async with fetch_slot or nullcontext():
+        article_data = await scraper.scrape_article(canonical_url)
+    logger.info(f"Scraped article: {article_data['title']}")
+
+    # Remember wiki redirects so the next request for this spelling keys on the target
+    resolved_url = article_data.get("canonical_url", canonical_url)
+    if resolved_url != canonical_url:
+        await aliases.record(canonical_url, resolved_url)
+        canonical_url = resolved_url
+
+    # The article has not been edited since an earlier quiz: reuse it
+    revision_id = article_data.get("revision_id")
+    if config.QUIZ_REUSE_SAME_REVISION and revision_id and not force_regenerate:
+        existing = await run_blocking("db", _find_quiz_for_revision, canonical_url, mode, revision_id)
+        if existing:
+            logger.info(f"Reusing quiz {existing.id} for unchanged revision {revision_id}")
+            return existing
+
+    # Generate quiz using AI (async Gemini calls, bounded concurrency) or the offline tier
+    quiz_data = await _generate_for_mode(quiz_gen, article_data, mode, use_cache=not bypass_llm_cache)
+    logger.info(f"Generated {len(quiz_data['questions'])} questions")
+
+    # Store in database
+    return await run_blocking("db", _save_quiz, url, canonical_url, mode, article_data, quiz_data)
+
+async def _generate_or_reuse(state, url: str, scraper: WikipediaScraper, quiz_gen: AdvancedQuizGenerator,
+                             force_regenerate: bool = False, bypass_llm_cache: bool = False,
+                             mode: str = "single",
+                             fetch_slot: Optional[asyncio.Semaphore] = None) -> QuizDetailResponse:
+    """Serve a fresh stored quiz for the article, or generate one once per article.
+    `fetch_slot` bounds the Wikipedia fetch when the caller limits per-host load."""
+    canonical_url = await state.aliases.resolve(url)
+
+    # A recent quiz for the same article is served straight from the table
+    if not force_regenerate and config.QUIZ_REUSE_TTL > 0:
+        fresh = await run_blocking("db", _find_fresh_quiz, canonical_url, mode, config.QUIZ_REUSE_TTL)
+        if fresh:
+            logger.info(f"Reusing fresh quiz {fresh.id} for {canonical_url}")
+            return fresh
+
+    # Concurrent requests for the same article (and mode) share one scrape + LLM call
+    return await state.coalescer.run(
+        canonical_url if mode == "single" else f"{canonical_url}#{mode}",
+        lambda: _build_quiz(
+            url, canonical_url, scraper, quiz_gen, state.aliases, force_regenerate, bypass_llm_cache, mode,
+            fetch_slot
+        ),
+        reuse_completed=not force_regenerate
+    )
+
+async def _run_job(app: FastAPI, job: dict) -> int:
+    """Job queue callback: generate the job's quiz and return its id"""
+    quiz = await _generate_or_reuse(
+        app.state, job["url"], app.state.scraper, app.state.quiz_generator,
+        job["force_regenerate"], job["bypass_llm_cache"], job["mode"]
+    )
+    return quiz.id
+
+@app.get("/api/metrics")
+async def metrics(request: Request):
+    """Cache counters for monitoring"""
+    html_cache = request.app.state.html_cache
+    return {
+        "html_cache": html_cache.stats() if html_cache else None,
+        "article_cache": request.app.state.article_cache.stats(),
+        "coalescer": request.app.state.coalescer.stats(),
+        "aliases": request.app.state.aliases.stats(),
+        "llm_cache": request.app.state.llm_cache.stats() if request.app.state.llm_cache else None,
+        "jobs": request.app.state.job_queue.stats(),
+        "upstreams": request.app.state.limiters.stats(),
+        "breakers": request.app.state.breakers.stats(),
+        "http": request.app.state.http_client.stats(),
+        "llm_hedging": request.app.state.quiz_generator.hedger.stats()
+    }
+
+@app.post("/api/generate_quiz", response_model=QuizDetailResponse)
+async def generate_quiz(request: QuizGenerateRequest, http_request: Request,
+                        scraper: WikipediaScraper = Depends(get_scraper),
+                        quiz_gen: AdvancedQuizGenerator = Depends(get_quiz_generator)):
+    """Generate quiz from Wikipedia URL using AI"""
+    mode = _quiz_mode(request)
+    try:
+        logger.info(f"Generating quiz for: {request.url}")
+        return await _generate_or_reuse(
+            http_request.app.state, request.url, scraper, quiz_gen,
+            request.force_regenerate, request.bypass_llm_cache, mode
+        )
+
+    except Exception as e:
+        logger.error(f"Error generating quiz: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate quiz: {str(e)}")
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/generate_quiz/stream")
+async def generate_quiz_stream(request: QuizGenerateRequest, http_request: Request,
+                               scraper: WikipediaScraper = Depends(get_scraper),
+                               quiz_gen: AdvancedQuizGenerator = Depends(get_quiz_generator)):
+    """Generate a quiz, streaming progress and each question as Server-Sent Events.
+
+    Events: scraped, prompt_sent, question (one per question), done (the
+    stored quiz) or error.
+    """
+    aliases = http_request.app.state.aliases
+    mode = _quiz_mode(request)
+
+    async def events():
+        try:
+            logger.info(f"Streaming quiz for: {request.url}")
+            canonical_url = await aliases.resolve(request.url)
+
+            if not request.force_regenerate and config.QUIZ_REUSE_TTL > 0:
+                fresh = await run_blocking("db", _find_fresh_quiz, canonical_url, mode, config.QUIZ_REUSE_TTL)
+                if fresh:
+                    for question in fresh.quiz_data.get("questions", []):
+                        yield _sse("question", question)
+                    yield _sse("done", jsonable_encoder(fresh))
+                    return
+
+            article_data = await scraper.scrape_article(canonical_url)
+            resolved_url = article_data.get("canonical_url", canonical_url)
+            if resolved_url != canonical_url:
+                await aliases.record(canonical_url, resolved_url)
+                canonical_url = resolved_url
+            yield _sse("scraped", {"title": article_data["title"], "url": canonical_url})
+
+            quiz_data = None
+            if mode != "single":
+                # Merged sections and offline quizzes are complete at once, so questions go out together
+                if mode == "sections":
+                    yield _sse("prompt_sent", {})
+                quiz_data = await _generate_for_mode(quiz_gen, article_data, mode, use_cache=not request.bypass_llm_cache)
+                for question in quiz_data["questions"]:
+                    yield _sse("question", question)
+            else:
+                async for event in quiz_gen.stream_quiz(
+                    article_data["full_content"], article_data["title"], use_cache=not request.bypass_llm_cache
+                ):
+                    if event["event"] == "quiz":
+                        quiz_data = event["data"]
+                    elif event["event"] == "question":
+                        yield _sse("question", event["data"])
+                    else:
+                        yield _sse(event["event"], {})
+
+            saved = await run_blocking("db", _save_quiz, request.url, canonical_url, mode, article_data, quiz_data)
+            yield _sse("done", jsonable_encoder(saved))
+
+        except Exception as e:
+            logger.error(f"Error streaming quiz: {e}")
+            yield _sse("error", {"detail": f"Failed to generate quiz: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/jobs", response_model=QuizJobResponse, status_code=202)
+async def submit_quiz_job(request: QuizJobRequest, http_request: Request):
+    """Queue quiz generation and return the job at once; poll GET /api/jobs/{id}"""
+    mode = _quiz_mode(request)
+    try:
+        job = await http_request.app.state.job_queue.submit(
+            request.url, mode, request.force_regenerate, request.bypass_llm_cache, request.priority
+        )
+    except Exception as e:
+        logger.error(f"Error queueing quiz job: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to queue quiz job: {str(e)}")
+    logger.info(f"Queued job {job['id']} for: {request.url}")
+    return QuizJobResponse(**job)
+
+@app.get("/api/jobs/{job_id}", response_model=QuizJobResponse)
+async def get_quiz_job(job_id: int, http_request: Request):
+    """Job status, with the quiz once it is done"""
+    job = await http_request.app.state.job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    quiz = None
+    if job["status"] == "done" and job["quiz_id"]:
+        quiz = await run_blocking("db", _load_quiz, job["quiz_id"])
+    return QuizJobResponse(**job, quiz=quiz)
+
+async def _batch_item(state, url: str, canonical_url: str, request: QuizBatchRequest, mode: str,
+                      host_slots: Dict[str, asyncio.Semaphore], newest_before: int) -> dict:
+    """One article of a batch, through the same fresh lookup, coalescer and
+    revision reuse as single requests"""
+    # Politeness: at most BATCH_PER_HOST fetches per Wikipedia host from this batch
+    host = urlsplit(canonical_url).netloc
+    fetch_slot = host_slots.setdefault(host, asyncio.Semaphore(config.BATCH_PER_HOST))
+    quiz = await _generate_or_reuse(
+        state, url, state.scraper, state.quiz_generator,
+        request.force_regenerate, request.bypass_llm_cache, mode, fetch_slot
+    )
+    # Rows added since the batch started were generated for it (or shared with
+    # a concurrent request for the same article)
+    status = "generated" if quiz.id > newest_before else "reused"
+    return {"url": url, "status": status, "quiz_id": quiz.id, "title": quiz.title,
+            "questions": len(quiz.quiz_data.get("questions", []))}
+
+@app.post("/api/generate_quiz/batch")
+async def generate_quiz_batch(request: QuizBatchRequest, http_request: Request):
+    """Generate quizzes for many URLs concurrently, streaming one NDJSON line
+    per article as it completes.
+
+    Lines are {"url", "status": "reused" | "generated" | "error", ...}.
+    URLs naming the same article (other spellings, known redirects) are
+    processed once; the line for the first one lists the rest as "aliases".
+    A last {"status": "saved", "quiz_ids": {url: id}} line maps every
+    submitted URL to its quiz.
+    """
+    mode = _quiz_mode(request)
+    urls = list(dict.fromkeys(request.urls))
+    if not urls:
+        raise HTTPException(status_code=400, detail="No URLs given")
+    if len(urls) > config.BATCH_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {config.BATCH_MAX_URLS} URLs per batch")
+
+    state = http_request.app.state
+    concurrency = max(1, min(request.concurrency or config.BATCH_CONCURRENCY, config.BATCH_CONCURRENCY))
+    slots = asyncio.Semaphore(concurrency)
+    host_slots: Dict[str, asyncio.Semaphore] = {}
+
+    # Dedupe on the canonical URL; the mode is the same for the whole batch
+    resolved = await asyncio.gather(*(state.aliases.resolve(url) for url in urls), return_exceptions=True)
+    articles: Dict[str, List[str]] = {}
+    invalid = []
+    for url, canonical_url in zip(urls, resolved):
+        if isinstance(canonical_url, Exception):
+            invalid.append({"url": url, "status": "error", "detail": str(canonical_url)})
+        else:
+            articles.setdefault(canonical_url, []).append(url)
+    newest_before = await run_blocking("db", _newest_quiz_id)
+
+    async def run(canonical_url: str, spellings: List[str]) -> dict:
+        async with slots:
+            try:
+                line = await _batch_item(state, spellings[0], canonical_url, request, mode,
+                                         host_slots, newest_before)
+            except Exception as e:
+                logger.error(f"Batch item failed for {spellings[0]}: {e}")
+                line = {"url": spellings[0], "status": "error", "detail": str(e)}
+        if len(spellings) > 1:
+            line["aliases"] = spellings[1:]
+        return line
+
+    async def lines():
+        logger.info(f"Generating batch of {len(articles)} quizzes, {concurrency} at a time")
+        for line in invalid:
+            yield json.dumps(line) + "\n"
+        tasks = [asyncio.ensure_future(run(canonical_url, spellings))
+                 for canonical_url, spellings in articles.items()]
+        try:
+            quiz_ids = {}
+            for next_done in asyncio.as_completed(tasks):
+                line = await next_done
+                if "quiz_id" in line:
+                    for url in [line["url"], *line.get("aliases", [])]:
+                        quiz_ids[url] = line["quiz_id"]
+                yield json.dumps(line) + "\n"
+            yield json.dumps({"status": "saved", "quiz_ids": quiz_ids}) + "\n"
+        finally:
+            # Client went away: stop work that nobody will read
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/api/history", response_model=List[QuizResponse])
+def get_quiz_history(db: Session = Depends(get_db)):
+    """Get quiz generation history"""
+    from models import Quiz
+    try:
+        quizzes = db.query(Quiz).order_by(Quiz.created_at.desc()).limit(20).all()
+        
+        # Convert to proper response format
+        response_data = []
+        for quiz in quizzes:
+            response_data.append({
+                "id": quiz.id,
+                "url": quiz.url,
+                "title": quiz.title,
+                "summary": quiz.summary,
+                "key_entities": quiz.key_entities or {},
+                "sections": quiz.sections or [],
+                "created_at": quiz.created_at.isoformat()  # Fixed: convert to string
+            })
+        
+        return response_data
+        
+    except Exception as e:
+        logger.error(f"Error fetching history: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch quiz history")
+
+@app.get("/api/quiz/{quiz_id}", response_model=QuizDetailResponse)
+def get_quiz_details(quiz_id: int, variant: Optional[int] = Query(None, ge=0),
+                     questions: Optional[int] = Query(None, ge=1), db: Session = Depends(get_db)):
+    """Get full details for a specific quiz.
+
+    With ?variant=N, serve a deterministic variant of the stored questions
+    (sampled, reordered, options shuffled) without another LLM call;
+    ?questions=K sets the variant's size.
+    """
+    from models import Quiz
+    quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    
+    response = _quiz_to_response(quiz)
+    if variant is not None:
+        response.quiz_data = make_variant(
+            response.quiz_data, quiz.id, variant, questions or config.QUIZ_VARIANT_QUESTIONS or None
+        )
+    return response
+
+if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
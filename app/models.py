@@ -1,16 +1,82 @@
-
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
-from sqlalchemy.sql import func
-from database import Base
-
-class Quiz(Base):
-    __tablename__ = "quizzes"
-
-    id = Column(Integer, primary_key=True, index=True)
-    url = Column(String, nullable=False)
-    title = Column(String, nullable=False)
-    summary = Column(Text)
-    key_entities = Column(JSON)
-    sections = Column(JSON)
-    quiz_data = Column(JSON)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Float, Index, Boolean
+from sqlalchemy.sql import func
+from database import Base
+
+class Quiz(Base):
+    __tablename__ = "quizzes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String, nullable=False)
+    canonical_url = Column(String)
+    revision_id = Column(Integer)
+    # Generation mode ("single", "sections", "fast"); quizzes are reused only within a mode
+    mode = Column(String)
+    title = Column(String, nullable=False)
+    summary = Column(Text)
+    key_entities = Column(JSON)
+    sections = Column(JSON)
+    quiz_data = Column(JSON)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Latest quiz for an article, used to reuse fresh quizzes
+        Index('ix_quizzes_canonical_url_created_at', 'canonical_url', 'created_at'),
+    )
+
+class GenerationLease(Base):
+    """Cross-worker lock so only one process generates a quiz for an article at a time"""
+    __tablename__ = "generation_leases"
+
+    key = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    quiz_id = Column(Integer)
+    expires_at = Column(Float, nullable=False)
+
+class ArticleAlias(Base):
+    """Redirect index: canonicalized request URL -> URL of the article it resolves to"""
+    __tablename__ = "article_aliases"
+
+    alias = Column(String, primary_key=True)
+    canonical_url = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class LLMCacheEntry(Base):
+    """Validated quiz JSON cached per (article content, prompt version, model)"""
+    __tablename__ = "llm_cache"
+
+    key = Column(String, primary_key=True)
+    model = Column(String, nullable=False)
+    prompt_version = Column(String, nullable=False)
+    quiz_data = Column(JSON, nullable=False)
+    generation_seconds = Column(Float)
+    hits = Column(Integer, default=0)
+    created_at = Column(Float, nullable=False)
+    last_used_at = Column(Float, nullable=False, index=True)
+
+class QuizJob(Base):
+    """Queued quiz generation request; claimed by worker processes through a
+    conditional UPDATE and held with an expiring lease"""
+    __tablename__ = "quiz_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String, nullable=False)
+    mode = Column(String, nullable=False)
+    force_regenerate = Column(Boolean, default=False)
+    bypass_llm_cache = Column(Boolean, default=False)
+    # queued -> running -> done | failed (running -> queued again on retry)
+    status = Column(String, nullable=False)
+    priority = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=0)
+    owner = Column(String)
+    lease_expires_at = Column(Float)
+    run_after = Column(Float, nullable=False)
+    quiz_id = Column(Integer)
+    error = Column(Text)
+    created_at = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False)
+
+    __table_args__ = (
+        # Next claimable job: highest priority first, oldest first within it
+        Index('ix_quiz_jobs_claim', 'status', 'priority', 'run_after'),
+    )
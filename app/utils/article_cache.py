@@ -0,0 +1,119 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ArticleCache:
+    """Cache of extracted article dicts keyed by (canonical title, revision id).
+
+    The first tier is an in-process LRU. The optional second tier is a SQLite
+    file shared by every uvicorn worker on the host, so an article parsed by
+    one worker is a hit for all of them.
+    """
+
+    def __init__(self, max_entries: int, sqlite_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.sqlite_path = sqlite_path
+        self._memory: "OrderedDict[Tuple[str, int], Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.memory_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+        if self.sqlite_path:
+            conn = self._connection()
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS parsed_articles ("
+                " cache_key TEXT NOT NULL,"
+                " revision_id INTEGER NOT NULL,"
+                " data TEXT NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (cache_key, revision_id))"
+            )
+            conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads; keep one per executor thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.sqlite_path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, revision_id: int) -> Optional[Dict]:
+        with self._lock:
+            article = self._memory.get((key, revision_id))
+            if article is not None:
+                self._memory.move_to_end((key, revision_id))
+                self.memory_hits += 1
+                return dict(article)
+
+        if self.sqlite_path:
+            try:
+                row = self._connection().execute(
+                    "SELECT data FROM parsed_articles WHERE cache_key = ? AND revision_id = ?",
+                    (key, revision_id)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Shared article cache read failed: {e}")
+                row = None
+
+            if row:
+                article = json.loads(row[0])
+                with self._lock:
+                    self.shared_hits += 1
+                    self._remember(key, revision_id, article)
+                return dict(article)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, revision_id: int, article: Dict):
+        with self._lock:
+            self._remember(key, revision_id, dict(article))
+
+        if self.sqlite_path:
+            try:
+                conn = self._connection()
+                # Older revisions of the article are never read again
+                conn.execute(
+                    "DELETE FROM parsed_articles WHERE cache_key = ? AND revision_id != ?",
+                    (key, revision_id)
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO parsed_articles (cache_key, revision_id, data, updated_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, revision_id, json.dumps(article), time.time())
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Shared article cache write failed: {e}")
+
+    def _remember(self, key: str, revision_id: int, article: Dict):
+        self._memory[(key, revision_id)] = article
+        self._memory.move_to_end((key, revision_id))
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.memory_hits + self.shared_hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "shared_tier": bool(self.sqlite_path),
+                "memory_hits": self.memory_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.shared_hits) / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,175 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from database import SessionLocal
+from models import ArticleAlias
+from utils.executors import run_blocking
+
+logger = logging.getLogger(__name__)
+
+_HOST_RE = re.compile(r'^(?P<lang>[a-z][a-z0-9-]*)(?:\.m)?\.wikipedia\.org$')
+_PAGE_NAME_RE = re.compile(rb'"wgPageName":("(?:[^"\\]|\\.)*")')
+# Left unescaped in article paths, as MediaWiki does; '?', '#', '&', '%' and non-ASCII are encoded
+_TITLE_SAFE = ";@$!*(),/:"
+
+
+def normalize_title(title: str) -> str:
+    """MediaWiki title normalization: spaces as underscores, no repeated or
+    surrounding underscores, first letter capitalized"""
+    title = re.sub(r'[\s_]+', '_', title).strip('_')
+    return title[:1].upper() + title[1:]
+
+
+def article_url(host: str, title: str) -> str:
+    """https://<host>/wiki/<Title> with the normalized title percent-encoded"""
+    return f"https://{host}/wiki/{quote(normalize_title(title), safe=_TITLE_SAFE)}"
+
+
+def url_title(url: str) -> str:
+    """The (decoded) title of an article URL built by article_url()"""
+    return unquote(urlsplit(url).path[len('/wiki/'):])
+
+
+def canonicalize_url(url: str) -> Optional[str]:
+    """Normalize any spelling of a Wikipedia article URL to
+    https://<lang>.wikipedia.org/wiki/<Title>, or None if it is not one.
+
+    Handles http vs https, mobile hosts, explicit ports, percent-encoding,
+    spaces vs underscores, #fragments, query strings and
+    /w/index.php?title= links.
+    """
+    parts = urlsplit(url.strip())
+    if parts.scheme not in ('http', 'https'):
+        return None
+
+    try:
+        parts.port
+    except ValueError:
+        return None
+    host_match = _HOST_RE.match(parts.hostname or '')
+    if not host_match:
+        return None
+
+    if parts.path.startswith('/wiki/'):
+        title = parts.path[len('/wiki/'):]
+    elif parts.path == '/w/index.php':
+        title = parse_qs(parts.query).get('title', [''])[0]
+    else:
+        return None
+
+    # An encoded '#' still starts a section anchor, not part of the title
+    title = normalize_title(unquote(title).split('#', 1)[0])
+    if not title:
+        return None
+
+    return article_url(f"{host_match.group('lang')}.wikipedia.org", title)
+
+
+def page_canonical_url(html: bytes, fetched_url: str) -> str:
+    """Canonical URL of the page actually served (follows wiki redirects such
+    as USA -> United_States), read from the page config"""
+    match = _PAGE_NAME_RE.search(html)
+    if not match:
+        return fetched_url
+    try:
+        page_name = json.loads(match.group(1).decode('utf-8'))
+    except ValueError:
+        return fetched_url
+
+    return article_url(urlsplit(fetched_url).netloc, page_name)
+
+
+class AliasIndex:
+    """Maps canonicalized request URLs to the article they redirect to.
+
+    Aliases are persisted in the `article_aliases` table so every worker
+    (and every restart) keys caches, reuse and dedupe on the same title; a
+    bounded in-process LRU sits in front of it. Known redirects are kept
+    until evicted; "no redirect" answers only for `negative_ttl` seconds,
+    since another worker may record the alias meanwhile.
+    """
+
+    def __init__(self, max_entries: int, negative_ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        # alias -> (target or None, monotonic expiry)
+        self._memory: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    async def resolve(self, url: str) -> str:
+        """Canonical URL for a request URL, following known redirects"""
+        canonical = canonicalize_url(url)
+        if canonical is None:
+            raise ValueError("Invalid Wikipedia URL")
+
+        with self._lock:
+            target, expires = self._memory.get(canonical, (None, 0.0))
+            known = expires > time.monotonic()
+            if known:
+                self._memory.move_to_end(canonical)
+
+        if not known:
+            target = await run_blocking("db", self._lookup, canonical)
+            with self._lock:
+                self._remember(canonical, target)
+
+        with self._lock:
+            if target:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return target or canonical
+
+    async def record(self, alias: str, target: str):
+        if alias == target:
+            return
+        with self._lock:
+            self._remember(alias, target)
+            self.recorded += 1
+        logger.info(f"Recording redirect alias {alias} -> {target}")
+        await run_blocking("db", self._store, alias, target)
+
+    def _remember(self, alias: str, target: Optional[str]):
+        expires = time.monotonic() + self.negative_ttl if target is None else float('inf')
+        self._memory[alias] = (target, expires)
+        self._memory.move_to_end(alias)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, alias: str) -> Optional[str]:
+        db = SessionLocal()
+        try:
+            row = db.query(ArticleAlias).filter(ArticleAlias.alias == alias).first()
+            return row.canonical_url if row else None
+        finally:
+            db.close()
+
+    def _store(self, alias: str, target: str):
+        db = SessionLocal()
+        try:
+            db.merge(ArticleAlias(alias=alias, canonical_url=target))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to store alias {alias}: {e}")
+        finally:
+            db.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "redirect_hits": self.hits,
+                "direct": self.misses,
+                "recorded": self.recorded
+            }
@@ -0,0 +1,104 @@
+import logging
+import time
+from typing import Dict, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpen(Exception):
+    """The upstream is marked unhealthy; the call was not attempted"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one upstream.
+
+    After failure_threshold failures in a row the circuit opens and calls
+    fail fast with CircuitOpen for reset_timeout seconds. Then a single
+    probe call is let through (half-open): success closes the circuit, a
+    failure opens it for another reset_timeout. A probe that never reports
+    back (cancelled, rate limited) is replaced after reset_timeout.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+
+        self.opened = 0
+        self.short_circuited = 0
+        self.failures = 0
+        self.successes = 0
+
+    def before_call(self):
+        """Raise CircuitOpen unless the call may go ahead"""
+        if self.state == "closed":
+            return
+        now = time.monotonic()
+        if self.state == "open" and now - self._opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self._probe_started = None
+        if self.state == "half_open" and (
+            self._probe_started is None or now - self._probe_started >= self.reset_timeout
+        ):
+            self._probe_started = now
+            return
+        self.short_circuited += 1
+        raise CircuitOpen(f"{self.name} circuit is open")
+
+    def record_success(self):
+        self.successes += 1
+        self._failures = 0
+        if self.state != "closed":
+            logger.info(f"{self.name} circuit closed")
+        self.state = "closed"
+        self._probe_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        self._failures += 1
+        if self.state == "half_open" or (self.state == "closed" and self._failures >= self.failure_threshold):
+            self.state = "open"
+            self._opened_at = time.monotonic()
+            self._probe_started = None
+            self.opened += 1
+            logger.warning(f"{self.name} circuit opened after {self._failures} failures; "
+                           f"failing fast for {self.reset_timeout:.0f}s")
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "opened": self.opened,
+            "short_circuited": self.short_circuited,
+            "failures": self.failures,
+            "successes": self.successes
+        }
+
+
+class CircuitBreakers:
+    """One CircuitBreaker per upstream name, created on first use (same
+    names as UpstreamLimiters: a Wikipedia host or "gemini:<model>")"""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, self.failure_threshold, self.reset_timeout)
+            self._breakers[name] = breaker
+        return breaker
+
+    def stats(self) -> Dict:
+        return {name: breaker.stats() for name, breaker in self._breakers.items()}
+
+
+def create_circuit_breakers() -> CircuitBreakers:
+    return CircuitBreakers(config.BREAKER_FAILURE_THRESHOLD, config.BREAKER_RESET_TIMEOUT)
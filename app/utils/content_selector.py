@@ -0,0 +1,109 @@
+import math
+import re
+from collections import Counter
+from typing import List
+
+# Gemini averages roughly four characters of English text per token
+CHARS_PER_TOKEN = 4
+
+# Function words carry no information about the article
+STOPWORDS = frozenset(
+    "the and for was were which what who whom when where why how that this with from into its are has had "
+    "have not but his her their they them than then also been being does did".split()
+)
+
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9"\'(])|\n+')
+_TERM_RE = re.compile(r'\w{3,}')
+
+# Longer runs without sentence punctuation are split into word chunks
+MAX_SENTENCE_CHARS = 600
+
+# Multipliers on a sentence's TF-IDF score
+LEAD_SENTENCES = 3
+LEAD_BOOST = 1.5
+TITLE_BOOST = 1.25
+NUMBER_BOOST = 1.1
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate, no API call"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences and paragraph breaks; runs longer than MAX_SENTENCE_CHARS
+    are cut at word boundaries"""
+    sentences = []
+    for sentence in _SENTENCE_RE.split(text):
+        sentence = sentence.strip()
+        while len(sentence) > MAX_SENTENCE_CHARS:
+            cut = sentence.rfind(' ', 0, MAX_SENTENCE_CHARS)
+            if cut <= 0:
+                cut = MAX_SENTENCE_CHARS
+            sentences.append(sentence[:cut])
+            sentence = sentence[cut:].strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def _terms(text: str) -> List[str]:
+    return [term for term in _TERM_RE.findall(text.lower()) if term not in STOPWORDS]
+
+
+def score_sentences(sentences: List[str], title: str = "") -> List[float]:
+    """Information score per sentence: the TF-IDF weight of its terms
+    (sentences as documents, so terms repeated across the article count for
+    less), normalized by the square root of its length, with small boosts
+    for the lead, for mentions of the title and for numbers (dates,
+    quantities)"""
+    sentence_terms = [_terms(sentence) for sentence in sentences]
+    document_frequency = Counter(term for terms in sentence_terms for term in set(terms))
+    title_terms = set(_terms(title))
+    count = len(sentences)
+
+    scores = []
+    for index, (sentence, terms) in enumerate(zip(sentences, sentence_terms)):
+        if not terms:
+            scores.append(0.0)
+            continue
+        score = sum(
+            frequency * math.log(count / document_frequency[term])
+            for term, frequency in Counter(terms).items()
+        ) / math.sqrt(len(terms))
+        if index < LEAD_SENTENCES:
+            score *= LEAD_BOOST
+        if title_terms and title_terms.intersection(terms):
+            score *= TITLE_BOOST
+        if any(char.isdigit() for char in sentence):
+            score *= NUMBER_BOOST
+        scores.append(score)
+    return scores
+
+
+def select_content(text: str, token_budget: int, title: str = "") -> str:
+    """The most informative sentences of text that fit in token_budget,
+    joined in their original order.
+
+    Sentences are taken greedily by score_sentences() while they fit. Text
+    already within the budget is returned unchanged.
+    """
+    if estimate_tokens(text) <= token_budget:
+        return text
+
+    sentences = split_sentences(text)
+    scores = score_sentences(sentences, title)
+
+    chosen = []
+    seen = set()
+    remaining = token_budget
+    for index in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+        cost = estimate_tokens(sentences[index]) + 1
+        if cost <= remaining and sentences[index] not in seen:
+            chosen.append(index)
+            seen.add(sentences[index])
+            remaining -= cost
+        if remaining < 8:
+            break
+
+    return ' '.join(sentences[index] for index in sorted(chosen))
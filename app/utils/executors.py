@@ -0,0 +1,46 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# One bounded pool per blocking stage, so a burst of slow work in one stage
+# cannot starve the other (or the event loop itself).
+_POOL_SIZES = {
+    "scrape": config.SCRAPE_WORKERS,
+    "db": config.DB_WORKERS,
+}
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+
+
+def get_executor(stage: str) -> ThreadPoolExecutor:
+    """Return the executor for a stage, creating it on first use"""
+    if stage not in _POOL_SIZES:
+        raise ValueError(f"Unknown executor stage: {stage}")
+
+    executor = _executors.get(stage)
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=_POOL_SIZES[stage],
+            thread_name_prefix=f"{stage}-worker"
+        )
+        _executors[stage] = executor
+    return executor
+
+
+async def run_blocking(stage: str, func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking callable on the stage's executor without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(stage), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executors():
+    for stage, executor in _executors.items():
+        logger.info(f"Shutting down {stage} executor...")
+        executor.shutdown(wait=False, cancel_futures=True)
+    _executors.clear()
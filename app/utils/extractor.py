@@ -0,0 +1,182 @@
+import re
+from typing import Any, Dict, Iterator, List, Optional
+
+from bs4 import SoupStrainer, Tag
+
+CONTENT_BUDGET = 20000
+MAX_SECTIONS = 10
+SUMMARY_PARAGRAPHS = 3
+SUMMARY_LIMIT = 1000
+SECTION_TEXT_BUDGET = 3000
+LEAD_HEADING = 'Introduction'
+SKIP_SECTIONS = ['contents', 'references', 'external links', 'see also', 'notes']
+
+_CITATION_RE = re.compile(r'\[\d+\]')
+
+
+def _is_article_root(name: str, attrs: Dict) -> bool:
+    if name == 'h1':
+        classes = attrs.get('class') or ''
+        if isinstance(classes, str):
+            classes = classes.split()
+        return 'firstHeading' in classes
+    return name == 'div' and attrs.get('id') == 'mw-content-text'
+
+
+# Build a tree only for h1.firstHeading and div#mw-content-text; navigation,
+# sidebars and footers outside them are dropped while parsing.
+CONTENT_STRAINER = SoupStrainer(_is_article_root)
+
+
+class _ExtractionState:
+    def __init__(self):
+        self.title: Optional[str] = None
+        self.summary_paragraphs: List[str] = []
+        self.summary_seen = 0
+        self.sections: List[str] = []
+        self.paragraphs: List[str] = []
+        self.content_length = 0
+        self.content_found = False
+        # Body text grouped by h2 section (the lead first), for per-section generation
+        self.section_texts: List[Dict] = [{"heading": LEAD_HEADING, "parts": [], "length": 0, "skip": False}]
+        self.section_texts_done = False
+
+    def budgets_met(self) -> bool:
+        return (
+            self.title is not None
+            and self.summary_seen >= SUMMARY_PARAGRAPHS
+            and len(self.sections) >= MAX_SECTIONS
+            and self.content_length >= CONTENT_BUDGET
+            and self.section_texts_done
+        )
+
+
+class ArticleExtractor:
+    """Extract title, lead, headings and body text in a single tree walk.
+
+    - title: first h1.firstHeading
+    - summary: first three <p> inside div#mw-content-text
+    - sections: h2/h3 headings inside div#mw-content-text, minus navigation
+      ones, capped at 10
+    - full_content: <p> inside div#mw-content-text but outside tables,
+      capped at 20000 characters (the pool utils.content_selector picks
+      prompt sentences from)
+    - section_texts: the same paragraphs grouped by h2 section, starting
+      with the lead, up to 3000 characters for each of the first 10 sections
+
+    Only the title heading and the content div are ever read, which lets the
+    soup backends skip building the rest of the page (see CONTENT_STRAINER).
+    The walk stops as soon as every budget has been met. Node access goes
+    through the small accessor methods below so that other tree
+    implementations (see utils.parsers) can reuse the same walk.
+    """
+
+    def extract(self, root: Any) -> Dict:
+        state = _ExtractionState()
+        self._walk(root, state, in_content=False, in_table=False)
+
+        summary = ' '.join(state.summary_paragraphs)
+        full_content = '\n'.join(state.paragraphs)
+
+        return {
+            "title": state.title or "Unknown Title",
+            "summary": summary[:SUMMARY_LIMIT],
+            "sections": state.sections[:MAX_SECTIONS],
+            "full_content": full_content[:CONTENT_BUDGET],
+            "section_texts": [
+                {"heading": chunk["heading"], "text": '\n'.join(chunk["parts"])[:SECTION_TEXT_BUDGET]}
+                for chunk in state.section_texts
+                if chunk["parts"] and not chunk["skip"]
+            ]
+        }
+
+    def _children(self, node: Tag) -> Iterator[Tag]:
+        """Element children of node, in document order"""
+        for child in node.children:
+            if isinstance(child, Tag):
+                yield child
+
+    def _tag(self, node: Tag) -> str:
+        return node.name
+
+    def _id(self, node: Tag) -> Optional[str]:
+        return node.get('id')
+
+    def _classes(self, node: Tag) -> List[str]:
+        return node.get('class') or []
+
+    def _text(self, node: Tag) -> str:
+        return node.get_text()
+
+    def _walk(self, node: Any, state: _ExtractionState, in_content: bool, in_table: bool) -> bool:
+        """Visit node's element children; returns True once extraction can stop"""
+        for child in self._children(node):
+            name = self._tag(child)
+            if name == 'h1':
+                if state.title is None and 'firstHeading' in self._classes(child):
+                    state.title = self._text(child).strip()
+            elif (name == 'h2' or name == 'h3') and in_content:
+                self._add_section(state, child)
+                if name == 'h2':
+                    self._start_section_text(state, child)
+            elif name == 'p' and in_content:
+                self._add_paragraph(state, child, in_table)
+            elif name == 'div' and not state.content_found and self._id(child) == 'mw-content-text':
+                state.content_found = True
+                if self._walk(child, state, in_content=True, in_table=False) or state.title is not None:
+                    return True
+            elif self._walk(child, state, in_content, in_table or name == 'table'):
+                return True
+
+            if state.budgets_met():
+                return True
+        return False
+
+    def _add_section(self, state: _ExtractionState, heading: Any):
+        if len(state.sections) >= MAX_SECTIONS:
+            return
+        heading_text = self._text(heading).strip()
+        lowered = heading_text.lower()
+        if not any(skip in lowered for skip in SKIP_SECTIONS):
+            state.sections.append(heading_text)
+
+    def _start_section_text(self, state: _ExtractionState, heading: Any):
+        if state.section_texts_done:
+            return
+        if len(state.section_texts) > MAX_SECTIONS:
+            state.section_texts_done = True
+            return
+        heading_text = self._text(heading).strip()
+        lowered = heading_text.lower()
+        state.section_texts.append({
+            "heading": heading_text,
+            "parts": [],
+            "length": 0,
+            "skip": any(skip in lowered for skip in SKIP_SECTIONS)
+        })
+
+    def _add_paragraph(self, state: _ExtractionState, paragraph: Any, in_table: bool):
+        text = self._text(paragraph).strip()
+
+        if state.summary_seen < SUMMARY_PARAGRAPHS:
+            state.summary_seen += 1
+            if text:
+                state.summary_paragraphs.append(_CITATION_RE.sub('', text))
+
+        if in_table or not text:
+            return
+
+        cleaned = _CITATION_RE.sub('', text)
+        if not state.section_texts_done:
+            chunk = state.section_texts[-1]
+            if not chunk["skip"] and chunk["length"] < SECTION_TEXT_BUDGET:
+                chunk["parts"].append(cleaned)
+                chunk["length"] += len(cleaned) + 1
+
+        if state.content_length >= CONTENT_BUDGET:
+            return
+
+        if state.paragraphs:
+            state.content_length += 1
+        state.paragraphs.append(cleaned)
+        state.content_length += len(cleaned)
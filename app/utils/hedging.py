@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+import config
+from utils.circuit_breaker import CircuitOpen
+from utils.rate_limiter import RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+
+class RequestHedger:
+    """Hedged requests against a long-tailed upstream.
+
+    The primary call starts at once. If it is still running after the
+    `percentile` of recently observed latencies, an identical hedge call is
+    sent; the first to succeed wins and the other is cancelled. Hedges are
+    capped at `budget` (a fraction of all calls) so the extra cost stays
+    bounded, and no hedging happens until `min_samples` latencies have been
+    seen. A hedge that fails with one of the `rejected` errors (refused by
+    a limiter or breaker before it went out) does not count as sent and
+    gives its budget back. A primary cancelled before it finishes still
+    records the time it ran, as a lower bound of its latency, so abandoned
+    slow calls keep the percentile honest.
+
+    Latency saved is an estimate: when the hedge wins, the primary would
+    have needed the mean of the observed latencies above the time already
+    spent.
+    """
+
+    def __init__(self, enabled: bool, percentile: float, budget: float, min_samples: int, window: int,
+                 rejected: Tuple[Type[BaseException], ...] = ()):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = max(1, min_samples)
+        self.rejected = rejected
+        self._latencies = deque(maxlen=window)
+
+        self.calls = 0
+        self.hedged = 0
+        self.hedges_rejected = 0
+        self.hedge_wins = 0
+        self.over_budget = 0
+        self.saved_seconds = 0.0
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait on the primary before hedging, None when not hedging"""
+        if not self.enabled or len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, max(0, math.ceil(self.percentile / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    async def run(self, primary: Callable[[], Awaitable[Any]], hedge: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of primary(), or of hedge() if that one finishes first"""
+        self.calls += 1
+        started = time.monotonic()
+        delay = self.hedge_delay()
+        primary_task = asyncio.create_task(self._timed(primary, censored=True))
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait({primary_task}, timeout=delay)
+                if not done:
+                    if self.hedged < self.budget * self.calls:
+                        return await self._race(primary_task, hedge, started)
+                    self.over_budget += 1
+            return await primary_task
+        finally:
+            primary_task.cancel()
+
+    async def _race(self, primary_task: asyncio.Task, hedge: Callable[[], Awaitable[Any]], started: float) -> Any:
+        # Reserved now so concurrent calls see the budget taken; given back if refused
+        self.hedged += 1
+        hedge_task = asyncio.create_task(self._timed(hedge))
+        pending = {primary_task, hedge_task}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge_task:
+                            self._record_win(time.monotonic() - started)
+                        return task.result()
+            # Both failed: surface the primary's error
+            return primary_task.result()
+        finally:
+            hedge_task.cancel()
+            if (hedge_task.done() and not hedge_task.cancelled()
+                    and isinstance(hedge_task.exception(), self.rejected)):
+                self.hedged -= 1
+                self.hedges_rejected += 1
+
+    async def _timed(self, call: Callable[[], Awaitable[Any]], censored: bool = False) -> Any:
+        """call() with its latency recorded; with censored=True a cancelled
+        call records the time it had run"""
+        started = time.monotonic()
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            if censored:
+                self._latencies.append(time.monotonic() - started)
+            raise
+        self._latencies.append(time.monotonic() - started)
+        return result
+
+    def _record_win(self, elapsed: float):
+        self.hedge_wins += 1
+        slower = [latency for latency in self._latencies if latency > elapsed]
+        if slower:
+            self.saved_seconds += sum(slower) / len(slower) - elapsed
+
+    def stats(self) -> Dict:
+        delay = self.hedge_delay()
+        return {
+            "enabled": self.enabled,
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+            "hedges_rejected": self.hedges_rejected,
+            "hedge_wins": self.hedge_wins,
+            "over_budget": self.over_budget,
+            "hedge_delay_ms": round(delay * 1000, 2) if delay is not None else None,
+            "estimated_saved_ms": round(self.saved_seconds * 1000, 2)
+        }
+
+
+def create_llm_hedger() -> RequestHedger:
+    return RequestHedger(
+        config.LLM_HEDGE, config.LLM_HEDGE_PERCENTILE, config.LLM_HEDGE_BUDGET,
+        config.LLM_HEDGE_MIN_SAMPLES, config.LLM_HEDGE_WINDOW,
+        rejected=(RateLimitExceeded, CircuitOpen)
+    )
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedPage:
+    body: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class HTMLCache:
+    """On-disk cache of raw article HTML keyed by canonical article title.
+
+    Each entry is a `<sha256>.html` body plus a `<sha256>.json` sidecar holding
+    the validators (ETag / Last-Modified) used for conditional revalidation.
+    The total size is capped; the least recently used entries are evicted
+    first. Recency is tracked per process and seeded from file mtimes, so
+    several workers can share one directory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    def _digest(self, key: str) -> str:
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def _paths(self, digest: str):
+        base = os.path.join(self.directory, digest)
+        return base + '.html', base + '.json'
+
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.html'):
+                continue
+            digest = name[:-5]
+            body_path, meta_path = self._paths(digest)
+            try:
+                size = os.path.getsize(body_path) + os.path.getsize(meta_path)
+                entries.append((os.path.getmtime(body_path), digest, size))
+            except OSError:
+                continue
+
+        for _, digest, size in sorted(entries):
+            self._index[digest] = size
+            self._total_bytes += size
+        logger.info(f"HTML cache loaded: {len(self._index)} entries, {self._total_bytes} bytes")
+
+    def get(self, key: str) -> Optional[CachedPage]:
+        """Return the cached page for a key, or None. Does not count as a hit
+        until the upstream confirms it is still current (see record_hit)."""
+        digest = self._digest(key)
+        body_path, meta_path = self._paths(digest)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+                self._forget(digest)
+            return None
+
+        return CachedPage(body=body, etag=meta.get('etag'), last_modified=meta.get('last_modified'))
+
+    def record_hit(self, key: str):
+        """Upstream answered 304: the cached copy was served"""
+        digest = self._digest(key)
+        body_path, _ = self._paths(digest)
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            if digest in self._index:
+                self._index.move_to_end(digest)
+
+    def put(self, key: str, body: bytes, etag: Optional[str] = None,
+            last_modified: Optional[str] = None, replaced: bool = False):
+        digest = self._digest(key)
+        body_path, meta_path = self._paths(digest)
+        meta = json.dumps({'key': key, 'etag': etag, 'last_modified': last_modified}).encode('utf-8')
+
+        try:
+            # Write-then-rename so readers never see a torn entry
+            for path, data in ((body_path, body), (meta_path, meta)):
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write HTML cache entry for {key}: {e}")
+            return
+
+        with self._lock:
+            if replaced:
+                self.stale += 1
+            self._forget(digest)
+            size = len(body) + len(meta)
+            self._index[digest] = size
+            self._total_bytes += size
+            self._evict()
+
+    def _forget(self, digest: str):
+        size = self._index.pop(digest, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._index) > 1:
+            digest, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            for path in self._paths(digest):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.stale
+            return {
+                "entries": len(self._index),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import random
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+import config
+from utils.circuit_breaker import CircuitBreakers
+from utils.rate_limiter import UpstreamLimiters, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'DeepKlarity-AI-Quiz-Generator/1.0'
+
+# Responses worth another attempt: throttling and server-side failures
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class HTTPClient:
+    """Long-lived pooled async HTTP client shared by all requests.
+
+    Wraps a single httpx.AsyncClient (keep-alive pool, gzip/deflate, optional
+    HTTP/2). Every request goes through the per-host limiter (rate and
+    concurrency, which httpx does not provide), and 429/503 responses pause
+    that host for their Retry-After.
+
+    GETs are idempotent, so transport errors (including connect/read
+    timeouts), 429 and 5xx are retried up to `retries` times with jittered
+    exponential backoff. Each host has a circuit breaker: while it is open,
+    get() raises CircuitOpen at once instead of waiting on a sick upstream.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, limiters: UpstreamLimiters, breakers: CircuitBreakers,
+                 retries: int, retry_backoff: float, max_backoff: float):
+        self._client = client
+        self.limiters = limiters
+        self.breakers = breakers
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.retried = 0
+
+    async def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        host = urlsplit(url).netloc.lower()
+        limiter = self.limiters.get(host)
+        breaker = self.breakers.get(host)
+
+        attempt = 0
+        while True:
+            breaker.before_call()
+            try:
+                async with limiter.slot():
+                    response = await self._client.get(url, headers=headers)
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                if attempt >= self.retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"GET {url} failed ({e!r}); retrying in {delay:.2f}s")
+            else:
+                retry_after = None
+                if response.status_code in (429, 503):
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if retry_after is None and response.status_code == 429:
+                        retry_after = config.THROTTLE_BACKOFF
+                    if retry_after is not None:
+                        limiter.penalize(retry_after)
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                elif response.status_code != 429:
+                    breaker.record_success()
+
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return response
+                if retry_after is not None and retry_after > self.max_backoff:
+                    # Asked to stay away longer than we are willing to wait
+                    return response
+                delay = max(self._backoff(attempt), retry_after or 0)
+                logger.warning(f"GET {url} returned {response.status_code}; retrying in {delay:.2f}s")
+
+            self.retried += 1
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _backoff(self, attempt: int) -> float:
+        return min(self.max_backoff, self.retry_backoff * 2 ** attempt * (0.5 + random.random()))
+
+    def stats(self) -> Dict:
+        return {"retried": self.retried}
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+def create_http_client(limiters: UpstreamLimiters, breakers: CircuitBreakers) -> HTTPClient:
+    client = httpx.AsyncClient(
+        headers={'User-Agent': USER_AGENT},
+        limits=httpx.Limits(
+            max_connections=config.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(config.HTTP_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT),
+        http2=config.HTTP2,
+        follow_redirects=True
+    )
+    logger.info(
+        f"HTTP client ready (max_connections={config.HTTP_MAX_CONNECTIONS}, "
+        f"max_per_host={config.HTTP_MAX_PER_HOST}, http2={config.HTTP2}, "
+        f"timeouts={config.HTTP_CONNECT_TIMEOUT}/{config.HTTP_TIMEOUT}s, retries={config.HTTP_RETRIES})"
+    )
+    return HTTPClient(
+        client, limiters, breakers, config.HTTP_RETRIES, config.HTTP_RETRY_BACKOFF, config.HTTP_RETRY_MAX_BACKOFF
+    )
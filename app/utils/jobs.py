@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import and_, or_
+
+from database import SessionLocal
+from models import QuizJob
+from utils.executors import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Claims that lose a race to another worker move on to the next candidate
+CLAIM_ATTEMPTS = 5
+# Status writes that fail (e.g. database locked) are retried this often, this far apart (seconds)
+WRITE_ATTEMPTS = 3
+WRITE_RETRY_DELAY = 0.5
+
+
+class JobQueue:
+    """Durable quiz generation queue on the `quiz_jobs` table.
+
+    Each process runs `workers` asyncio workers. A worker claims the highest
+    priority runnable job with a conditional UPDATE (only one claimant can
+    match), holds it with a lease it renews while the job runs, and records
+    the quiz id or the error. Failed jobs are retried with jittered
+    exponential backoff up to max_attempts. A job whose worker died is
+    claimed again once its lease expires, so queued and in-flight work
+    survives restarts.
+    """
+
+    def __init__(self, run_job: Callable[[Dict], Awaitable[int]], workers: int, poll_interval: float,
+                 lease_ttl: float, max_attempts: int, retry_backoff: float):
+        self.run_job = run_job
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_ttl = lease_ttl
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._running = 0
+
+        self.claimed = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self):
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+        logger.info(f"Started {self.workers} job workers as {self.owner}")
+
+    async def stop(self):
+        """Cancel the workers; jobs they were running go back to the queue"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, url: str, mode: str, force_regenerate: bool = False,
+                     bypass_llm_cache: bool = False, priority: int = 0) -> Dict:
+        job = await run_blocking("db", self._insert, url, mode, force_regenerate, bypass_llm_cache, priority)
+        self._wakeup.set()
+        return job
+
+    async def get(self, job_id: int) -> Optional[Dict]:
+        return await run_blocking("db", self._load, job_id)
+
+    async def _worker(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await run_blocking("db", self._claim)
+            except Exception as e:
+                logger.error(f"Job claim failed: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._execute(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Bookkeeping failed (e.g. database locked); the lease expires and the job is reclaimed
+                logger.error(f"Job {job['id']} bookkeeping failed: {e}")
+
+    async def _execute(self, job: Dict):
+        logger.info(f"Running job {job['id']} (attempt {job['attempts']}) for {job['url']}")
+        self._running += 1
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            quiz_id = await self.run_job(job)
+        except asyncio.CancelledError:
+            try:
+                await run_blocking("db", self._requeue, job["id"])
+            except Exception as e:
+                logger.error(f"Could not requeue job {job['id']} (its lease will expire): {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed: {e}")
+            await self._write(self._fail, job, str(e))
+        else:
+            await self._write(self._finish, job["id"], quiz_id)
+            self.completed += 1
+        finally:
+            heartbeat.cancel()
+            self._running -= 1
+
+    async def _heartbeat(self, job_id: int):
+        while True:
+            await asyncio.sleep(self.lease_ttl / 3)
+            try:
+                await run_blocking("db", self._renew, job_id)
+            except Exception as e:
+                # Keep trying: two more misses still leave the lease valid
+                logger.warning(f"Lease renewal for job {job_id} failed: {e}")
+
+    async def _write(self, update: Callable, *args):
+        """Run a status update, retrying transient database errors"""
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                return await run_blocking("db", update, *args)
+            except Exception as e:
+                if attempt == WRITE_ATTEMPTS:
+                    raise
+                logger.warning(f"Job status update failed ({e}); retrying")
+                await asyncio.sleep(WRITE_RETRY_DELAY * attempt)
+
+    def _insert(self, url: str, mode: str, force_regenerate: bool, bypass_llm_cache: bool, priority: int) -> Dict:
+        now = time.time()
+        db = SessionLocal()
+        try:
+            job = QuizJob(
+                url=url, mode=mode, force_regenerate=force_regenerate, bypass_llm_cache=bypass_llm_cache,
+                status="queued", priority=priority, attempts=0, run_after=now,
+                created_at=now, updated_at=now
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            return self._to_dict(job)
+        finally:
+            db.close()
+
+    def _load(self, job_id: int) -> Optional[Dict]:
+        db = SessionLocal()
+        try:
+            job = db.query(QuizJob).filter(QuizJob.id == job_id).first()
+            return self._to_dict(job) if job else None
+        finally:
+            db.close()
+
+    def _claim(self) -> Optional[Dict]:
+        now = time.time()
+        claimable = or_(
+            and_(QuizJob.status == "queued", QuizJob.run_after <= now),
+            # Running under a lease nobody renewed: the worker is gone
+            and_(QuizJob.status == "running", QuizJob.lease_expires_at < now)
+        )
+        db = SessionLocal()
+        try:
+            for _ in range(CLAIM_ATTEMPTS):
+                candidate = db.query(QuizJob.id).filter(claimable).order_by(
+                    QuizJob.priority.desc(), QuizJob.id
+                ).first()
+                if candidate is None:
+                    return None
+
+                claimed = db.query(QuizJob).filter(QuizJob.id == candidate.id, claimable).update(
+                    {"status": "running", "owner": self.owner, "lease_expires_at": now + self.lease_ttl,
+                     "attempts": QuizJob.attempts + 1, "updated_at": now},
+                    synchronize_session=False
+                )
+                db.commit()
+                if claimed != 1:
+                    continue
+
+                job = db.query(QuizJob).filter(QuizJob.id == candidate.id).one()
+                if job.attempts > self.max_attempts:
+                    # Only reachable through expired leases: a job that keeps killing its worker
+                    job.status = "failed"
+                    job.error = job.error or "Worker lease expired too many times"
+                    job.updated_at = now
+                    db.commit()
+                    self.failed += 1
+                    continue
+
+                self.claimed += 1
+                return self._to_dict(job)
+            return None
+        finally:
+            db.close()
+
+    def _renew(self, job_id: int):
+        self._update(job_id, {"lease_expires_at": time.time() + self.lease_ttl})
+
+    def _finish(self, job_id: int, quiz_id: int):
+        self._update(job_id, {"status": "done", "quiz_id": quiz_id, "error": None, "lease_expires_at": None})
+
+    def _fail(self, job: Dict, error: str):
+        if job["attempts"] < self.max_attempts:
+            delay = self.retry_backoff * 2 ** (job["attempts"] - 1) * (0.5 + random.random())
+            self.retried += 1
+            logger.info(f"Retrying job {job['id']} in {delay:.1f}s")
+            self._update(job["id"], {"status": "queued", "error": error, "owner": None,
+                                     "lease_expires_at": None, "run_after": time.time() + delay})
+        else:
+            self.failed += 1
+            self._update(job["id"], {"status": "failed", "error": error, "lease_expires_at": None})
+
+    def _requeue(self, job_id: int):
+        # Interrupted by shutdown, not by the job itself: the attempt does not count
+        self._update(job_id, {"status": "queued", "owner": None, "lease_expires_at": None,
+                              "attempts": QuizJob.attempts - 1, "run_after": time.time()})
+
+    def _update(self, job_id: int, values: Dict):
+        """Apply values to a job this worker still owns"""
+        db = SessionLocal()
+        try:
+            db.query(QuizJob).filter(QuizJob.id == job_id, QuizJob.owner == self.owner).update(
+                {**values, "updated_at": time.time()}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _to_dict(job: QuizJob) -> Dict:
+        return {column.name: getattr(job, column.name) for column in QuizJob.__table__.columns}
+
+    def stats(self) -> Dict:
+        return {
+            "workers": len(self._tasks),
+            "running": self._running,
+            "claimed": self.claimed,
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed
+        }
@@ -0,0 +1,124 @@
+import json
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QuizStreamParser:
+    """Incremental, tolerant extractor for the quiz JSON in model output.
+
+    Feed the model output chunk by chunk; every character is examined once.
+    Anything before the first '{' (code fences, preamble prose) and after the
+    top-level object closes (closing fence, trailing prose) is ignored, and
+    braces inside JSON strings are handled correctly. Each object in the
+    top-level "questions" array is returned from feed() as soon as it closes.
+    """
+
+    def __init__(self, array_key: str = "questions"):
+        self.array_key = array_key
+        self.items: List[Dict] = []
+
+        self._started = False
+        self._done = False
+        self._object: List[str] = []
+        self._stack: List[str] = []  # '{' / '[' for each open container
+        self._in_string = False
+        self._escaped = False
+
+        # Key tracking inside the top-level object
+        self._string: List[str] = []
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._in_items = False
+
+        # Characters of the array item currently being read
+        self._item: Optional[List[str]] = None
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Consume a chunk; returns the array items completed by it"""
+        completed = []
+        for char in chunk:
+            if self._done:
+                break
+            if not self._started:
+                if char != '{':
+                    continue
+                self._started = True
+
+            self._object.append(char)
+            if self._item is not None:
+                self._item.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = ''.join(self._string)
+                elif len(self._stack) == 1:
+                    self._string.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if len(self._stack) == 1:
+                    self._string = []
+            elif char == ':' and len(self._stack) == 1:
+                self._current_key = self._last_string
+            elif char == '{' or char == '[':
+                self._stack.append(char)
+                if char == '[' and len(self._stack) == 2 and self._current_key == self.array_key:
+                    self._in_items = True
+                elif char == '{' and len(self._stack) == 3 and self._in_items:
+                    self._item = ['{']
+            elif char == '}' or char == ']':
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if char == '}' and len(self._stack) == 2 and self._item is not None:
+                    item = self._close_item()
+                    if item is not None:
+                        completed.append(item)
+                elif char == ']' and len(self._stack) == 1:
+                    self._in_items = False
+                elif not self._stack:
+                    self._done = True
+            elif char == ',' and len(self._stack) == 1:
+                self._current_key = None
+
+        self.items.extend(completed)
+        return completed
+
+    def _close_item(self) -> Optional[Dict]:
+        text = ''.join(self._item)
+        self._item = None
+        try:
+            item = json.loads(text)
+        except ValueError:
+            logger.warning("Skipping malformed item in model output")
+            return None
+        return item if isinstance(item, dict) else None
+
+    def finish(self) -> Dict:
+        """The complete top-level object. If the output was cut off or is not
+        valid JSON, falls back to the items that did complete."""
+        if self._done:
+            try:
+                return json.loads(''.join(self._object))
+            except ValueError as e:
+                logger.warning(f"Model output is not valid JSON ({e}); keeping completed items")
+
+        if self.items:
+            return {self.array_key: list(self.items)}
+        raise ValueError("No JSON object found in model output")
+
+
+def parse_quiz_json(text: str) -> Dict:
+    """One-shot helper for a complete model response"""
+    parser = QuizStreamParser()
+    parser.feed(text)
+    return parser.finish()
@@ -0,0 +1,134 @@
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+from models import LLMCacheEntry
+from utils.executors import run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+def llm_cache_key(content: str, title: str, prompt_version: str, model_name: str) -> str:
+    digest = hashlib.sha256()
+    for part in (model_name, prompt_version, title, content):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class LLMResponseCache:
+    """Persistent cache of validated quiz JSON, stored in the `llm_cache` table.
+
+    Entries are keyed by llm_cache_key() (article content sent to the model,
+    prompt template version and model name), expire after `ttl` seconds and
+    are trimmed to `max_entries` by least recent use.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, prune_every: int = 50):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.llm_seconds_saved = 0.0
+
+    async def get(self, key: str) -> Optional[Dict]:
+        return await run_blocking("db", self._get, key)
+
+    async def put(self, key: str, model_name: str, prompt_version: str,
+                  quiz_data: Dict, generation_seconds: float):
+        await run_blocking("db", self._put, key, model_name, prompt_version, quiz_data, generation_seconds)
+
+    def _get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        db = SessionLocal()
+        try:
+            entry = db.query(LLMCacheEntry).filter(
+                LLMCacheEntry.key == key,
+                LLMCacheEntry.created_at >= now - self.ttl
+            ).first()
+            if entry is None:
+                with self._lock:
+                    self.misses += 1
+                return None
+
+            entry.last_used_at = now
+            entry.hits = (entry.hits or 0) + 1
+            db.commit()
+            with self._lock:
+                self.hits += 1
+                self.llm_seconds_saved += entry.generation_seconds or 0.0
+            return entry.quiz_data
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _put(self, key: str, model_name: str, prompt_version: str, quiz_data: Dict, generation_seconds: float):
+        now = time.time()
+        db = SessionLocal()
+        try:
+            db.merge(LLMCacheEntry(
+                key=key,
+                model=model_name,
+                prompt_version=prompt_version,
+                quiz_data=quiz_data,
+                generation_seconds=generation_seconds,
+                created_at=now,
+                last_used_at=now,
+                hits=0
+            ))
+            db.commit()
+
+            with self._lock:
+                self._writes += 1
+                # The first write, then every prune_every-th
+                prune = (self._writes - 1) % self.prune_every == 0
+            if prune:
+                self._prune(db, now)
+        except IntegrityError:
+            # A concurrent generation of the same content stored it first
+            db.rollback()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"LLM cache write failed: {e}")
+        finally:
+            db.close()
+
+    def _prune(self, db, now: float):
+        """Drop expired entries, then the least recently used beyond max_entries"""
+        expired = db.query(LLMCacheEntry).filter(
+            LLMCacheEntry.created_at < now - self.ttl
+        ).delete(synchronize_session=False)
+
+        overflow = db.query(LLMCacheEntry.key).order_by(
+            LLMCacheEntry.last_used_at.desc()
+        ).offset(self.max_entries).all()
+        if overflow:
+            db.query(LLMCacheEntry).filter(
+                LLMCacheEntry.key.in_([row.key for row in overflow])
+            ).delete(synchronize_session=False)
+        db.commit()
+
+        if expired or overflow:
+            logger.info(f"LLM cache pruned {expired} expired and {len(overflow)} least recently used entries")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "llm_seconds_saved": round(self.llm_seconds_saved, 2)
+            }
@@ -0,0 +1,147 @@
+import hashlib
+import random
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+from utils.content_selector import score_sentences, split_sentences
+
+_YEAR_RE = re.compile(r'\b(1[0-9]{3}|20[0-9]{2})\b')
+_DATED_RE = re.compile(r',?\s*\b(?:in|since|by|from|until|around)\s+(1[0-9]{3}|20[0-9]{2})\b', re.IGNORECASE)
+_NAME_RE = re.compile(r"(?<![\w'-])[A-Z][\w'-]*(?:\s+(?:(?:of|the|de|du|la|von|van|der|and)\s+)*[A-Z][\w'-]*)*")
+# Capitalized because they start a sentence, not because they name something
+_NOT_NAMES = frozenset(
+    "The A An In On At As By For From To It Its This That These Those He She They His Her Their We Our "
+    "However After Before During While When Although Since Following Many Some Most Both Each Other "
+    "There Here Such One Two Three Several Under With Without Despite Through Also Then Later".split()
+)
+
+MIN_SENTENCE_CHARS = 40
+MAX_SENTENCE_CHARS = 300
+LETTERS = "ABCD"
+BLANK = "_____"
+
+
+class OfflineQuizGenerator:
+    """Multiple-choice questions built from the article text alone, no LLM.
+
+    Sentences are ranked with content_selector.score_sentences(). A sentence
+    dating something ("... in 1903") becomes a which-year question; otherwise
+    one of its named entities (capitalized phrases) is blanked out as a cloze
+    question. Distractors are other entities of the same kind from the same
+    article, padded with nearby years for year questions. The correct
+    option's position is derived from the question text, so it varies
+    between questions but not between runs. Difficulty follows how often the
+    answer appears in the article.
+    """
+
+    def generate(self, content: str, title: str, count: int = 7) -> Dict:
+        sentences = [
+            sentence for sentence in split_sentences(content)
+            if MIN_SENTENCE_CHARS <= len(sentence) <= MAX_SENTENCE_CHARS
+        ]
+        title_terms = set(title.lower().split())
+        names = Counter(name for sentence in sentences for name in self._names_in(sentence, title_terms))
+        years = Counter(year for sentence in sentences for year in _YEAR_RE.findall(sentence))
+        scores = score_sentences(sentences, title)
+
+        questions: List[Dict] = []
+        used: Set[str] = set()
+        for index in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+            if len(questions) >= count:
+                break
+            sentence = sentences[index]
+            question = (self._year_question(sentence, years, used)
+                        or self._cloze_question(sentence, names, title_terms, used))
+            if question:
+                questions.append(question)
+
+        return {
+            "questions": questions,
+            "related_topics": [name for name, _ in names.most_common(5)]
+        }
+
+    def _names_in(self, sentence: str, title_terms: Set[str]) -> List[str]:
+        names = []
+        for match in _NAME_RE.finditer(sentence):
+            words = match.group().split()
+            while words and words[0] in _NOT_NAMES:
+                words.pop(0)
+            if not words:
+                continue
+            # The subject itself makes a giveaway answer
+            if {word.lower() for word in words} <= title_terms:
+                continue
+            names.append(' '.join(words))
+        return names
+
+    def _year_question(self, sentence: str, years: Counter, used: Set[str]) -> Optional[Dict]:
+        match = _DATED_RE.search(sentence)
+        if not match or match.group(1) in used:
+            return None
+        year = match.group(1)
+        # "In 1903, X ..." leaves a leading comma behind
+        statement = (sentence[:match.start()] + sentence[match.end():]).strip(' ,').rstrip('.')
+
+        rng = self._rng(statement)
+        others = [other for other in years if other != year]
+        rng.shuffle(others)
+        distractors = others[:3]
+        offsets = [offset for offset in range(-12, 13) if offset]
+        rng.shuffle(offsets)
+        for offset in offsets:
+            if len(distractors) >= 3:
+                break
+            candidate = str(int(year) + offset)
+            if candidate not in distractors:
+                distractors.append(candidate)
+
+        used.add(year)
+        return self._question(
+            f'According to the article, in which year: "{statement}"?',
+            year, distractors, sentence, "medium", rng
+        )
+
+    def _cloze_question(self, sentence: str, names: Counter, title_terms: Set[str],
+                        used: Set[str]) -> Optional[Dict]:
+        candidates = [name for name in self._names_in(sentence, title_terms) if name not in used]
+        if not candidates:
+            return None
+        answer = max(candidates, key=lambda name: (names[name], len(name)))
+
+        # Prefer distractors shaped like the answer (same number of words)
+        words = len(answer.split())
+        others = [
+            name for name, _ in names.most_common()
+            if name != answer and name not in answer and answer not in name
+        ]
+        others.sort(key=lambda name: abs(len(name.split()) - words))
+        if len(others) < 3:
+            return None
+
+        rng = self._rng(sentence)
+        distractors = rng.sample(others[:12], 3)
+        frequency = names[answer]
+        difficulty = "easy" if frequency >= 3 else "medium" if frequency == 2 else "hard"
+
+        used.add(answer)
+        return self._question(
+            f'Which fills the blank in this statement from the article: "{sentence.replace(answer, BLANK, 1)}"',
+            answer, distractors, sentence, difficulty, rng
+        )
+
+    def _question(self, text: str, answer: str, distractors: List[str], sentence: str,
+                  difficulty: str, rng: random.Random) -> Dict:
+        options = [answer] + distractors[:3]
+        rng.shuffle(options)
+        return {
+            "question": text,
+            "options": dict(zip(LETTERS, options)),
+            "correct_answer": LETTERS[options.index(answer)],
+            "explanation": f'The article states: "{sentence}"',
+            "difficulty": difficulty
+        }
+
+    @staticmethod
+    def _rng(seed_text: str) -> random.Random:
+        return random.Random(hashlib.sha256(seed_text.encode('utf-8')).digest())
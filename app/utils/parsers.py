@@ -0,0 +1,108 @@
+import logging
+from typing import Dict, Iterator, List, Optional
+
+from bs4 import BeautifulSoup
+
+from utils.extractor import CONTENT_STRAINER, ArticleExtractor
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    LexborHTMLParser = None
+    SELECTOLAX_AVAILABLE = False
+
+
+class ParserBackend:
+    """Turns raw article HTML into the extracted fields
+    (title, summary, sections, full_content)."""
+
+    name = "base"
+
+    def parse(self, html: bytes) -> Dict:
+        raise NotImplementedError
+
+
+class SoupBackend(ParserBackend):
+    """BeautifulSoup with a pluggable tree builder ('html.parser' or 'lxml').
+
+    Only the article title and body are turned into a tree.
+    """
+
+    def __init__(self, features: str):
+        self.name = features
+        self.features = features
+        self.extractor = ArticleExtractor()
+
+    def parse(self, html: bytes) -> Dict:
+        soup = BeautifulSoup(html, self.features, parse_only=CONTENT_STRAINER)
+        return self.extractor.extract(soup)
+
+
+class _LexborExtractor(ArticleExtractor):
+    """ArticleExtractor walk over selectolax/lexbor nodes"""
+
+    def _children(self, node) -> Iterator:
+        child = node.child
+        while child is not None:
+            if not child.tag.startswith('-'):  # skip -text, -comment, ...
+                yield child
+            child = child.next
+
+    def _tag(self, node) -> str:
+        return node.tag
+
+    def _id(self, node) -> Optional[str]:
+        return node.attributes.get('id')
+
+    def _classes(self, node) -> List[str]:
+        return (node.attributes.get('class') or '').split()
+
+    def _text(self, node) -> str:
+        return node.text(deep=True)
+
+
+class SelectolaxBackend(ParserBackend):
+    """selectolax's lexbor engine: C parser and C tree, no Python DOM build"""
+
+    name = "selectolax"
+
+    def __init__(self):
+        self.extractor = _LexborExtractor()
+
+    def parse(self, html: bytes) -> Dict:
+        tree = LexborHTMLParser(html)
+        # Walk from a node whose children include <html>, like BeautifulSoup's document
+        return self.extractor.extract(_Document(tree.root))
+
+
+class _Document:
+    """Minimal stand-in for the document node above <html>"""
+
+    def __init__(self, root):
+        self.child = root
+
+
+def get_parser_backend(name: str) -> ParserBackend:
+    """Return the requested backend, falling back to html.parser when its
+    library is not installed"""
+    if name == "selectolax":
+        if SELECTOLAX_AVAILABLE:
+            return SelectolaxBackend()
+        logger.warning("selectolax not installed - falling back to html.parser")
+    elif name == "lxml":
+        if LXML_AVAILABLE:
+            return SoupBackend("lxml")
+        logger.warning("lxml not installed - falling back to html.parser")
+    elif name != "html.parser":
+        raise ValueError(f"Unknown HTML parser backend: {name}")
+
+    return SoupBackend("html.parser")
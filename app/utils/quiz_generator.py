@@ -1,215 +1,825 @@
-import os
-import logging
-import json
-import re
-from typing import Dict
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-load_dotenv()
-logger = logging.getLogger(__name__)
-
-class QuizGenerator:
-    def __init__(self):
-        self.api_key = os.getenv("GOOGLE_API_KEY")
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel('gemini-pro') if self.api_key else None
-        
-        self.prompt_template = """You are an expert quiz creator. Using ONLY the Wikipedia article text below, generate 5-7 high-quality multiple-choice questions.
-
-ARTICLE CONTENT:
-{article_text}
-
-INSTRUCTIONS:
-1. Create 5-7 multiple-choice questions based strictly on the provided article
-2. Each question must include:
-   - Clear, well-formulated question
-   - 4 answer options labeled A, B, C, D
-   - Correct answer (just the letter)
-   - Concise explanation (1-2 lines)
-   - Difficulty level: easy, medium, or hard
-3. Include 3 related Wikipedia topics mentioned in the text
-4. All answers must be factual and based ONLY on the provided text
-5. Questions should test comprehension of key concepts and facts
-
-OUTPUT FORMAT (JSON only):
-{
-  "questions": [
-    {
-      "question": "Question text?",
-      "options": {
-        "A": "Option A text",
-        "B": "Option B text", 
-        "C": "Option C text",
-        "D": "Option D text"
-      },
-      "correct_answer": "A",
-      "explanation": "Brief explanation of why this is correct",
-      "difficulty": "medium"
-    }
-  ],
-  "related_topics": ["Topic1", "Topic2", "Topic3"]
-}
-
-Generate the quiz now:"""
-
-    def generate_quiz(self, article_content: str) -> Dict:
-        """Generate quiz from article content using Google Gemini directly"""
-        try:
-            if not self.api_key:
-                logger.warning("No Google API key found, using enhanced fallback quiz")
-                return self._create_enhanced_fallback_quiz()
-
-            if not article_content or len(article_content.strip()) < 100:
-                raise ValueError("Article content too short for quiz generation")
-
-            logger.info("Generating quiz with Google Gemini...")
-            
-            # Limit content length to avoid token limits
-            limited_content = article_content[:6000]
-            
-            # Create prompt with article content
-            prompt = self.prompt_template.format(article_text=limited_content)
-            
-            # Generate quiz using Gemini directly
-            response = self.model.generate_content(prompt)
-            quiz_text = response.text
-            
-            logger.info(f"Raw AI response: {quiz_text[:200]}...")
-            
-            # Clean and parse the response
-            quiz_text = self._clean_response(quiz_text)
-            
-            # Parse JSON
-            try:
-                quiz_data = json.loads(quiz_text)
-                logger.info(f"Successfully parsed JSON with {len(quiz_data.get('questions', []))} questions")
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON parse error: {e}")
-                logger.error(f"Cleaned response: {quiz_text}")
-                quiz_data = self._create_enhanced_fallback_quiz()
-            
-            return self._validate_quiz_data(quiz_data)
-            
-        except Exception as e:
-            logger.error(f"Error generating quiz: {e}")
-            return self._create_enhanced_fallback_quiz()
-
-    def _clean_response(self, text: str) -> str:
-        """Clean the AI response to extract JSON"""
-        # Remove markdown code blocks
-        text = re.sub(r'```json\s*', '', text)
-        text = re.sub(r'```\s*', '', text)
-        
-        # Find JSON object
-        json_match = re.search(r'\{.*\}', text, re.DOTALL)
-        if json_match:
-            return json_match.group()
-        
-        return text.strip()
-
-    def _validate_quiz_data(self, quiz_data: Dict) -> Dict:
-        """Validate and ensure quiz data has proper structure"""
-        if "questions" not in quiz_data or not quiz_data["questions"]:
-            quiz_data["questions"] = self._create_enhanced_fallback_quiz()["questions"]
-        
-        # Ensure minimum 3 questions
-        if len(quiz_data["questions"]) < 3:
-            additional_questions = self._create_enhanced_fallback_quiz()["questions"]
-            quiz_data["questions"].extend(additional_questions[:3 - len(quiz_data["questions"])])
-        
-        # Validate each question
-        for i, question in enumerate(quiz_data["questions"]):
-            if "question" not in question or not question["question"]:
-                question["question"] = f"Question about the article content?"
-            
-            if "options" not in question or len(question["options"]) != 4:
-                question["options"] = {
-                    "A": "First option based on article",
-                    "B": "Second option based on article",
-                    "C": "Third option based on article", 
-                    "D": "Fourth option based on article"
-                }
-            
-            if "correct_answer" not in question or question["correct_answer"] not in ["A", "B", "C", "D"]:
-                question["correct_answer"] = "A"
-            
-            if "explanation" not in question or not question["explanation"]:
-                question["explanation"] = "This answer is correct based on the article content."
-            
-            if "difficulty" not in question or question["difficulty"] not in ["easy", "medium", "hard"]:
-                question["difficulty"] = "medium"
-        
-        if "related_topics" not in quiz_data or not quiz_data["related_topics"]:
-            quiz_data["related_topics"] = ["Knowledge", "Education", "Research"]
-        
-        return quiz_data
-
-    def _create_enhanced_fallback_quiz(self) -> Dict:
-        """Create better fallback quiz with more questions"""
-        return {
-            "questions": [
-                {
-                    "question": "What is the primary subject or topic covered in this Wikipedia article?",
-                    "options": {
-                        "A": "The main subject described in the article",
-                        "B": "A completely unrelated scientific field", 
-                        "C": "Historical events from a different era",
-                        "D": "Fictional characters and stories"
-                    },
-                    "correct_answer": "A",
-                    "explanation": "Wikipedia articles are organized around specific subjects and provide detailed information about them.",
-                    "difficulty": "easy"
-                },
-                {
-                    "question": "What characteristic makes Wikipedia a unique online resource?",
-                    "options": {
-                        "A": "It is collaboratively edited by volunteers worldwide",
-                        "B": "It requires expensive subscriptions to access",
-                        "C": "It contains only government-approved content",
-                        "D": "It is written by a single expert author"
-                    },
-                    "correct_answer": "A",
-                    "explanation": "Wikipedia's collaborative editing model allows continuous improvement by contributors globally.",
-                    "difficulty": "medium"
-                },
-                {
-                    "question": "How does Wikipedia ensure the reliability of its content?",
-                    "options": {
-                        "A": "Through citation requirements and community review",
-                        "B": "By having government certification",
-                        "C": "Through paid professional editors only",
-                        "D": "By limiting edits to academic experts"
-                    },
-                    "correct_answer": "A",
-                    "explanation": "Wikipedia uses citations and community monitoring to maintain content quality and accuracy.",
-                    "difficulty": "medium"
-                },
-                {
-                    "question": "What is a key advantage of Wikipedia's open editing model?",
-                    "options": {
-                        "A": "Rapid updates and corrections to information",
-                        "B": "Limited access to prevent errors",
-                        "C": "Strict government oversight",
-                        "D": "Paid content creation only"
-                    },
-                    "correct_answer": "A",
-                    "explanation": "The open editing allows quick updates when new information becomes available or errors are found.",
-                    "difficulty": "hard"
-                },
-                {
-                    "question": "Why is Wikipedia considered a valuable starting point for research?",
-                    "options": {
-                        "A": "It provides overviews and references to primary sources",
-                        "B": "It contains all original research needed",
-                        "C": "It is the final authority on all topics",
-                        "D": "It replaces the need for other sources"
-                    },
-                    "correct_answer": "A",
-                    "explanation": "Wikipedia offers comprehensive overviews and citations that can lead to more specialized sources.",
-                    "difficulty": "easy"
-                }
-            ],
-            "related_topics": ["Online Encyclopedia", "Collaborative Knowledge", "Digital Education"]
-        }
\ No newline at end of file
+import asyncio
+import os
+import logging
+import time
+import json
+import re
+from itertools import zip_longest
+from typing import AsyncIterator, Dict, List, Optional
+import google.generativeai as genai
+from dotenv import load_dotenv
+from google.api_core.exceptions import ResourceExhausted, ServerError
+
+import config
+from utils.circuit_breaker import CircuitBreakers, CircuitOpen, create_circuit_breakers
+from utils.content_selector import STOPWORDS, select_content
+from utils.executors import run_blocking
+from utils.hedging import create_llm_hedger
+from utils.json_stream import QuizStreamParser, parse_quiz_json
+from utils.llm_cache import LLMResponseCache, llm_cache_key
+from utils.offline_quiz import OfflineQuizGenerator
+from utils.rate_limiter import RateLimitExceeded, UpstreamLimiters, create_upstream_limiters
+from utils.variants import shuffle_options
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# quiz_data["source"]: only complete model output is reused for other requests;
+# offline fallbacks and partial results are served once and then regenerated
+SOURCE_LLM = "llm"
+SOURCE_PARTIAL = "partial"
+SOURCE_OFFLINE = "offline"
+
+_gemini_model = None
+_gemini_configured = False
+
+def get_gemini_model():
+    """Configure the Gemini SDK once per process and return the shared model.
+
+    genai.configure() rebuilds the SDK's clients (and their connections), so
+    calling it per request defeats connection reuse. Returns None when no API
+    key is set.
+    """
+    global _gemini_model, _gemini_configured
+    if not _gemini_configured:
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if api_key:
+            genai.configure(api_key=api_key)
+            _gemini_model = genai.GenerativeModel(config.GEMINI_MODEL)
+        _gemini_configured = True
+    return _gemini_model
+
+class QuizGenerator:
+    def __init__(self):
+        self.api_key = os.getenv("GOOGLE_API_KEY")
+        self.model = get_gemini_model()
+        
+        self.prompt_template = """You are an expert quiz creator. Using ONLY the Wikipedia article text below, generate 5-7 high-quality multiple-choice questions.
+
+ARTICLE CONTENT:
+{article_text}
+
+INSTRUCTIONS:
+1. Create 5-7 multiple-choice questions based strictly on the provided article
+2. Each question must include:
+   - Clear, well-formulated question
+   - 4 answer options labeled A, B, C, D
+   - Correct answer (just the letter)
+   - Concise explanation (1-2 lines)
+   - Difficulty level: easy, medium, or hard
+3. Include 3 related Wikipedia topics mentioned in the text
+4. All answers must be factual and based ONLY on the provided text
+5. Questions should test comprehension of key concepts and facts
+
+OUTPUT FORMAT (JSON only):
+{
+  "questions": [
+    {
+      "question": "Question text?",
+      "options": {
+        "A": "Option A text",
+        "B": "Option B text", 
+        "C": "Option C text",
+        "D": "Option D text"
+      },
+      "correct_answer": "A",
+      "explanation": "Brief explanation of why this is correct",
+      "difficulty": "medium"
+    }
+  ],
+  "related_topics": ["Topic1", "Topic2", "Topic3"]
+}
+
+Generate the quiz now:"""
+
+    def generate_quiz(self, article_content: str) -> Dict:
+        """Generate quiz from article content using Google Gemini directly"""
+        try:
+            if not self.api_key:
+                logger.warning("No Google API key found, using enhanced fallback quiz")
+                return self._create_enhanced_fallback_quiz()
+
+            if not article_content or len(article_content.strip()) < 100:
+                raise ValueError("Article content too short for quiz generation")
+
+            logger.info("Generating quiz with Google Gemini...")
+            
+            # Limit content length to avoid token limits
+            limited_content = article_content[:6000]
+            
+            # Create prompt with article content
+            prompt = self.prompt_template.format(article_text=limited_content)
+            
+            # Generate quiz using Gemini directly
+            response = self.model.generate_content(prompt)
+            quiz_text = response.text
+            
+            logger.info(f"Raw AI response: {quiz_text[:200]}...")
+            
+            # Clean and parse the response
+            quiz_text = self._clean_response(quiz_text)
+            
+            # Parse JSON
+            try:
+                quiz_data = json.loads(quiz_text)
+                logger.info(f"Successfully parsed JSON with {len(quiz_data.get('questions', []))} questions")
+            except json.JSONDecodeError as e:
+                logger.error(f"JSON parse error: {e}")
+                logger.error(f"Cleaned response: {quiz_text}")
+                quiz_data = self._create_enhanced_fallback_quiz()
+            
+            return self._validate_quiz_data(quiz_data)
+            
+        except Exception as e:
+            logger.error(f"Error generating quiz: {e}")
+            return self._create_enhanced_fallback_quiz()
+
+    def _clean_response(self, text: str) -> str:
+        """Clean the AI response to extract JSON"""
+        # Remove markdown code blocks
+        text = re.sub(r'```json\s*', '', text)
+        text = re.sub(r'```\s*', '', text)
+        
+        # Find JSON object
+        json_match = re.search(r'\{.*\}', text, re.DOTALL)
+        if json_match:
+            return json_match.group()
+        
+        return text.strip()
+
+    def _validate_quiz_data(self, quiz_data: Dict) -> Dict:
+        """Validate and ensure quiz data has proper structure"""
+        if "questions" not in quiz_data or not quiz_data["questions"]:
+            quiz_data["questions"] = self._create_enhanced_fallback_quiz()["questions"]
+        
+        # Ensure minimum 3 questions
+        if len(quiz_data["questions"]) < 3:
+            additional_questions = self._create_enhanced_fallback_quiz()["questions"]
+            quiz_data["questions"].extend(additional_questions[:3 - len(quiz_data["questions"])])
+        
+        # Validate each question
+        for i, question in enumerate(quiz_data["questions"]):
+            if "question" not in question or not question["question"]:
+                question["question"] = f"Question about the article content?"
+            
+            if "options" not in question or len(question["options"]) != 4:
+                question["options"] = {
+                    "A": "First option based on article",
+                    "B": "Second option based on article",
+                    "C": "Third option based on article", 
+                    "D": "Fourth option based on article"
+                }
+            
+            if "correct_answer" not in question or question["correct_answer"] not in ["A", "B", "C", "D"]:
+                question["correct_answer"] = "A"
+            
+            if "explanation" not in question or not question["explanation"]:
+                question["explanation"] = "This answer is correct based on the article content."
+            
+            if "difficulty" not in question or question["difficulty"] not in ["easy", "medium", "hard"]:
+                question["difficulty"] = "medium"
+        
+        if "related_topics" not in quiz_data or not quiz_data["related_topics"]:
+            quiz_data["related_topics"] = ["Knowledge", "Education", "Research"]
+        
+        return quiz_data
+
+    def _create_enhanced_fallback_quiz(self) -> Dict:
+        """Create better fallback quiz with more questions"""
+        return {
+            "questions": [
+                {
+                    "question": "What is the primary subject or topic covered in this Wikipedia article?",
+                    "options": {
+                        "A": "The main subject described in the article",
+                        "B": "A completely unrelated scientific field", 
+                        "C": "Historical events from a different era",
+                        "D": "Fictional characters and stories"
+                    },
+                    "correct_answer": "A",
+                    "explanation": "Wikipedia articles are organized around specific subjects and provide detailed information about them.",
+                    "difficulty": "easy"
+                },
+                {
+                    "question": "What characteristic makes Wikipedia a unique online resource?",
+                    "options": {
+                        "A": "It is collaboratively edited by volunteers worldwide",
+                        "B": "It requires expensive subscriptions to access",
+                        "C": "It contains only government-approved content",
+                        "D": "It is written by a single expert author"
+                    },
+                    "correct_answer": "A",
+                    "explanation": "Wikipedia's collaborative editing model allows continuous improvement by contributors globally.",
+                    "difficulty": "medium"
+                },
+                {
+                    "question": "How does Wikipedia ensure the reliability of its content?",
+                    "options": {
+                        "A": "Through citation requirements and community review",
+                        "B": "By having government certification",
+                        "C": "Through paid professional editors only",
+                        "D": "By limiting edits to academic experts"
+                    },
+                    "correct_answer": "A",
+                    "explanation": "Wikipedia uses citations and community monitoring to maintain content quality and accuracy.",
+                    "difficulty": "medium"
+                },
+                {
+                    "question": "What is a key advantage of Wikipedia's open editing model?",
+                    "options": {
+                        "A": "Rapid updates and corrections to information",
+                        "B": "Limited access to prevent errors",
+                        "C": "Strict government oversight",
+                        "D": "Paid content creation only"
+                    },
+                    "correct_answer": "A",
+                    "explanation": "The open editing allows quick updates when new information becomes available or errors are found.",
+                    "difficulty": "hard"
+                },
+                {
+                    "question": "Why is Wikipedia considered a valuable starting point for research?",
+                    "options": {
+                        "A": "It provides overviews and references to primary sources",
+                        "B": "It contains all original research needed",
+                        "C": "It is the final authority on all topics",
+                        "D": "It replaces the need for other sources"
+                    },
+                    "correct_answer": "A",
+                    "explanation": "Wikipedia offers comprehensive overviews and citations that can lead to more specialized sources.",
+                    "difficulty": "easy"
+                }
+            ],
+            "related_topics": ["Online Encyclopedia", "Collaborative Knowledge", "Digital Education"]
+        }
+
+class AdvancedQuizGenerator:
+    # Bump whenever _create_smart_prompt or the post-processing of its output
+    # changes so cached responses are not reused
+    PROMPT_VERSION = "smart-2"
+    # Same for _create_section_prompt and the section merge
+    SECTION_PROMPT_VERSION = "section-2"
+    # Sections shorter than this are not worth a call of their own
+    MIN_SECTION_CHARS = 300
+    # Questions sharing this fraction of their content words are duplicates,
+    # or the lower fraction when they also have the same correct answer
+    DUPLICATE_SIMILARITY = 0.8
+    SAME_ANSWER_SIMILARITY = 0.5
+
+    def __init__(self, llm_cache: Optional[LLMResponseCache] = None,
+                 limiters: Optional[UpstreamLimiters] = None,
+                 breakers: Optional[CircuitBreakers] = None):
+        self.api_key = os.getenv("GOOGLE_API_KEY")
+        self.timeout = config.LLM_TIMEOUT
+        self.model_name = config.GEMINI_MODEL
+        self.llm_cache = llm_cache
+        # Shared with every other caller of this model: rate, concurrency and 429 back-off
+        self.limiter = (limiters or create_upstream_limiters()).get(f"gemini:{self.model_name}")
+        # Timeouts and 5xx open it; while open, quizzes come from the cache or the offline generator
+        self.breaker = (breakers or create_circuit_breakers()).get(f"gemini:{self.model_name}")
+        self.hedger = create_llm_hedger()
+        self.offline = OfflineQuizGenerator()
+        self.model = get_gemini_model()
+        if not self.model:
+            logger.warning("No Google API key found - will use enhanced fallback quizzes")
+
+    async def warm_up(self):
+        """Open the Gemini connection before the first request needs it"""
+        if not self.model:
+            return
+        try:
+            await asyncio.wait_for(self.model.count_tokens_async("warm-up"), timeout=self.timeout)
+            logger.info("Gemini client warmed up")
+        except Exception as e:
+            logger.warning(f"Gemini warm-up failed (continuing): {e}")
+
+    async def generate_quiz(self, article_content: str, article_title: str = "", use_cache: bool = True):
+        """Generate 5-7 unique questions based on actual article content"""
+        try:
+            if not self.api_key or not self.model:
+                logger.info("Using offline extractive quiz generator")
+                return await self._offline_quiz(article_content, article_title)
+
+            if not article_content or len(article_content.strip()) < 100:
+                raise ValueError("Article content too short for quiz generation")
+
+            logger.info("Generating AI-powered quiz with Google Gemini...")
+            
+            # The most informative sentences within the prompt token budget
+            limited_content = select_content(article_content, config.PROMPT_CONTENT_TOKENS, article_title)
+            
+            # Same content, prompt and model: reuse the validated quiz
+            cache_key = llm_cache_key(limited_content, article_title, self.PROMPT_VERSION, self.model_name)
+            if self.llm_cache and use_cache:
+                cached = await self.llm_cache.get(cache_key)
+                if cached:
+                    logger.info("LLM cache hit - skipping Gemini call")
+                    cached["source"] = SOURCE_LLM
+                    return cached
+
+            prompt = self._create_smart_prompt(limited_content, article_title)
+            
+            # Generate quiz
+            started = time.perf_counter()
+            quiz_text = await self._generate_text(prompt)
+            generation_seconds = time.perf_counter() - started
+            
+            logger.info(f"AI Response received: {len(quiz_text)} characters")
+            
+            # Parse (a bad response raises and falls back below, uncached)
+            quiz_data = self._load_quiz_data(quiz_text, article_title)
+            quiz_data["source"] = SOURCE_LLM
+            
+            logger.info(f"Successfully generated {len(quiz_data['questions'])} questions")
+            if self.llm_cache:
+                await self.llm_cache.put(cache_key, self.model_name, self.PROMPT_VERSION, quiz_data, generation_seconds)
+            return quiz_data
+
+        except (RateLimitExceeded, ResourceExhausted, CircuitOpen) as e:
+            logger.warning(f"Gemini unavailable ({e}); using offline quiz")
+            return await self._offline_quiz(article_content, article_title)
+        except Exception as e:
+            logger.error(f"AI quiz generation failed: {e}")
+            return await self._offline_quiz(article_content, article_title)
+
+    async def stream_quiz(self, article_content: str, article_title: str = "",
+                          use_cache: bool = True) -> AsyncIterator[Dict]:
+        """Streaming variant of generate_quiz.
+
+        Yields {"event": "prompt_sent"}, then {"event": "question", "data": ...}
+        as soon as QuizStreamParser sees each question object close, and
+        finally {"event": "quiz", "data": quiz_data} with the validated quiz.
+        """
+        quiz_data = None
+        streamed: List[Dict] = []
+        try:
+            if not self.api_key or not self.model:
+                logger.info("Using offline extractive quiz generator")
+                quiz_data = await self._offline_quiz(article_content, article_title)
+            elif not article_content or len(article_content.strip()) < 100:
+                raise ValueError("Article content too short for quiz generation")
+            else:
+                limited_content = select_content(article_content, config.PROMPT_CONTENT_TOKENS, article_title)
+                cache_key = llm_cache_key(limited_content, article_title, self.PROMPT_VERSION, self.model_name)
+                if self.llm_cache and use_cache:
+                    quiz_data = await self.llm_cache.get(cache_key)
+
+                if quiz_data is None:
+                    prompt = self._create_smart_prompt(limited_content, article_title)
+                    yield {"event": "prompt_sent"}
+
+                    started = time.perf_counter()
+                    parser = QuizStreamParser()
+                    async for chunk in self._stream_text(prompt):
+                        for question in parser.feed(chunk):
+                            question = self._validate_quiz_structure({"questions": [question]}, article_title)["questions"][0]
+                            streamed.append(question)
+                            yield {"event": "question", "data": question}
+                    generation_seconds = time.perf_counter() - started
+
+                    try:
+                        # The client already has the streamed questions as validated: keep them
+                        # as sent and take only what they lack (trailing questions, topics)
+                        full = parser.finish()
+                        quiz_data = self._validate_loaded_quiz({
+                            "questions": streamed + list(full.get("questions") or [])[len(streamed):],
+                            "related_topics": full.get("related_topics")
+                        }, article_title)
+                        quiz_data["source"] = SOURCE_LLM
+                        if self.llm_cache:
+                            await self.llm_cache.put(cache_key, self.model_name, self.PROMPT_VERSION,
+                                                     quiz_data, generation_seconds)
+                    except Exception as e:
+                        if not streamed:
+                            raise
+                        # Keep the questions the client has already seen
+                        logger.warning(f"Full AI response did not parse ({e}); using streamed questions")
+                        quiz_data = self._validate_quiz_structure(
+                            {"questions": streamed, "source": SOURCE_PARTIAL}, article_title
+                        )
+
+        except Exception as e:
+            logger.error(f"AI quiz generation failed: {e}")
+            if streamed:
+                quiz_data = self._validate_quiz_structure(
+                    {"questions": streamed, "source": SOURCE_PARTIAL}, article_title
+                )
+            else:
+                quiz_data = await self._offline_quiz(article_content, article_title)
+
+        # Questions not streamed yet (fallback or cache hit) go out now
+        for question in quiz_data["questions"][len(streamed):]:
+            yield {"event": "question", "data": question}
+        yield {"event": "quiz", "data": quiz_data}
+
+    def generate_offline_quiz(self, article_content: str, article_title: str = "") -> dict:
+        """Extractive quiz built locally from the article text (no LLM call,
+        a few milliseconds); the generic quiz if the text yields no questions"""
+        try:
+            quiz_data = self.offline.generate(article_content or "", article_title)
+            if not quiz_data["questions"]:
+                raise ValueError("No extractable questions in article text")
+            logger.info(f"Built {len(quiz_data['questions'])} offline questions")
+            quiz_data = self._validate_loaded_quiz(quiz_data, article_title)
+        except Exception as e:
+            logger.warning(f"Offline quiz generation failed: {e}")
+            quiz_data = self._generate_smart_fallback_quiz(article_title)
+        quiz_data["source"] = SOURCE_OFFLINE
+        return quiz_data
+
+    async def _offline_quiz(self, article_content: str, article_title: str = "") -> dict:
+        """generate_offline_quiz on the scrape executor: it is CPU-bound and
+        must not stall the event loop when it stands in for Gemini"""
+        return await run_blocking("scrape", self.generate_offline_quiz, article_content, article_title)
+
+    async def generate_sectioned_quiz(self, article_data: Dict, use_cache: bool = True) -> Dict:
+        """Quiz covering the whole article rather than just its lead.
+
+        One Gemini call per selected section (at most SECTION_FANOUT, run
+        concurrently under the usual LLM cap), merged into one quiz with
+        near-duplicate questions removed and difficulties balanced. Articles
+        with fewer than two usable sections go through generate_quiz().
+        """
+        article_title = article_data["title"]
+        sections = self._select_sections(article_data.get("section_texts") or [])
+        if len(sections) < 2 or not self.api_key or not self.model:
+            return await self.generate_quiz(article_data["full_content"], article_title, use_cache=use_cache)
+
+        section_content = '\0'.join(f"{section['heading']}\n{section['text']}" for section in sections)
+        cache_key = llm_cache_key(section_content, article_title, self.SECTION_PROMPT_VERSION, self.model_name)
+        if self.llm_cache and use_cache:
+            cached = await self.llm_cache.get(cache_key)
+            if cached:
+                logger.info("LLM cache hit - skipping sectioned Gemini calls")
+                cached["source"] = SOURCE_LLM
+                return cached
+
+        logger.info(f"Generating AI-powered quiz over {len(sections)} sections...")
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(self._generate_section_questions(section, article_title) for section in sections),
+            return_exceptions=True
+        )
+        generation_seconds = time.perf_counter() - started
+
+        per_section: List[List[Dict]] = []
+        related_topics: List[str] = []
+        for section, result in zip(sections, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Section '{section['heading']}' generation failed: {result}")
+                continue
+            per_section.append(result["questions"])
+            related_topics.extend(topic for topic in result.get("related_topics") or [] if topic not in related_topics)
+
+        questions = self._merge_section_questions(per_section, config.SECTION_QUIZ_SIZE)
+        if not questions:
+            logger.error("AI quiz generation failed for every section")
+            return await self._offline_quiz(article_data["full_content"], article_title)
+
+        complete = len(per_section) == len(sections)
+        quiz_data = self._validate_loaded_quiz(
+            {"questions": questions, "related_topics": related_topics[:5]}, article_title
+        )
+        quiz_data["source"] = SOURCE_LLM if complete else SOURCE_PARTIAL
+        logger.info(f"Merged {len(quiz_data['questions'])} questions from {len(per_section)} sections "
+                    f"in {generation_seconds:.2f}s")
+        # A partial merge is served but not cached
+        if self.llm_cache and complete:
+            await self.llm_cache.put(cache_key, self.model_name, self.SECTION_PROMPT_VERSION,
+                                     quiz_data, generation_seconds)
+        return quiz_data
+
+    def _select_sections(self, section_texts: List[Dict]) -> List[Dict]:
+        """The lead plus the longest other sections, up to SECTION_FANOUT, in
+        article order, each cut down to its best sentences within
+        SECTION_CONTENT_TOKENS"""
+        usable = [section for section in section_texts if len(section["text"]) >= self.MIN_SECTION_CHARS]
+        if len(usable) > config.SECTION_FANOUT:
+            lead, rest = usable[0], usable[1:]
+            chosen = sorted(rest, key=lambda section: len(section["text"]), reverse=True)[:config.SECTION_FANOUT - 1]
+            usable = [lead] + [section for section in rest if section in chosen]
+
+        return [
+            {"heading": section["heading"],
+             "text": select_content(section["text"], config.SECTION_CONTENT_TOKENS, section["heading"])}
+            for section in usable
+        ]
+
+    async def _generate_section_questions(self, section: Dict, article_title: str) -> Dict:
+        prompt = self._create_section_prompt(section["text"], section["heading"], article_title,
+                                             config.SECTION_QUESTIONS)
+        quiz_data = parse_quiz_json(await self._generate_text(prompt))
+        questions = [question for question in quiz_data.get("questions") or [] if isinstance(question, dict)]
+        if not questions:
+            raise ValueError("No questions in response")
+
+        questions = self._validate_quiz_structure({"questions": questions}, article_title)["questions"]
+        for question in questions:
+            question["section"] = section["heading"]
+        return {"questions": questions, "related_topics": quiz_data.get("related_topics") or []}
+
+    def _merge_section_questions(self, per_section: List[List[Dict]], limit: int) -> List[Dict]:
+        """Drop near-duplicates (sections taken in turn, so no section loses all
+        of its questions to an earlier one), then pick medium/easy/hard in turn
+        so no difficulty dominates; the result keeps article order."""
+        unique = []  # (section index, position, question)
+        seen: List[tuple] = []  # (question terms, normalized correct answer)
+        for position, round_questions in enumerate(zip_longest(*per_section)):
+            for section_index, question in enumerate(round_questions):
+                if question is None:
+                    continue
+                terms = set(re.findall(r'\w{3,}', question["question"].lower())) - STOPWORDS
+                answer = str(question["options"].get(question["correct_answer"], "")).strip().lower()
+                if any(self._is_duplicate(terms, answer, other_terms, other_answer)
+                       for other_terms, other_answer in seen):
+                    logger.info(f"Dropping duplicate question: {question['question']}")
+                    continue
+                unique.append((section_index, position, question))
+                seen.append((terms, answer))
+
+        buckets: Dict[str, List] = {"easy": [], "medium": [], "hard": []}
+        for entry in unique:
+            buckets[entry[2]["difficulty"]].append(entry)
+
+        picked = []
+        while len(picked) < limit and any(buckets.values()):
+            for difficulty in ("medium", "easy", "hard"):
+                if buckets[difficulty] and len(picked) < limit:
+                    picked.append(buckets[difficulty].pop(0))
+
+        picked.sort(key=lambda entry: entry[:2])
+        return [question for _, _, question in picked]
+
+    def _is_duplicate(self, terms: set, answer: str, other_terms: set, other_answer: str) -> bool:
+        if not terms or not other_terms:
+            return False
+        similarity = len(terms & other_terms) / len(terms | other_terms)
+        if answer and answer == other_answer:
+            return similarity >= self.SAME_ANSWER_SIMILARITY
+        return similarity >= self.DUPLICATE_SIMILARITY
+
+    async def _stream_text(self, prompt: str) -> AsyncIterator[str]:
+        """Streamed Gemini call under the same limiter, breaker and timeout as _generate_text.
+
+        The timeout bounds each wait for the model (the first response, then
+        every next chunk) and is never applied around the yield: time the
+        consumer spends elsewhere (e.g. sending to a slow client) neither
+        ends the stream nor counts against the breaker.
+        """
+        self.breaker.before_call()
+        async with self.limiter.slot():
+            try:
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt, stream=True), timeout=self.timeout
+                )
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(anext(chunks), timeout=self.timeout)
+                    except StopAsyncIteration:
+                        break
+                    yield chunk.text
+            except ResourceExhausted:
+                self.limiter.penalize(config.THROTTLE_BACKOFF)
+                raise
+            except (asyncio.TimeoutError, ServerError):
+                self.breaker.record_failure()
+                raise
+        self.breaker.record_success()
+
+    async def _generate_text(self, prompt: str) -> str:
+        """Gemini completion for prompt, hedged when LLM_HEDGE is on.
+
+        The hedge only goes out if the limiter has capacity right now, so
+        hedging never queues behind (or delays) regular calls.
+        """
+        return await self.hedger.run(
+            lambda: self._call_model(prompt),
+            lambda: self._call_model(prompt, max_wait=0)
+        )
+
+    async def _call_model(self, prompt: str, max_wait: Optional[float] = None) -> str:
+        """Async Gemini call through the model's rate/concurrency limiter, with a per-call timeout.
+
+        Raises RateLimitExceeded when no slot frees up in time and CircuitOpen
+        while the model's breaker is open; a 429 pauses the model's limiter
+        for THROTTLE_BACKOFF seconds. Timeouts and 5xx count against the
+        breaker. Generation is not retried here: the offline quiz is the
+        fallback.
+        """
+        self.breaker.before_call()
+        async with self.limiter.slot(max_wait):
+            try:
+                response = await asyncio.wait_for(self.model.generate_content_async(prompt), timeout=self.timeout)
+            except ResourceExhausted:
+                self.limiter.penalize(config.THROTTLE_BACKOFF)
+                raise
+            except (asyncio.TimeoutError, ServerError):
+                self.breaker.record_failure()
+                raise
+        self.breaker.record_success()
+        return response.text
+
+    def _create_smart_prompt(self, content: str, title: str) -> str:
+        """Create a detailed prompt for better question generation"""
+        return f"""You are an expert quiz creator and educator. Create 5-7 high-quality multiple-choice questions based EXCLUSIVELY on this Wikipedia article.
+
+ARTICLE TITLE: {title}
+ARTICLE CONTENT:
+{content}
+
+CRITICAL INSTRUCTIONS:
+1. Generate 5-7 UNIQUE questions that test REAL understanding of the article
+2. Each question MUST be directly based on specific facts from the article
+3. Questions should cover different aspects: definitions, facts, relationships, applications
+4. Make options plausible but only ONE correct based on the article
+5. Include varied difficulty levels
+
+REQUIRED FORMAT (JSON only):
+{{
+  "questions": [
+    {{
+      "question": "Specific question based on article facts?",
+      "options": {{
+        "A": "Correct answer from article",
+        "B": "Plausible but incorrect alternative",
+        "C": "Another incorrect alternative", 
+        "D": "Final incorrect alternative"
+      }},
+      "correct_answer": "A",
+      "explanation": "Specific reference to article content explaining why this is correct",
+      "difficulty": "easy/medium/hard"
+    }}
+  ],
+  "related_topics": ["SpecificTopic1", "SpecificTopic2", "SpecificTopic3"]
+}}
+
+IMPORTANT: Questions MUST be specific to this article, not generic. Focus on unique facts about {title}.
+"""
+
+    def _create_section_prompt(self, content: str, heading: str, title: str, count: int) -> str:
+        """Prompt for a few questions on one section of the article"""
+        return f"""You are an expert quiz creator and educator. Create {count} high-quality multiple-choice questions based EXCLUSIVELY on this section of a Wikipedia article.
+
+ARTICLE TITLE: {title}
+SECTION: {heading}
+SECTION CONTENT:
+{content}
+
+CRITICAL INSTRUCTIONS:
+1. Generate {count} UNIQUE questions about specific facts in this section
+2. Make options plausible but only ONE correct based on the section
+3. Include varied difficulty levels
+
+REQUIRED FORMAT (JSON only):
+{{
+  "questions": [
+    {{
+      "question": "Specific question based on section facts?",
+      "options": {{
+        "A": "Correct answer from the section",
+        "B": "Plausible but incorrect alternative",
+        "C": "Another incorrect alternative",
+        "D": "Final incorrect alternative"
+      }},
+      "correct_answer": "A",
+      "explanation": "Specific reference to the section explaining why this is correct",
+      "difficulty": "easy/medium/hard"
+    }}
+  ],
+  "related_topics": ["SpecificTopic1", "SpecificTopic2"]
+}}
+"""
+
+    def _parse_quiz_data(self, text: str, article_title: str) -> dict:
+        """Parse and validate quiz data"""
+        try:
+            return self._load_quiz_data(text, article_title)
+        except Exception as e:
+            logger.error(f"Failed to parse AI response: {e}")
+            return self._generate_smart_fallback_quiz(article_title)
+
+    def _load_quiz_data(self, text: str, article_title: str) -> dict:
+        """Parse and validate quiz data, raising if the response is unusable"""
+        # Tolerates code fences and prose around the JSON object
+        return self._validate_loaded_quiz(parse_quiz_json(text), article_title)
+
+    def _validate_loaded_quiz(self, quiz_data: dict, article_title: str) -> dict:
+        # Validate structure
+        if "questions" not in quiz_data or not quiz_data["questions"]:
+            raise ValueError("No questions in response")
+
+        # Ensure minimum 3 questions
+        if len(quiz_data["questions"]) < 3:
+            logger.warning(f"Only {len(quiz_data['questions'])} questions generated, adding fallback questions")
+            fallback = self._generate_smart_fallback_quiz(article_title)
+            quiz_data["questions"].extend(fallback["questions"][:5 - len(quiz_data["questions"])])
+
+        return self._validate_quiz_structure(quiz_data, article_title)
+
+    def _validate_quiz_structure(self, quiz_data: dict, article_title: str) -> dict:
+        """Ensure quiz data has proper structure"""
+        # Ensure questions exist
+        if "questions" not in quiz_data:
+            quiz_data["questions"] = []
+        
+        # Validate each question
+        for i, question in enumerate(quiz_data["questions"]):
+            # Ensure required fields
+            if "question" not in question or not question["question"].strip():
+                question["question"] = f"What is a key fact about {article_title}?"
+            
+            if "options" not in question or len(question["options"]) != 4:
+                question["options"] = {
+                    "A": f"A key fact about {article_title}",
+                    "B": "An incorrect alternative",
+                    "C": "Another incorrect option", 
+                    "D": "Final incorrect option"
+                }
+            
+            if "correct_answer" not in question or question["correct_answer"] not in ["A", "B", "C", "D"]:
+                question["correct_answer"] = "A"
+            
+            if "explanation" not in question or not question["explanation"].strip():
+                question["explanation"] = f"This is correct based on the Wikipedia article about {article_title}."
+            
+            if "difficulty" not in question or question["difficulty"] not in ["easy", "medium", "hard"]:
+                question["difficulty"] = "medium" if i % 2 == 0 else "easy"
+
+            # The model (and the fallback) put the right answer under "A"; spread it deterministically
+            shuffle_options(question)
+        
+        # Ensure related topics
+        if "related_topics" not in quiz_data or not quiz_data["related_topics"]:
+            quiz_data["related_topics"] = [article_title, "Knowledge", "Research"]
+        
+        return quiz_data
+
+    def _generate_smart_fallback_quiz(self, article_title: str) -> dict:
+        """Generate context-aware fallback questions"""
+        base_questions = [
+            {
+                "question": f"What is the primary focus or subject of the Wikipedia article about {article_title}?",
+                "options": {
+                    "A": f"The main topic: {article_title} and its significance",
+                    "B": "A completely unrelated scientific concept",
+                    "C": "Historical events from a different time period", 
+                    "D": "Fictional stories and characters"
+                },
+                "correct_answer": "A",
+                "explanation": f"The article specifically focuses on {article_title} and provides detailed information about it.",
+                "difficulty": "easy"
+            },
+            {
+                "question": f"What type of information would you expect to find in this Wikipedia article about {article_title}?",
+                "options": {
+                    "A": "Comprehensive facts, history, and context about the subject",
+                    "B": "Personal opinions and anecdotes",
+                    "C": "Advertising and promotional content",
+                    "D": "Fictional narratives and stories"
+                },
+                "correct_answer": "A",
+                "explanation": "Wikipedia articles provide factual, well-researched information with proper citations.",
+                "difficulty": "easy"
+            },
+            {
+                "question": f"How does Wikipedia ensure the accuracy of information about topics like {article_title}?",
+                "options": {
+                    "A": "Through community editing, citations, and reliable sources",
+                    "B": "Government verification and approval",
+                    "C": "Paid expert reviews only",
+                    "D": "Automatic computer generation"
+                },
+                "correct_answer": "A",
+                "explanation": "Wikipedia uses collaborative editing and requires reliable sources to maintain accuracy.",
+                "difficulty": "medium"
+            },
+            {
+                "question": f"Why might {article_title} be considered an important topic for a Wikipedia article?",
+                "options": {
+                    "A": "It represents significant knowledge worth documenting and sharing",
+                    "B": "It is trending on social media",
+                    "C": "It was randomly selected",
+                    "D": "It supports commercial interests"
+                },
+                "correct_answer": "A",
+                "explanation": "Wikipedia documents notable topics that have verifiable significance and reliable sources.",
+                "difficulty": "medium"
+            },
+            {
+                "question": f"What makes Wikipedia's coverage of {article_title} valuable for learners and researchers?",
+                "options": {
+                    "A": "It provides a comprehensive starting point with references for deeper exploration",
+                    "B": "It contains all possible information on the topic",
+                    "C": "It replaces the need for other information sources",
+                    "D": "It offers personalized learning paths"
+                },
+                "correct_answer": "A",
+                "explanation": "Wikipedia offers overviews with citations that help guide further research and learning.",
+                "difficulty": "hard"
+            }
+        ]
+        
+        return {
+            "questions": [shuffle_options(question) for question in base_questions],
+            "related_topics": [article_title, "Online Encyclopedia", "Knowledge Base"]
+        }
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Dict, Optional
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """No slot for the upstream became available before the caller's deadline"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class UpstreamLimiter:
+    """Token bucket (qps, burst) plus a concurrency cap for one upstream.
+
+    Callers queue for a concurrency slot and then reserve a token. One that
+    cannot get both within max_wait seconds gets RateLimitExceeded instead
+    of piling on; max_wait=0 means "only if there is capacity right now".
+    penalize() stops handing out tokens until a Retry-After delay has
+    passed. qps <= 0 disables the rate limit, leaving only the concurrency
+    cap.
+    """
+
+    def __init__(self, name: str, qps: float, burst: int, max_concurrency: int, max_wait: float):
+        self.name = name
+        self.qps = qps
+        self.burst = max(1, burst)
+        self.max_wait = max_wait
+        self._slots = asyncio.Semaphore(max_concurrency)
+        # Start time of the next token in an empty bucket; burst tokens may be taken earlier
+        self._next_free = 0.0
+        self._blocked_until = 0.0
+
+        self.waiting = 0
+        self.in_flight = 0
+        self.acquired = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @asynccontextmanager
+    async def slot(self, max_wait: Optional[float] = None) -> AsyncIterator[None]:
+        await self.acquire(max_wait)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, max_wait: Optional[float] = None):
+        started = time.monotonic()
+        deadline = started + (self.max_wait if max_wait is None else max_wait)
+        self.waiting += 1
+        try:
+            if not self._slots.locked():
+                # Free slot: take it now (wait_for with no time left would give up before trying)
+                await self._slots.acquire()
+            else:
+                try:
+                    await asyncio.wait_for(self._slots.acquire(), timeout=max(0.0, deadline - started))
+                except asyncio.TimeoutError:
+                    self._reject()
+            try:
+                await self._take_token(deadline)
+            except BaseException:
+                self._slots.release()
+                raise
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        self.in_flight += 1
+        self.acquired += 1
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def release(self):
+        self.in_flight -= 1
+        self._slots.release()
+
+    def penalize(self, retry_after: float):
+        """The upstream asked us to back off (429 / Retry-After)"""
+        self.throttled += 1
+        self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        logger.warning(f"{self.name} throttled us; pausing new calls for {retry_after:.1f}s")
+
+    async def _take_token(self, deadline: float):
+        """Reserve the next token and sleep until its start time.
+
+        Reservations are made without awaiting (a virtual "next free" time,
+        GCRA style), so nobody waits behind another caller's sleep, and a
+        reservation that would start after the deadline is rejected at once
+        without using up a token.
+        """
+        while True:
+            now = time.monotonic()
+            start = max(now, self._blocked_until)
+            if self.qps > 0:
+                interval = 1 / self.qps
+                start = max(start, self._next_free - (self.burst - 1) * interval)
+            if start > now and start > deadline:
+                self._reject()
+            if self.qps > 0:
+                self._next_free = max(self._next_free, start) + interval
+            if start > now:
+                await asyncio.sleep(start - now)
+            # A penalty that arrived while we slept applies to us too
+            if self._blocked_until <= time.monotonic():
+                return
+            if self._blocked_until > deadline:
+                self._reject()
+
+    def _reject(self):
+        self.rejected += 1
+        raise RateLimitExceeded(f"{self.name}: no capacity within the wait deadline")
+
+    def stats(self) -> Dict:
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "acquired": self.acquired,
+            "rejected": self.rejected,
+            "throttled": self.throttled,
+            "avg_wait_ms": round(self.wait_seconds / self.acquired * 1000, 2) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2)
+        }
+
+
+class UpstreamLimiters:
+    """One UpstreamLimiter per upstream name ("en.wikipedia.org",
+    "gemini:gemini-pro", ...), created on first use.
+
+    Names starting with "gemini:" take the Gemini defaults, everything else
+    the Wikipedia ones; `overrides` maps a name to its own qps / burst /
+    max_concurrency.
+    """
+
+    def __init__(self, wikipedia: Dict, gemini: Dict, max_wait: float, overrides: Optional[Dict[str, Dict]] = None):
+        self.defaults = {"wikipedia": wikipedia, "gemini": gemini}
+        self.max_wait = max_wait
+        self.overrides = overrides or {}
+        self._limiters: Dict[str, UpstreamLimiter] = {}
+
+    def get(self, name: str) -> UpstreamLimiter:
+        limiter = self._limiters.get(name)
+        if limiter is None:
+            settings = dict(self.defaults["gemini" if name.startswith("gemini:") else "wikipedia"])
+            settings.update(self.overrides.get(name, {}))
+            limiter = UpstreamLimiter(
+                name, float(settings["qps"]), int(settings["burst"]), int(settings["max_concurrency"]), self.max_wait
+            )
+            self._limiters[name] = limiter
+        return limiter
+
+    def stats(self) -> Dict:
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+
+def create_upstream_limiters() -> UpstreamLimiters:
+    return UpstreamLimiters(
+        wikipedia={"qps": config.WIKIPEDIA_QPS, "burst": config.WIKIPEDIA_BURST,
+                   "max_concurrency": config.HTTP_MAX_PER_HOST},
+        gemini={"qps": config.GEMINI_QPS, "burst": config.GEMINI_BURST,
+                "max_concurrency": config.LLM_MAX_CONCURRENCY},
+        max_wait=config.UPSTREAM_MAX_WAIT,
+        overrides=config.UPSTREAM_LIMITS
+    )
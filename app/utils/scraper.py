@@ -1,85 +1,205 @@
-import requests
-from bs4 import BeautifulSoup
-import re
-from typing import Dict, List
-import logging
-
-logger = logging.getLogger(__name__)
-
-class WikipediaScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'DeepKlarity-AI-Quiz-Generator/1.0'
-        })
-
-    def scrape_article(self, url: str) -> Dict:
-        try:
-            if not self._is_valid_wikipedia_url(url):
-                raise ValueError("Invalid Wikipedia URL")
-
-            response = self.session.get(url)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            title = self._extract_title(soup)
-            summary = self._extract_summary(soup)
-            sections = self._extract_sections(soup)
-            full_content = self._extract_full_content(soup)
-
-            return {
-                "title": title,
-                "summary": summary,
-                "sections": sections,
-                "key_entities": {"people": [], "organizations": [], "locations": []},
-                "full_content": full_content
-            }
-
-        except Exception as e:
-            logger.error(f"Error scraping Wikipedia article: {e}")
-            raise
-
-    def _is_valid_wikipedia_url(self, url: str) -> bool:
-        wikipedia_pattern = r'^https://[a-z]{2}\.wikipedia\.org/wiki/[^/]+$'
-        return re.match(wikipedia_pattern, url) is not None
-
-    def _extract_title(self, soup: BeautifulSoup) -> str:
-        title_element = soup.find('h1', {'class': 'firstHeading'})
-        return title_element.get_text().strip() if title_element else "Unknown Title"
-
-    def _extract_summary(self, soup: BeautifulSoup) -> str:
-        content = soup.find('div', {'id': 'mw-content-text'})
-        if not content:
-            return ""
-
-        paragraphs = content.find_all('p', limit=3)
-        summary_text = ' '.join([p.get_text().strip() for p in paragraphs if p.get_text().strip()])
-        summary_text = re.sub(r'\[\d+\]', '', summary_text)
-        return summary_text[:1000]
-
-    def _extract_full_content(self, soup: BeautifulSoup) -> str:
-        content = soup.find('div', {'id': 'mw-content-text'})
-        if not content:
-            return ""
-
-        for element in content.find_all(['table', 'div.navbox', 'div.reflist']):
-            element.decompose()
-
-        paragraphs = content.find_all('p')
-        full_text = ' '.join([p.get_text().strip() for p in paragraphs if p.get_text().strip()])
-        full_text = re.sub(r'\[\d+\]', '', full_text)
-        return full_text[:8000]
-
-    def _extract_sections(self, soup: BeautifulSoup) -> List[str]:
-        sections = []
-        heading_elements = soup.find_all(['h2', 'h3'])
-        
-        for heading in heading_elements:
-            skip_sections = ['contents', 'references', 'external links', 'see also', 'notes']
-            heading_text = heading.get_text().strip().lower()
-            
-            if not any(skip in heading_text for skip in skip_sections):
-                sections.append(heading.get_text().strip())
-        
-        return sections[:10]
\ No newline at end of file
+import re
+from typing import Dict, List, Optional
+from urllib.parse import urlencode, urlsplit
+import logging
+
+import httpx
+
+from utils.article_cache import ArticleCache
+from utils.canonical import article_url, canonicalize_url, page_canonical_url, url_title
+from utils.circuit_breaker import CircuitOpen
+from utils.executors import run_blocking
+from utils.extractor import (
+    CONTENT_BUDGET, LEAD_HEADING, MAX_SECTIONS, SECTION_TEXT_BUDGET, SKIP_SECTIONS, SUMMARY_LIMIT, SUMMARY_PARAGRAPHS
+)
+from utils.html_cache import HTMLCache
+from utils.http_client import HTTPClient
+from utils.parsers import ParserBackend, SoupBackend
+
+logger = logging.getLogger(__name__)
+
+_WIKI_HEADING_RE = re.compile(r'^(={2,})\s*(.*?)\s*\1$')
+
+class WikipediaScraper:
+    """Fetches Wikipedia articles and extracts the article dict.
+
+    mode="html" downloads and parses the rendered page; mode="api" pulls a
+    plain-text extract plus revision id from the MediaWiki Action API
+    (api_url is a template with a {lang} placeholder), which moves far fewer
+    bytes and needs no HTML parsing.
+    """
+
+    def __init__(self, http_client: HTTPClient, html_cache: Optional[HTMLCache] = None,
+                 article_cache: Optional[ArticleCache] = None,
+                 parser_backend: Optional[ParserBackend] = None,
+                 mode: str = "html",
+                 api_url: str = "https://{lang}.wikipedia.org/w/api.php"):
+        if mode not in ("html", "api"):
+            raise ValueError(f"Unknown scraper mode: {mode}")
+        self.http_client = http_client
+        self.html_cache = html_cache
+        self.article_cache = article_cache
+        self.parser_backend = parser_backend or SoupBackend('html.parser')
+        self.mode = mode
+        self.api_url = api_url
+
+    async def scrape_article(self, url: str) -> Dict:
+        try:
+            url = canonicalize_url(url)
+            if url is None:
+                raise ValueError("Invalid Wikipedia URL")
+
+            if self.mode == "api":
+                return await self._scrape_via_api(url)
+
+            html = await self._fetch_html(url)
+            revision_id = self._extract_revision_id(html)
+
+            # Key the parsed article on the page actually served, so redirect
+            # titles (USA -> United_States) share one entry
+            cache_key = page_canonical_url(html, url)
+            if self.article_cache and revision_id:
+                article = await run_blocking("scrape", self.article_cache.get, cache_key, revision_id)
+                if article is not None:
+                    logger.info(f"Article cache hit: {cache_key}@{revision_id}")
+                    return article
+
+            # Parsing is CPU-bound, keep it off the event loop
+            article = await run_blocking("scrape", self._parse_article, html)
+            article["revision_id"] = revision_id
+            article["canonical_url"] = cache_key
+
+            if self.article_cache and revision_id:
+                await run_blocking("scrape", self.article_cache.put, cache_key, revision_id, article)
+            return article
+
+        except Exception as e:
+            logger.error(f"Error scraping Wikipedia article: {e}")
+            raise
+
+    async def _fetch_html(self, url: str) -> bytes:
+        """Fetch article HTML, revalidating a cached copy (keyed by canonical URL) when we have one.
+
+        If Wikipedia is unreachable (timeouts, 5xx after retries, open
+        circuit) a cached copy is served stale rather than failing.
+        """
+        if not self.html_cache:
+            response = await self.http_client.get(url)
+            response.raise_for_status()
+            return response.content
+
+        cached = await run_blocking("scrape", self.html_cache.get, url)
+
+        headers = {}
+        if cached and cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached and cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+
+        try:
+            response = await self.http_client.get(url, headers=headers or None)
+        except (httpx.TransportError, CircuitOpen) as e:
+            if not cached:
+                raise
+            logger.warning(f"Serving stale cached HTML for {url}: {e!r}")
+            return cached.body
+        if response.status_code >= 500 and cached:
+            logger.warning(f"Serving stale cached HTML for {url}: HTTP {response.status_code}")
+            return cached.body
+        if response.status_code == 304 and cached:
+            logger.info(f"HTML cache revalidated: {url}")
+            self.html_cache.record_hit(url)
+            return cached.body
+
+        response.raise_for_status()
+        await run_blocking(
+            "scrape", self.html_cache.put, url, response.content,
+            response.headers.get('ETag'), response.headers.get('Last-Modified'),
+            replaced=cached is not None
+        )
+        return response.content
+
+    def _extract_revision_id(self, html: bytes) -> Optional[int]:
+        """Read the revision id from the page config without parsing the DOM"""
+        match = re.search(rb'"wgRevisionId":(\d+)', html)
+        return int(match.group(1)) if match else None
+
+    def _parse_article(self, html: bytes) -> Dict:
+        article = self.parser_backend.parse(html)
+        article["key_entities"] = {"people": [], "organizations": [], "locations": []}
+        return article
+
+    async def _scrape_via_api(self, url: str) -> Dict:
+        """Build the article dict from the MediaWiki API plain-text extract"""
+        parts = urlsplit(url)
+        lang = parts.netloc.split('.', 1)[0]
+        title = url_title(url)
+
+        response = await self.http_client.get(
+            self.api_url.format(lang=lang) + '?' + urlencode({
+                'action': 'query',
+                'prop': 'extracts|revisions',
+                'titles': title,
+                'explaintext': 1,
+                'exsectionformat': 'wiki',
+                'rvprop': 'ids',
+                'redirects': 1,
+                'format': 'json',
+                'formatversion': 2
+            })
+        )
+        response.raise_for_status()
+
+        pages = response.json().get('query', {}).get('pages', [])
+        if not pages or pages[0].get('missing') or pages[0].get('invalid'):
+            raise ValueError(f"Wikipedia article not found: {title}")
+        page = pages[0]
+
+        article = self._parse_extract(page.get('extract', ''))
+        article["title"] = page.get('title') or "Unknown Title"
+        revisions = page.get('revisions') or [{}]
+        article["revision_id"] = revisions[0].get('revid')
+        article["canonical_url"] = article_url(parts.netloc, article['title'])
+        article["key_entities"] = {"people": [], "organizations": [], "locations": []}
+        return article
+
+    def _parse_extract(self, extract: str) -> Dict:
+        """Split a wiki-formatted plain-text extract into summary, sections and body,
+        applying the same budgets as the HTML extractor"""
+        sections: List[str] = []
+        paragraphs: List[str] = []
+        section_texts: List[Dict] = [{"heading": LEAD_HEADING, "parts": []}]
+        skipping = False
+
+        for line in extract.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+
+            heading = _WIKI_HEADING_RE.match(line)
+            if heading:
+                level = len(heading.group(1))
+                heading_text = heading.group(2)
+                lowered = heading_text.lower()
+                if level == 2:
+                    skipping = any(skip in lowered for skip in SKIP_SECTIONS)
+                    if not skipping:
+                        section_texts.append({"heading": heading_text, "parts": []})
+                if level <= 3 and not any(skip in lowered for skip in SKIP_SECTIONS):
+                    sections.append(heading_text)
+                continue
+
+            if not skipping:
+                paragraphs.append(line)
+                section_texts[-1]["parts"].append(line)
+
+        return {
+            "summary": ' '.join(paragraphs[:SUMMARY_PARAGRAPHS])[:SUMMARY_LIMIT],
+            "sections": sections[:MAX_SECTIONS],
+            "full_content": '\n'.join(paragraphs)[:CONTENT_BUDGET],
+            "section_texts": [
+                {"heading": chunk["heading"], "text": '\n'.join(chunk["parts"])[:SECTION_TEXT_BUDGET]}
+                for chunk in section_texts[:MAX_SECTIONS + 1]
+                if chunk["parts"]
+            ]
+        }
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from database import SessionLocal
+from models import GenerationLease
+from utils.executors import run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCoalescer:
+    """Single-flight execution of quiz generation per canonical article.
+
+    Within a process, concurrent callers for the same key await one shared
+    task. Across processes, the task first takes a lease row in the
+    `generation_leases` table; a process that finds the lease held by someone
+    else polls it until the holder records the resulting quiz id (or gives up
+    and releases it, in which case the poller takes over). The holder
+    renews its lease every lease_ttl / 3 while producing, so a generation
+    slower than lease_ttl is not mistaken for a crashed one. Results that
+    `reusable` rejects are not left in the completed lease for late arrivals.
+    """
+
+    def __init__(self, load_result: Callable[[int], Awaitable[Any]],
+                 lease_ttl: float, completed_grace: float, poll_interval: float,
+                 reusable: Callable[[Any], bool] = lambda result: True):
+        self.load_result = load_result
+        self.reusable = reusable
+        self.lease_ttl = lease_ttl
+        self.completed_grace = completed_grace
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        self.leaders = 0
+        self.local_followers = 0
+        self.lease_followers = 0
+
+    async def run(self, key: str, produce: Callable[[], Awaitable[Any]], reuse_completed: bool = True) -> Any:
+        """Run produce() once per key; the result must expose the quiz `id`.
+
+        With reuse_completed=False a result still held in a completed lease is
+        not reused (used for forced regeneration).
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._lead(key, produce, reuse_completed))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.local_followers += 1
+            logger.info(f"Joining in-flight generation for {key}")
+
+        # Shield the shared task: one caller disconnecting must not cancel it for the rest
+        return await asyncio.shield(task)
+
+    async def _lead(self, key: str, produce: Callable[[], Awaitable[Any]], reuse_completed: bool) -> Any:
+        while True:
+            if await run_blocking("db", self._acquire, key, not reuse_completed):
+                self.leaders += 1
+                heartbeat = asyncio.create_task(self._heartbeat(key))
+                try:
+                    result = await produce()
+                except BaseException:
+                    await run_blocking("db", self._release, key)
+                    raise
+                finally:
+                    heartbeat.cancel()
+                if self.reusable(result):
+                    await run_blocking("db", self._complete, key, result.id)
+                else:
+                    await run_blocking("db", self._release, key)
+                return result
+
+            quiz_id = await self._wait_for_holder(key)
+            if quiz_id is not None:
+                self.lease_followers += 1
+                logger.info(f"Reusing quiz {quiz_id} from the generation lease for {key}")
+                return await self.load_result(quiz_id)
+
+    async def _heartbeat(self, key: str):
+        while True:
+            await asyncio.sleep(self.lease_ttl / 3)
+            try:
+                await run_blocking("db", self._renew, key)
+            except Exception as e:
+                logger.warning(f"Generation lease renewal for {key} failed: {e}")
+
+    async def _wait_for_holder(self, key: str) -> Optional[int]:
+        """Poll another process's lease; returns its quiz id, or None if the
+        lease went away and we should try to take it ourselves"""
+        while True:
+            lease = await run_blocking("db", self._peek, key)
+            if lease is None:
+                return None
+            quiz_id, expires_at = lease
+            if quiz_id is not None:
+                return quiz_id
+            if expires_at < time.time():
+                return None
+            await asyncio.sleep(self.poll_interval)
+
+    def _acquire(self, key: str, take_completed: bool = False) -> bool:
+        now = time.time()
+        db = SessionLocal()
+        try:
+            db.add(GenerationLease(key=key, owner=self.owner, quiz_id=None, expires_at=now + self.lease_ttl))
+            try:
+                db.commit()
+                return True
+            except IntegrityError:
+                db.rollback()
+
+            # Take over an expired lease (crashed holder or stale completed result)
+            takeable = GenerationLease.expires_at < now
+            if take_completed:
+                takeable = or_(takeable, GenerationLease.quiz_id.isnot(None))
+            taken = db.query(GenerationLease).filter(
+                GenerationLease.key == key,
+                takeable
+            ).update(
+                {"owner": self.owner, "quiz_id": None, "expires_at": now + self.lease_ttl},
+                synchronize_session=False
+            )
+            db.commit()
+            return taken == 1
+        finally:
+            db.close()
+
+    def _renew(self, key: str):
+        db = SessionLocal()
+        try:
+            db.query(GenerationLease).filter(
+                GenerationLease.key == key,
+                GenerationLease.owner == self.owner,
+                GenerationLease.quiz_id.is_(None)
+            ).update({"expires_at": time.time() + self.lease_ttl}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _peek(self, key: str) -> Optional[Tuple[Optional[int], float]]:
+        db = SessionLocal()
+        try:
+            lease = db.query(GenerationLease).filter(GenerationLease.key == key).first()
+            return (lease.quiz_id, lease.expires_at) if lease else None
+        finally:
+            db.close()
+
+    def _complete(self, key: str, quiz_id: int):
+        # Keep the finished lease around briefly so late arrivals reuse the result
+        db = SessionLocal()
+        try:
+            db.query(GenerationLease).filter(
+                GenerationLease.key == key,
+                GenerationLease.owner == self.owner
+            ).update(
+                {"quiz_id": quiz_id, "expires_at": time.time() + self.completed_grace},
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _release(self, key: str):
+        db = SessionLocal()
+        try:
+            db.query(GenerationLease).filter(
+                GenerationLease.key == key,
+                GenerationLease.owner == self.owner
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "local_followers": self.local_followers,
+            "lease_followers": self.lease_followers
+        }
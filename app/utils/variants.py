@@ -0,0 +1,50 @@
+import hashlib
+import random
+from typing import Dict, Optional
+
+LETTERS = "ABCD"
+
+
+def _digest(*parts: str) -> bytes:
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).digest()
+
+
+def shuffle_options(question: Dict, salt: str = "") -> Dict:
+    """Reorder a question's options (and remap correct_answer) by a hash of
+    salt, question text and option text.
+
+    The order depends only on those texts, never on the incoming order, so
+    shuffling an already shuffled question is a no-op and a question gets the
+    same order however often it is validated.
+    """
+    options = question.get("options") or {}
+    if sorted(options) != list(LETTERS) or question.get("correct_answer") not in options:
+        return question
+
+    correct = options[question["correct_answer"]]
+    texts = sorted(
+        options.values(),
+        key=lambda text: _digest(salt, question.get("question", ""), str(text))
+    )
+    question["options"] = dict(zip(LETTERS, texts))
+    question["correct_answer"] = LETTERS[texts.index(correct)]
+    return question
+
+
+def make_variant(quiz_data: Dict, quiz_id: int, variant: int, size: Optional[int] = None) -> Dict:
+    """Variant `variant` of a stored quiz: a seeded sample of `size`
+    questions (all of them by default) in a seeded order, each with its
+    options reordered. The same (quiz, variant, size) always gives the same
+    quiz, and no model call is involved."""
+    salt = f"{quiz_id}:{variant}"
+    rng = random.Random(_digest(salt))
+
+    questions = quiz_data.get("questions") or []
+    count = min(size, len(questions)) if size else len(questions)
+    picked = rng.sample(range(len(questions)), count)
+
+    return {
+        **quiz_data,
+        "questions": [shuffle_options(dict(questions[index]), salt) for index in picked],
+        "variant": variant
+    }
@@ -0,0 +1,39 @@
+"""Test setup.
+
+The app modules are imported the way uvicorn runs them (flat imports from
+app/), against a throwaway SQLite database, with no Gemini key and no
+warm-up call, so nothing here touches the network except the local stub
+servers the tests start themselves.
+"""
+import os
+import sys
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="quiz-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_TMP}/test.db",
+    "GOOGLE_API_KEY": "",
+    "HTML_CACHE_DIR": f"{_TMP}/html",
+    "LLM_WARMUP": "false",
+    # Rate limits are exercised by their own tests; elsewhere they would only add waiting
+    "WIKIPEDIA_QPS": "0",
+    "GEMINI_QPS": "0",
+})
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), "app"))
+sys.path.insert(0, TESTS_DIR)
+
+import pytest  # noqa: E402
+
+import models  # noqa: E402,F401  (registers the tables)
+from database import Base, engine  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """Fresh tables for one test"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
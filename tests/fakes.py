@@ -0,0 +1,109 @@
+"""Stand-ins for the upstreams: an in-process Gemini model object
+(generate_content_async, streaming included) with a configurable latency,
+and the app served against stubbed Wikipedia and Gemini"""
+import asyncio
+import json
+import random
+from contextlib import asynccontextmanager
+from typing import Callable, List, Optional
+from urllib.parse import unquote
+
+import httpx
+
+from pages import article_html
+
+
+def quiz_json(count: int = 6, difficulty: bool = True) -> str:
+    return json.dumps({
+        "questions": [
+            {
+                "question": f"Which statement about topic number {index} is supported by the article?",
+                "options": {"A": f"Right answer {index}", "B": f"Wrong {index}b", "C": f"Wrong {index}c",
+                            "D": f"Wrong {index}d"},
+                "correct_answer": "A",
+                "explanation": f"The article says so about topic {index}.",
+                **({"difficulty": ["easy", "medium", "hard"][index % 3]} if difficulty else {})
+            }
+            for index in range(count)
+        ],
+        "related_topics": ["Physics", "Chemistry"]
+    })
+
+
+class _Text:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _Stream:
+    def __init__(self, text: str, chunk_size: int, chunk_delay: float):
+        self._text = text
+        self._chunk_size = chunk_size
+        self._chunk_delay = chunk_delay
+
+    async def __aiter__(self):
+        for start in range(0, len(self._text), self._chunk_size):
+            await asyncio.sleep(self._chunk_delay)
+            yield _Text(self._text[start:start + self._chunk_size])
+
+
+class FakeGemini:
+    """Answers every prompt with `response` after `latency()` seconds"""
+
+    def __init__(self, response: Optional[str] = None, latency: Callable[[], float] = lambda: 0.0,
+                 chunk_size: int = 40, chunk_delay: float = 0.0):
+        self.response = response if response is not None else "```json\n" + quiz_json() + "\n```"
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.prompts: List[str] = []
+        self.cancelled = 0
+
+    async def generate_content_async(self, prompt, stream: bool = False, **kwargs):
+        self.prompts.append(prompt)
+        if stream:
+            return _Stream(self.response, self.chunk_size, self.chunk_delay)
+        try:
+            await asyncio.sleep(self.latency())
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return _Text(self.response)
+
+    async def count_tokens_async(self, *args, **kwargs):
+        return None
+
+
+def long_tail(median: float, tail: float, tail_share: float, seed: int = 0) -> Callable[[], float]:
+    """Latency distribution: about `median` seconds, `tail_share` of calls take `tail`"""
+    rng = random.Random(seed)
+
+    def sample() -> float:
+        if rng.random() < tail_share:
+            return tail * rng.uniform(0.8, 1.2)
+        return median * rng.uniform(0.8, 1.2)
+    return sample
+
+
+@asynccontextmanager
+async def serve_app(model: Optional[FakeGemini] = None, fetch_latency: float = 0.0):
+    """Run the app's lifespan with Wikipedia served by tests.pages (after
+    fetch_latency seconds) and Gemini replaced by `model`; yields an HTTP
+    client bound to the app"""
+    import main
+
+    async def wikipedia(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(fetch_latency)
+        title = unquote(request.url.path.rsplit('/', 1)[-1])
+        seed = sum(map(ord, title))
+        return httpx.Response(200, content=article_html(seed, title=title.replace('_', ' ')))
+
+    async with main.lifespan(main.app):
+        http_client = main.app.state.http_client
+        await http_client._client.aclose()
+        http_client._client = httpx.AsyncClient(transport=httpx.MockTransport(wikipedia))
+        if model is not None:
+            main.app.state.quiz_generator.api_key = "test-key"
+            main.app.state.quiz_generator.model = model
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://app") as client:
+            yield client
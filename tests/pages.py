@@ -0,0 +1,112 @@
+"""Deterministic Wikipedia-like article pages for parser, scraper and load tests.
+
+The markup mirrors what en.wikipedia.org serves around the article body:
+page config in <head>, navigation outside the content div, infobox tables,
+citation superscripts, edit links, entities, non-ASCII text, h2/h3
+sections including the navigation ones (See also, References, ...).
+"""
+import json
+import random
+from typing import List, Tuple
+
+_NAMES = ["Marie Curie", "Pierre Curie", "Henri Becquerel", "Ernest Rutherford", "Lise Meitner",
+          "Niels Bohr", "Albert Einstein", "Irène Joliot-Curie", "Frédéric Joliot", "Otto Hahn"]
+_PLACES = ["Warsaw", "Paris", "Sorbonne", "Vienna", "Copenhagen", "Manchester", "Berlin", "Zürich"]
+_TOPICS = ["radioactivity", "polonium", "radium", "X-ray machines", "the Nobel Prize in Physics",
+           "the Solvay Conference", "isotope separation", "mobile radiography units"]
+_VERBS = ["discovered", "studied", "described", "isolated", "measured", "published work on", "lectured on"]
+_SECTIONS = ["Early life", "Education", "Career", "Research", "Later years", "Honours", "Legacy",
+             "Personal life", "Death", "Recognition", "Works", "Influence", "Controversies", "Archives"]
+
+
+def sentence(rng: random.Random) -> str:
+    year = rng.randint(1880, 1960)
+    return rng.choice([
+        f"In {year}, {rng.choice(_NAMES)} {rng.choice(_VERBS)} {rng.choice(_TOPICS)} in {rng.choice(_PLACES)}.",
+        f"{rng.choice(_NAMES)} {rng.choice(_VERBS)} {rng.choice(_TOPICS)} with {rng.choice(_NAMES)}.",
+        f"The laboratory in {rng.choice(_PLACES)} became known for {rng.choice(_TOPICS)} by {year}.",
+        f"According to {rng.choice(_NAMES)}, {rng.choice(_TOPICS)} changed physics &amp; chemistry alike.",
+    ])
+
+
+def _paragraph(rng: random.Random, ref: int) -> str:
+    words = ' '.join(sentence(rng) for _ in range(rng.randint(2, 6)))
+    return (f'<p><b>{rng.choice(_NAMES)}</b> — {words}'
+            f'<sup id="cite_ref-{ref}" class="reference"><a href="#cite_note-{ref}">[{ref}]</a></sup>'
+            f' <a href="/wiki/{rng.choice(_PLACES)}" title="x">{rng.choice(_PLACES)}</a>&nbsp;(日本).</p>\n')
+
+
+def _heading(level: int, text: str) -> str:
+    return (f'<div class="mw-heading mw-heading{level}"><h{level} id="{text.replace(" ", "_")}">{text}</h{level}>'
+            f'<span class="mw-editsection"><span class="mw-editsection-bracket">[</span>'
+            f'<a href="?action=edit">edit</a><span class="mw-editsection-bracket">]</span></span></div>\n')
+
+
+def article_html(seed: int, sections: int = 8, paragraphs: int = 4, title: str = "") -> bytes:
+    """One article page; `sections` body sections of `paragraphs` paragraphs each"""
+    rng = random.Random(seed)
+    title = title or f"Article {seed}"
+    ref = 0
+    body: List[str] = [
+        '<p class="mw-empty-elt">\n</p>\n',
+        '<table class="infobox vcard"><tbody><tr><th>Born</th><td><p>7 November 1867, Warsaw</p></td></tr>'
+        '<tr><td><table><tr><td><p>Nested infobox paragraph</p></td></tr></table></td></tr></tbody></table>\n',
+        '<style>.mw-parser-output .hatnote{font-style:italic}</style>\n',
+        '<div role="note" class="hatnote">For other uses, see <a href="/wiki/X">X</a>.</div>\n',
+    ]
+    for _ in range(3):
+        ref += 1
+        body.append(_paragraph(rng, ref))
+    body.append('<!-- lead ends -->\n')
+
+    for index in range(sections):
+        body.append(_heading(2, _SECTIONS[index % len(_SECTIONS)] + (f" {index}" if index >= len(_SECTIONS) else "")))
+        for number in range(paragraphs):
+            if number == paragraphs // 2:
+                body.append(_heading(3, f"Part {index}.{number}"))
+            ref += 1
+            body.append(_paragraph(rng, ref))
+        body.append('<ul><li>List item outside any paragraph</li></ul>\n')
+        body.append(f'<blockquote><p>{sentence(rng)}</p></blockquote>\n')
+        body.append('<div class="thumb"><div class="thumbcaption"><p>Image caption paragraph.</p></div></div>\n')
+
+    for name in ("See also", "Notes", "References", "External links"):
+        body.append(_heading(2, name))
+        body.append(f'<p>{name} paragraph that must not become a section.</p>\n')
+        body.append('<div class="reflist"><ol class="references"><li>Ref</li></ol></div>\n')
+    body.append('<div class="navbox"><table><tr><td><p>Navbox paragraph</p></td></tr></table></div>\n')
+
+    page_name = title.replace(' ', '_')
+    return (
+        '<!DOCTYPE html>\n<html class="client-nojs" lang="en" dir="ltr"><head><meta charset="UTF-8"/>'
+        f'<title>{title} - Wikipedia</title>'
+        f'<script>RLCONF={{"wgPageName":{json.dumps(page_name)},"wgRevisionId":{1000 + seed}}};</script>'
+        '</head><body><div id="mw-navigation"><h2>Navigation menu</h2><p>Navigation paragraph</p></div>'
+        f'<main id="content"><h1 id="firstHeading" class="firstHeading mw-first-heading">'
+        f'<span class="mw-page-title-main">{title}</span></h1>'
+        '<div id="bodyContent"><div id="mw-content-text" class="mw-body-content">'
+        f'<div class="mw-content-ltr mw-parser-output" lang="en" dir="ltr">\n{"".join(body)}</div></div></div></main>'
+        '<footer><p>Footer paragraph</p></footer></body></html>'
+    ).encode('utf-8')
+
+
+def corpus() -> List[Tuple[str, bytes]]:
+    """Small, typical and very large articles"""
+    pages = [(f"stub-{seed}", article_html(seed, sections=1, paragraphs=1)) for seed in range(2)]
+    pages += [(f"article-{seed}", article_html(seed, sections=8, paragraphs=4)) for seed in range(2, 8)]
+    pages += [(f"large-{seed}", article_html(seed, sections=40, paragraphs=25)) for seed in range(8, 10)]
+    return pages
+
+
+def with_chrome(html: bytes, links: int = 1500) -> bytes:
+    """The page inside the navigation, sidebar and navbox markup a real
+    Wikipedia page carries, none of which is article content"""
+    items = ''.join(f'<li id="n-{index}" class="mw-list-item"><a href="/wiki/Link_{index}" title="Link {index}">'
+                    f'<span>Link {index}</span></a></li>' for index in range(links))
+    rows = ''.join(f'<tr><th scope="row"><a href="/wiki/Group_{index}">Group {index}</a></th><td><ul>'
+                   f'<li><a href="/wiki/A_{index}">A {index}</a></li><li><a href="/wiki/B_{index}">B {index}</a></li>'
+                   f'</ul></td></tr>' for index in range(links // 2))
+    sidebar = f'<div id="mw-panel" class="vector-main-menu"><ul class="vector-menu-content-list">{items}</ul></div>'
+    navbox = f'<div class="navbox-container"><table class="navbox"><tbody>{rows}</tbody></table></div>'
+    return html.replace(b'<main id="content">', sidebar.encode() + b'<main id="content">').replace(
+        b'</main>', b'</main>' + navbox.encode())
@@ -0,0 +1,92 @@
+"""Local stub HTTP servers (real sockets, HTTP/1.1 keep-alive) for the
+client, scraper and fault-injection tests"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+Reply = Tuple[int, Dict[str, str], bytes]
+
+
+class StubRequest:
+    def __init__(self, method: str, target: str, headers: Dict[str, str]):
+        self.method = method
+        self.target = target
+        parts = urlsplit(target)
+        self.path = parts.path
+        self.query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        self.headers = headers
+
+
+class StubServer:
+    """Serves `handler(request) -> (status, headers, body)` on 127.0.0.1.
+
+    The handler may sleep (latency), never return (a stalled upstream) or
+    raise ConnectionResetError (the connection is dropped without a reply).
+    Counts connections, requests and the peak number of requests in flight.
+    """
+
+    def __init__(self, handler: Callable[[StubRequest], Awaitable[Reply]]):
+        self.handler = handler
+        self.url = ""
+        self.host = ""
+        self.connections = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def __aenter__(self) -> "StubServer":
+        self._server = await asyncio.start_server(self._accept, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.host = f"127.0.0.1:{port}"
+        self.url = f"http://{self.host}"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._server.close()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                method, target, _ = request_line.split(" ", 2)
+                headers = {}
+                for line in header_lines:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                self.requests += 1
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                try:
+                    status, reply_headers, body = await self.handler(StubRequest(method, target, headers))
+                except ConnectionResetError:
+                    return
+                finally:
+                    self.in_flight -= 1
+
+                lines = [f"HTTP/1.1 {status} Stub"]
+                lines += [f"{name}: {value}" for name, value in reply_headers.items()]
+                lines += [f"Content-Length: {len(body)}", "", ""]
+                writer.write("\r\n".join(lines).encode("latin-1") + body)
+                await writer.drain()
+        finally:
+            self._tasks.discard(task)
+            writer.close()
+
+
+def ok(body: bytes, headers: Optional[Dict[str, str]] = None) -> Reply:
+    return 200, dict(headers or {}), body
@@ -0,0 +1,98 @@
+"""Parsed-article cache: in-process LRU, shared SQLite tier, revision keys"""
+import asyncio
+import sqlite3
+
+import httpx
+
+from pages import article_html
+from utils.article_cache import ArticleCache
+from utils.circuit_breaker import CircuitBreakers
+from utils.http_client import HTTPClient
+from utils.parsers import SoupBackend
+from utils.rate_limiter import UpstreamLimiters
+from utils.scraper import WikipediaScraper
+
+URL = "https://en.wikipedia.org/wiki/Cached_Article"
+_NO_LIMITS = {"qps": 0, "burst": 1, "max_concurrency": 10}
+
+
+class CountingBackend(SoupBackend):
+    def __init__(self):
+        super().__init__("html.parser")
+        self.parses = 0
+
+    def parse(self, html: bytes):
+        self.parses += 1
+        return super().parse(html)
+
+
+def test_memory_tier_is_an_lru():
+    cache = ArticleCache(max_entries=2)
+    cache.put("a", 1, {"title": "A"})
+    cache.put("b", 1, {"title": "B"})
+    assert cache.get("a", 1) == {"title": "A"}
+    cache.put("c", 1, {"title": "C"})
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1) == {"title": "A"} and cache.get("c", 1) == {"title": "C"}
+    # Callers get copies; the cached article is not changed through them
+    cache.get("a", 1)["title"] = "changed"
+    assert cache.get("a", 1) == {"title": "A"}
+    stats = cache.stats()
+    assert (stats["entries"], stats["memory_hits"], stats["misses"]) == (2, 5, 1)
+    assert stats["shared_tier"] is False
+
+
+def test_sqlite_tier_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "articles.db")
+    worker_a = ArticleCache(max_entries=10, sqlite_path=path)
+    worker_b = ArticleCache(max_entries=10, sqlite_path=path)
+
+    worker_a.put("a", 7, {"title": "A", "sections": ["History"]})
+
+    assert worker_b.get("a", 7) == {"title": "A", "sections": ["History"]}
+    assert worker_b.get("a", 7) == {"title": "A", "sections": ["History"]}
+    assert worker_b.get("a", 8) is None
+    stats = worker_b.stats()
+    assert (stats["shared_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+
+def test_new_revision_replaces_the_old_one(tmp_path):
+    path = str(tmp_path / "articles.db")
+    cache = ArticleCache(max_entries=10, sqlite_path=path)
+    cache.put("a", 1, {"title": "old"})
+    cache.put("a", 2, {"title": "new"})
+
+    rows = sqlite3.connect(path).execute("SELECT cache_key, revision_id FROM parsed_articles").fetchall()
+    assert rows == [("a", 2)]
+    assert ArticleCache(max_entries=10, sqlite_path=path).get("a", 1) is None
+
+
+def test_scraper_reparses_only_when_the_revision_changes(tmp_path):
+    page = {"seed": 1}
+    backend = CountingBackend()
+    cache = ArticleCache(max_entries=10, sqlite_path=str(tmp_path / "articles.db"))
+
+    def wikipedia(request):
+        return httpx.Response(200, content=article_html(page["seed"], title="Cached Article"))
+
+    async def scenario():
+        http_client = HTTPClient(httpx.AsyncClient(transport=httpx.MockTransport(wikipedia)),
+                                 UpstreamLimiters(_NO_LIMITS, _NO_LIMITS, 30), CircuitBreakers(5, 30),
+                                 retries=0, retry_backoff=0, max_backoff=0)
+        scraper = WikipediaScraper(http_client, article_cache=cache, parser_backend=backend)
+        try:
+            first = await scraper.scrape_article(URL)
+            again = await scraper.scrape_article(URL)
+            page["seed"] = 2
+            edited = await scraper.scrape_article(URL)
+            return first, again, edited
+        finally:
+            await http_client.aclose()
+
+    first, again, edited = asyncio.run(scenario())
+    assert again == first and first["revision_id"] == 1001
+    assert edited["revision_id"] == 1002 and edited["full_content"] != first["full_content"]
+    assert backend.parses == 2
+    assert cache.stats()["memory_hits"] == 1
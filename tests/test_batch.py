@@ -0,0 +1,76 @@
+"""Batch generation: one quiz per article, shared with concurrent requests"""
+import asyncio
+import json
+
+from database import SessionLocal
+from fakes import FakeGemini, serve_app
+from models import Quiz
+
+SPELLINGS = [
+    "https://en.wikipedia.org/wiki/Marie_Curie",
+    "http://en.m.wikipedia.org/wiki/Marie_Curie#Life",
+    "https://en.wikipedia.org/wiki/marie_Curie",
+]
+OTHER = "https://en.wikipedia.org/wiki/Alan_Turing"
+
+
+async def _batch(client, urls, **flags) -> list:
+    response = await client.post("/api/generate_quiz/batch", json={"urls": urls, "mode": "single", **flags})
+    assert response.status_code == 200, response.text
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def _rows() -> int:
+    db = SessionLocal()
+    try:
+        return db.query(Quiz).count()
+    finally:
+        db.close()
+
+
+def test_spellings_of_one_article_are_generated_once(db):
+    model = FakeGemini()
+
+    async def scenario():
+        async with serve_app(model) as client:
+            return await _batch(client, SPELLINGS + [OTHER])
+
+    lines = asyncio.run(scenario())
+    items, saved = lines[:-1], lines[-1]
+    assert len(items) == 2 and {item["status"] for item in items} == {"generated"}
+    curie = next(item for item in items if item["url"] == SPELLINGS[0])
+    assert curie["aliases"] == SPELLINGS[1:]
+    assert len(model.prompts) == 2 and _rows() == 2
+    assert saved["status"] == "saved"
+    assert {saved["quiz_ids"][url] for url in SPELLINGS} == {curie["quiz_id"]}
+    assert saved["quiz_ids"][OTHER] != curie["quiz_id"]
+
+
+def test_batch_shares_generation_with_a_concurrent_request(db):
+    model = FakeGemini(latency=lambda: 0.3)
+
+    async def scenario():
+        async with serve_app(model) as client:
+            single = client.post("/api/generate_quiz", json={"url": SPELLINGS[1], "mode": "single"})
+            single, lines = await asyncio.gather(single, _batch(client, [SPELLINGS[2]]))
+            return single.json(), lines
+
+    single, lines = asyncio.run(scenario())
+    assert lines[0]["quiz_id"] == single["id"]
+    assert len(model.prompts) == 1 and _rows() == 1
+
+
+def test_stored_quizzes_are_reused_and_bad_urls_reported(db):
+    model = FakeGemini()
+
+    async def scenario():
+        async with serve_app(model) as client:
+            first = await _batch(client, [SPELLINGS[0]])
+            second = await _batch(client, [SPELLINGS[2], "https://example.com/wiki/Nope"])
+            return first, second
+
+    first, second = asyncio.run(scenario())
+    assert second[0] == {"url": "https://example.com/wiki/Nope", "status": "error",
+                         "detail": "Invalid Wikipedia URL"}
+    assert second[1]["status"] == "reused" and second[1]["quiz_id"] == first[0]["quiz_id"]
+    assert len(model.prompts) == 1 and _rows() == 1
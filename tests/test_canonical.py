@@ -0,0 +1,135 @@
+"""Canonical article URLs: every spelling of a title maps to one URL"""
+import asyncio
+import json
+
+import pytest
+
+from utils.canonical import AliasIndex, canonicalize_url, page_canonical_url, url_title
+
+CANONICAL = [
+    # Scheme, host and path spellings
+    ("https://en.wikipedia.org/wiki/Alan_Turing", "https://en.wikipedia.org/wiki/Alan_Turing"),
+    ("http://en.wikipedia.org/wiki/Alan_Turing", "https://en.wikipedia.org/wiki/Alan_Turing"),
+    ("  https://EN.Wikipedia.ORG/wiki/Alan_Turing\n", "https://en.wikipedia.org/wiki/Alan_Turing"),
+    ("https://en.m.wikipedia.org/wiki/Alan_Turing", "https://en.wikipedia.org/wiki/Alan_Turing"),
+    ("https://en.wikipedia.org:443/wiki/Alan_Turing", "https://en.wikipedia.org/wiki/Alan_Turing"),
+    ("https://en.wikipedia.org/w/index.php?title=Alan_Turing&oldid=1", "https://en.wikipedia.org/wiki/Alan_Turing"),
+    ("https://de.wikipedia.org/wiki/Köln", "https://de.wikipedia.org/wiki/K%C3%B6ln"),
+    ("https://zh-yue.wikipedia.org/wiki/X", "https://zh-yue.wikipedia.org/wiki/X"),
+    # Title normalization
+    ("https://en.wikipedia.org/wiki/alan turing", "https://en.wikipedia.org/wiki/Alan_turing"),
+    ("https://en.wikipedia.org/wiki/Alan%20Turing", "https://en.wikipedia.org/wiki/Alan_Turing"),
+    ("https://en.wikipedia.org/wiki/__Alan___Turing_", "https://en.wikipedia.org/wiki/Alan_Turing"),
+    ("https://en.wikipedia.org/wiki/Alan_Turing#Early_life", "https://en.wikipedia.org/wiki/Alan_Turing"),
+    ("https://en.wikipedia.org/wiki/Alan_Turing%23Early_life", "https://en.wikipedia.org/wiki/Alan_Turing"),
+    ("https://en.wikipedia.org/wiki/Alan_Turing?action=history", "https://en.wikipedia.org/wiki/Alan_Turing"),
+    # Reserved characters stay part of the title
+    ("https://en.wikipedia.org/wiki/What_Is_Life%3F", "https://en.wikipedia.org/wiki/What_Is_Life%3F"),
+    ("https://en.wikipedia.org/w/index.php?title=What_Is_Life%3F", "https://en.wikipedia.org/wiki/What_Is_Life%3F"),
+    ("https://en.wikipedia.org/wiki/AT%26T", "https://en.wikipedia.org/wiki/AT%26T"),
+    ("https://en.wikipedia.org/wiki/AT&T", "https://en.wikipedia.org/wiki/AT%26T"),
+    ("https://en.wikipedia.org/wiki/C%2B%2B", "https://en.wikipedia.org/wiki/C%2B%2B"),
+    ("https://en.wikipedia.org/wiki/C++", "https://en.wikipedia.org/wiki/C%2B%2B"),
+    ("https://en.wikipedia.org/wiki/100%25", "https://en.wikipedia.org/wiki/100%25"),
+    ("https://en.wikipedia.org/wiki/Caf%C3%A9", "https://en.wikipedia.org/wiki/Caf%C3%A9"),
+    ("https://en.wikipedia.org/wiki/AC/DC", "https://en.wikipedia.org/wiki/AC/DC"),
+    ("https://en.wikipedia.org/wiki/Talk:Alan_Turing", "https://en.wikipedia.org/wiki/Talk:Alan_Turing"),
+    ("https://en.wikipedia.org/wiki/Fermat%27s_Last_Theorem", "https://en.wikipedia.org/wiki/Fermat%27s_Last_Theorem"),
+    ("https://en.wikipedia.org/wiki/Brackets_(disambiguation)", "https://en.wikipedia.org/wiki/Brackets_(disambiguation)"),
+]
+
+INVALID = [
+    "",
+    "not a url",
+    "ftp://en.wikipedia.org/wiki/Alan_Turing",
+    "https://wikipedia.org/wiki/Alan_Turing",
+    "https://en.wikipedia.org.evil.com/wiki/Alan_Turing",
+    "https://en.wikipedia.org@evil.com/wiki/Alan_Turing",
+    "https://en.wikipedia.org:notaport/wiki/Alan_Turing",
+    "https://en.wikipedia.org:99999/wiki/Alan_Turing",
+    "https://en.wikipedia.org/",
+    "https://en.wikipedia.org/wiki/",
+    "https://en.wikipedia.org/wiki/#Top",
+    "https://en.wikipedia.org/w/index.php?search=Turing",
+    "https://en.wikipedia.org/w/api.php?title=Alan_Turing",
+]
+
+
+@pytest.mark.parametrize("url,expected", CANONICAL)
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+    # Canonical URLs are fixed points
+    assert canonicalize_url(expected) == expected
+
+
+@pytest.mark.parametrize("url", INVALID)
+def test_canonicalize_url_rejects(url):
+    assert canonicalize_url(url) is None
+
+
+@pytest.mark.parametrize("url,title", [
+    ("https://en.wikipedia.org/wiki/What_Is_Life%3F", "What_Is_Life?"),
+    ("https://en.wikipedia.org/wiki/AT%26T", "AT&T"),
+    ("https://en.wikipedia.org/wiki/100%25", "100%"),
+    ("https://en.wikipedia.org/wiki/Caf%C3%A9", "Café"),
+    ("https://en.wikipedia.org/wiki/AC/DC", "AC/DC"),
+])
+def test_url_title_decodes_canonical_urls(url, title):
+    assert url_title(url) == title
+
+
+@pytest.mark.parametrize("page_name,expected", [
+    ("United_States", "https://en.wikipedia.org/wiki/United_States"),
+    ("What_Is_Life?", "https://en.wikipedia.org/wiki/What_Is_Life%3F"),
+    ('Quote_"marks"', "https://en.wikipedia.org/wiki/Quote_%22marks%22"),
+    ("Zürich", "https://en.wikipedia.org/wiki/Z%C3%BCrich"),
+])
+def test_page_canonical_url_follows_the_served_page(page_name, expected):
+    html = f'<script>RLCONF={{"wgPageName":{json.dumps(page_name)},"wgRevisionId":1}};</script>'.encode()
+    assert page_canonical_url(html, "https://en.wikipedia.org/wiki/USA") == expected
+    assert canonicalize_url(expected) == expected
+
+
+def test_page_canonical_url_falls_back_to_the_fetched_url():
+    fetched = "https://en.wikipedia.org/wiki/USA"
+    assert page_canonical_url(b"<html>no page config</html>", fetched) == fetched
+    assert page_canonical_url(b'"wgPageName":"broken\\', fetched) == fetched
+
+
+def test_alias_index_follows_recorded_redirects(db):
+    async def scenario():
+        index = AliasIndex(max_entries=10)
+        target = "https://en.wikipedia.org/wiki/United_States"
+        await index.record("https://en.wikipedia.org/wiki/USA", target)
+
+        # A fresh index reads the alias back from the database
+        fresh = AliasIndex(max_entries=10)
+        return (await fresh.resolve("http://en.m.wikipedia.org/wiki/USA#History"),
+                await fresh.resolve("https://en.wikipedia.org/wiki/Canada"),
+                fresh.stats())
+
+    via_alias, direct, stats = asyncio.run(scenario())
+    assert via_alias == "https://en.wikipedia.org/wiki/United_States"
+    assert direct == "https://en.wikipedia.org/wiki/Canada"
+    assert stats["redirect_hits"] == 1 and stats["direct"] == 1
+
+    with pytest.raises(ValueError):
+        asyncio.run(AliasIndex(max_entries=10).resolve("https://example.com/wiki/USA"))
+
+
+def test_negative_lookups_expire_so_other_workers_aliases_are_seen(db):
+    alias, target = "https://en.wikipedia.org/wiki/USA", "https://en.wikipedia.org/wiki/United_States"
+
+    async def scenario():
+        worker_a = AliasIndex(max_entries=10, negative_ttl=0.1)
+        worker_b = AliasIndex(max_entries=10, negative_ttl=0.1)
+        before = await worker_a.resolve(alias)
+        await worker_b.record(alias, target)
+        cached_miss = await worker_a.resolve(alias)
+        await asyncio.sleep(0.15)
+        return before, cached_miss, await worker_a.resolve(alias), worker_a.stats()
+
+    before, cached_miss, after, stats = asyncio.run(scenario())
+    assert before == cached_miss == alias
+    assert after == target
+    assert stats["direct"] == 2 and stats["redirect_hits"] == 1 and stats["entries"] == 1
@@ -0,0 +1,99 @@
+"""Prompt content selection: within the token budget, informative sentences first"""
+import random
+import time
+
+import pytest
+
+import config
+from pages import corpus, sentence
+from utils.content_selector import estimate_tokens, score_sentences, select_content, split_sentences
+from utils.extractor import CONTENT_BUDGET
+from utils.parsers import SoupBackend
+
+TITLE = "Marie Curie"
+LEAD = "Marie Curie was a physicist and chemist who pioneered research on radioactivity."
+FACTS = [
+    "She isolated 0.1 grams of radium chloride from eight tonnes of pitchblende in 1902.",
+    "Curie founded the Radium Institute in Warsaw, later renamed the Maria Skłodowska-Curie Institute of Oncology.",
+    "Mobile radiography units, nicknamed petites Curies, examined over a million wounded soldiers.",
+]
+FILLER = "The work was important and it was also interesting to many people at the time."
+
+
+def _pool_contents() -> list:
+    backend = SoupBackend("html.parser")
+    return [(name, backend.parse(html)["full_content"]) for name, html in corpus()]
+
+
+def _is_subsequence(chosen: list, sentences: list) -> bool:
+    remaining = iter(sentences)
+    return all(any(candidate == sentence for candidate in remaining) for sentence in chosen)
+
+
+@pytest.mark.parametrize("budget", [200, config.PROMPT_CONTENT_TOKENS, 2000])
+def test_selection_fits_the_budget_in_article_order(budget):
+    for name, content in _pool_contents():
+        selected = select_content(content, budget, name)
+        assert estimate_tokens(selected) <= budget
+        if estimate_tokens(content) > budget:
+            assert estimate_tokens(selected) > budget * 0.8
+        assert _is_subsequence(split_sentences(selected), split_sentences(content))
+
+
+def test_text_within_the_budget_is_unchanged():
+    text = " ".join([LEAD, *FACTS])
+    assert select_content(text, estimate_tokens(text), TITLE) == text
+
+
+def test_lead_and_informative_sentences_are_kept():
+    text = "\n".join([LEAD, *[FILLER] * 5, FACTS[0], *[FILLER] * 20, FACTS[1], *[FILLER] * 20, FACTS[2]])
+    budget = estimate_tokens(" ".join([LEAD, *FACTS, FILLER])) + 5
+
+    selected = select_content(text, budget, TITLE)
+
+    assert split_sentences(selected)[:2] == [LEAD, FACTS[0]]
+    assert all(fact in selected for fact in FACTS)
+    # Identical filler sentences are taken at most once
+    assert selected.count(FILLER) <= 1
+
+
+def test_the_whole_20000_character_pool_is_a_candidate():
+    """An informative sentence far past the old 8000-character cut is still picked"""
+    rng = random.Random(3)
+    filler = []
+    while sum(len(part) + 1 for part in filler) < CONTENT_BUDGET - 500:
+        filler.append(FILLER if rng.random() < 0.7 else sentence(rng))
+    position = int(len(filler) * 0.85)
+    text = "\n".join([LEAD, *filler[:position], FACTS[0], *filler[position:]])
+    assert len(text) <= CONTENT_BUDGET and text.index(FACTS[0]) > 15000
+
+    selected = select_content(text, 200, TITLE)
+
+    assert FACTS[0] in selected and LEAD in selected
+    assert estimate_tokens(selected) <= 200
+
+
+def test_lead_title_and_numbers_are_boosted():
+    plain = "Pitchblende ore yielded polonium samples for spectral analysis."
+    sentences = [plain, "Other text about unrelated matters here.", "More unrelated prose fills space.",
+                 "Still more filler prose follows.", plain]
+    scores = score_sentences(sentences)
+    # Same sentence: only the lead boost differs
+    assert scores[0] > scores[4]
+    titled = score_sentences(sentences, "Polonium")
+    assert titled[4] > scores[4]
+
+
+@pytest.mark.benchmark
+def test_selection_cpu_benchmark():
+    """CPU per article at the prompt budget, up to the full 20000-character pool"""
+    print()
+    for name, content in _pool_contents():
+        rounds = 20
+        started = time.process_time()
+        for _ in range(rounds):
+            selected = select_content(content, config.PROMPT_CONTENT_TOKENS, name)
+        cpu_ms = (time.process_time() - started) * 1000 / rounds
+        print(f"{name:11} {len(content):6} chars  {len(split_sentences(content)):4} sentences  "
+              f"{cpu_ms:5.2f}ms  -> {estimate_tokens(selected)} of {estimate_tokens(content)} tokens")
+        assert cpu_ms < 25
@@ -0,0 +1,145 @@
+"""Single-pass extraction: budgets, early exit, and a CPU benchmark against
+the four-walk extraction it replaced"""
+import re
+import time
+import tracemalloc
+from typing import List
+
+import pytest
+from bs4 import BeautifulSoup
+
+import utils.extractor as extractor_module
+from pages import article_html, corpus, with_chrome
+from utils.extractor import (CONTENT_BUDGET, CONTENT_STRAINER, MAX_SECTIONS, SECTION_TEXT_BUDGET,
+                             SUMMARY_LIMIT, ArticleExtractor)
+from utils.parsers import LXML_AVAILABLE
+
+
+class CountingExtractor(ArticleExtractor):
+    def __init__(self):
+        self.visited = 0
+
+    def _tag(self, node):
+        self.visited += 1
+        return super()._tag(node)
+
+
+def _soup(html: bytes) -> BeautifulSoup:
+    return BeautifulSoup(html, 'html.parser')
+
+
+@pytest.mark.parametrize("name,html", corpus(), ids=[name for name, _ in corpus()])
+def test_output_respects_budgets(name, html):
+    data = ArticleExtractor().extract(_soup(html))
+
+    assert data["title"].startswith("Article ")
+    assert len(data["summary"]) <= SUMMARY_LIMIT
+    assert len(data["full_content"]) <= CONTENT_BUDGET
+    assert len(data["sections"]) <= MAX_SECTIONS
+    assert len(data["section_texts"]) <= MAX_SECTIONS + 1
+    assert all(len(chunk["text"]) <= SECTION_TEXT_BUDGET for chunk in data["section_texts"])
+    assert data["section_texts"][0]["heading"] == "Introduction"
+
+
+def test_navigation_sections_tables_and_chrome_are_skipped():
+    data = ArticleExtractor().extract(_soup(article_html(3)))
+
+    assert not any(name in data["sections"] for name in ("See also", "Notes", "References", "External links"))
+    for text in ("Nested infobox paragraph", "Navbox paragraph", "Navigation paragraph", "Footer paragraph"):
+        assert text not in data["full_content"]
+    assert "Image caption paragraph." in data["full_content"]
+
+
+def test_walk_stops_once_budgets_are_met(monkeypatch):
+    html = article_html(8, sections=40, paragraphs=25)
+    early = CountingExtractor()
+    early_data = early.extract(_soup(html))
+
+    monkeypatch.setattr(extractor_module._ExtractionState, "budgets_met", lambda self: False)
+    full = CountingExtractor()
+    full_data = full.extract(_soup(html))
+
+    # Same result, a fraction of the tree visited
+    assert early_data == full_data
+    assert early.visited < full.visited / 3
+
+
+# The extraction before the single pass: four independent walks over the full tree
+def _legacy_extract(soup: BeautifulSoup) -> dict:
+    title_element = soup.find('h1', {'class': 'firstHeading'})
+    title = title_element.get_text().strip() if title_element else "Unknown Title"
+
+    summary = ""
+    content = soup.find('div', {'id': 'mw-content-text'})
+    if content:
+        paragraphs = content.find_all('p', limit=3)
+        summary = ' '.join([p.get_text().strip() for p in paragraphs if p.get_text().strip()])
+        summary = re.sub(r'\[\d+\]', '', summary)[:1000]
+
+    sections: List[str] = []
+    for heading in soup.find_all(['h2', 'h3']):
+        heading_text = heading.get_text().strip()
+        if not any(skip in heading_text.lower() for skip in extractor_module.SKIP_SECTIONS):
+            sections.append(heading_text)
+
+    full_content = ""
+    content = soup.find('div', {'id': 'mw-content-text'})
+    if content:
+        for element in content.find_all(['table', 'div.navbox', 'div.reflist']):
+            element.decompose()
+        paragraphs = content.find_all('p')
+        full_content = ' '.join([p.get_text().strip() for p in paragraphs if p.get_text().strip()])
+        full_content = re.sub(r'\[\d+\]', '', full_content)[:8000]
+
+    return {"title": title, "summary": summary, "sections": sections[:10], "full_content": full_content}
+
+
+def _cpu_ms(func, items: list) -> float:
+    started = time.process_time()
+    for item in items:
+        func(item)
+    return (time.process_time() - started) * 1000 / len(items)
+
+
+@pytest.mark.benchmark
+def test_extraction_cpu_benchmark():
+    """CPU per article: parse + extract, and the extraction walk(s) alone on
+    pre-built html.parser trees (the legacy walk mutates its tree, so every
+    round gets a fresh one)"""
+    extractor = ArticleExtractor()
+    print()
+    for name, html in corpus():
+        pages = [html] * (3 if name.startswith("large") else 20)
+        legacy = _cpu_ms(lambda page: _legacy_extract(_soup(page)), pages)
+        single = _cpu_ms(lambda page: extractor.extract(_soup(page)), pages)
+        walk_legacy = _cpu_ms(_legacy_extract, [_soup(page) for page in pages])
+        walk_single = _cpu_ms(extractor.extract, [_soup(page) for page in pages])
+        print(f"{name:11} {len(html) / 1024:4.0f}KB  parse+extract: four walks {legacy:6.1f}ms, "
+              f"single pass {single:6.1f}ms  |  walk only: {walk_legacy:5.2f}ms vs {walk_single:5.2f}ms")
+
+
+def _peak_mb(html: bytes, features: str, strainer) -> tuple:
+    tracemalloc.start()
+    try:
+        data = ArticleExtractor().extract(BeautifulSoup(html, features, parse_only=strainer))
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20, data
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("features", [
+    "html.parser",
+    pytest.param("lxml", marks=pytest.mark.skipif(not LXML_AVAILABLE, reason="lxml not installed")),
+])
+def test_strainer_bounds_parse_memory(features):
+    """Only the title and content div become a tree: on a ~300KB page that
+    is mostly navigation, peak memory stays a fraction of a full parse"""
+    html = with_chrome(article_html(5))
+    full_mb, full = _peak_mb(html, features, None)
+    strained_mb, strained = _peak_mb(html, features, CONTENT_STRAINER)
+    print(f"\n{features}: {len(html) // 1024}KB page, tracemalloc peak {full_mb:.1f}MB full parse, "
+          f"{strained_mb:.1f}MB strained")
+
+    assert strained == full
+    assert strained_mb < 4
+    assert strained_mb < full_mb / 4
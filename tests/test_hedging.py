@@ -0,0 +1,83 @@
+"""Hedged LLM calls: tail latency, budget, and what counts as a hedge"""
+import asyncio
+import statistics
+
+from fakes import long_tail
+from utils.hedging import RequestHedger
+from utils.rate_limiter import RateLimitExceeded
+
+
+def _hedger(enabled: bool = True, budget: float = 0.2, min_samples: int = 20) -> RequestHedger:
+    return RequestHedger(enabled, percentile=90, budget=budget, min_samples=min_samples, window=200,
+                         rejected=(RateLimitExceeded,))
+
+
+def _latencies(hedger: RequestHedger, calls: int = 300, concurrency: int = 20, seed: int = 7) -> list:
+    latency = long_tail(median=0.01, tail=0.3, tail_share=0.05, seed=seed)
+
+    async def call():
+        await asyncio.sleep(latency())
+        return "ok"
+
+    async def scenario():
+        slots = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+
+        async def one():
+            async with slots:
+                started = loop.time()
+                assert await hedger.run(call, call) == "ok"
+                return loop.time() - started
+        return await asyncio.gather(*(one() for _ in range(calls)))
+    return asyncio.run(scenario())
+
+
+def _p98(latencies: list) -> float:
+    return statistics.quantiles(latencies, n=100)[97]
+
+
+def test_hedging_cuts_the_tail_within_budget():
+    plain = _latencies(_hedger(enabled=False))
+    hedger = _hedger()
+    # Warm up: no hedging until min_samples latencies are known
+    _latencies(hedger, calls=40, seed=1)
+    hedged = _latencies(hedger)
+
+    assert _p98(plain) > 0.2
+    assert _p98(hedged) < 0.1
+    assert statistics.median(hedged) < 0.02
+    assert 0 < hedger.hedged <= 0.2 * hedger.calls
+    assert hedger.hedge_wins > 0 and hedger.stats()["estimated_saved_ms"] > 0
+
+
+def test_rejected_hedge_is_not_counted_and_returns_its_budget():
+    hedger = _hedger(budget=1.0, min_samples=1)
+    hedger._latencies.append(0.01)
+
+    async def primary():
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    async def refused():
+        raise RateLimitExceeded("no capacity right now")
+
+    assert asyncio.run(hedger.run(primary, refused)) == "primary"
+    assert hedger.hedged == 0 and hedger.hedges_rejected == 1
+    assert hedger.stats()["hedge_rate"] == 0.0
+
+
+def test_cancelled_primary_is_recorded_as_a_censored_sample():
+    hedger = _hedger(budget=1.0, min_samples=1)
+    hedger._latencies.append(0.01)
+
+    async def stuck():
+        await asyncio.sleep(10)
+
+    async def fast():
+        return "hedge"
+
+    assert asyncio.run(hedger.run(stuck, fast)) == "hedge"
+    # The abandoned primary ran for about the hedge delay: at least that long is on record
+    assert len(hedger._latencies) == 3
+    assert max(hedger._latencies) >= 0.01
+    assert hedger.hedged == 1 and hedger.hedge_wins == 1
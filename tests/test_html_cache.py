@@ -0,0 +1,107 @@
+"""HTML cache: conditional revalidation against a stub Wikipedia, LRU by bytes"""
+import asyncio
+
+import httpx
+
+from pages import article_html
+from stubs import StubServer, ok
+from utils.circuit_breaker import CircuitBreakers
+from utils.html_cache import HTMLCache
+from utils.http_client import HTTPClient
+from utils.rate_limiter import UpstreamLimiters
+from utils.scraper import WikipediaScraper
+
+URL = "https://en.wikipedia.org/wiki/Cached_Article"
+_NO_LIMITS = {"qps": 0, "burst": 1, "max_concurrency": 10}
+
+
+class _ToStub(httpx.AsyncBaseTransport):
+    """Sends requests for any host to the stub server over a real socket"""
+
+    def __init__(self, server: StubServer):
+        self._port = int(server.host.rsplit(":", 1)[1])
+        self._inner = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(scheme="http", host="127.0.0.1", port=self._port)
+        return await self._inner.handle_async_request(request)
+
+    async def aclose(self):
+        await self._inner.aclose()
+
+
+class StubWikipedia:
+    """Serves one page per revision with an ETag and answers If-None-Match with 304"""
+
+    def __init__(self):
+        self.revision = 1
+        self.conditional = []
+
+    async def __call__(self, request):
+        etag = f'"rev-{self.revision}"'
+        self.conditional.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == etag:
+            return 304, {"ETag": etag}, b""
+        return ok(article_html(self.revision, title="Cached Article"), {"ETag": etag})
+
+
+def test_etag_revalidation_serves_the_cached_copy(tmp_path):
+    wiki = StubWikipedia()
+    cache = HTMLCache(str(tmp_path), 10 * 2 ** 20)
+
+    async def scenario():
+        async with StubServer(wiki) as server:
+            http_client = HTTPClient(httpx.AsyncClient(transport=_ToStub(server)),
+                                     UpstreamLimiters(_NO_LIMITS, _NO_LIMITS, 30), CircuitBreakers(5, 30),
+                                     retries=0, retry_backoff=0, max_backoff=0)
+            scraper = WikipediaScraper(http_client, html_cache=cache)
+            try:
+                first = await scraper.scrape_article(URL)
+                revalidated = await scraper.scrape_article(URL)
+                wiki.revision = 2
+                edited = await scraper.scrape_article(URL)
+                after_edit = await scraper.scrape_article(URL)
+                return first, revalidated, edited, after_edit
+            finally:
+                await http_client.aclose()
+
+    first, revalidated, edited, after_edit = asyncio.run(scenario())
+    assert wiki.conditional == [None, '"rev-1"', '"rev-1"', '"rev-2"']
+    assert revalidated == first
+    assert edited != first and after_edit == edited
+    assert cache.get(URL).etag == '"rev-2"'
+    stats = cache.stats()
+    # Every fetch but the first looks the entry up; two are 304s, one is replaced
+    assert (stats["misses"], stats["hits"], stats["stale"]) == (1, 2, 1)
+    assert stats["entries"] == 1 and stats["hit_rate"] == 0.5
+
+
+def test_lru_eviction_keeps_the_byte_budget(tmp_path):
+    body = b"x" * 1000
+    cache = HTMLCache(str(tmp_path), 2500)
+    cache.put("a", body, etag='"a"')
+    cache.put("b", body, etag='"b"')
+    # A 304 for "a" makes "b" the least recently used
+    cache.record_hit("a")
+    cache.put("c", body, etag='"c"')
+
+    assert cache.get("b") is None
+    assert cache.get("a").body == body and cache.get("c").etag == '"c"'
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1
+    assert stats["bytes"] <= stats["max_bytes"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        f"{cache._digest(key)}{suffix}" for key in "ac" for suffix in (".html", ".json")
+    )
+
+
+def test_index_is_rebuilt_from_disk(tmp_path):
+    first = HTMLCache(str(tmp_path), 10 * 2 ** 20)
+    first.put("a", b"one", etag='"1"')
+    first.put("b", b"two", last_modified="Tue, 01 Oct 2024 00:00:00 GMT")
+
+    second = HTMLCache(str(tmp_path), 10 * 2 ** 20)
+
+    assert second.stats()["entries"] == 2
+    assert second.stats()["bytes"] == first.stats()["bytes"]
+    assert second.get("b").last_modified == "Tue, 01 Oct 2024 00:00:00 GMT"
@@ -0,0 +1,137 @@
+"""Shared pooled client: keep-alive reuse, compression, per-host limits,
+and a p50/p99 fetch benchmark against a local stub server"""
+import asyncio
+import gzip
+import statistics
+import time
+
+import httpx
+import pytest
+
+from stubs import StubServer, ok
+from utils.circuit_breaker import CircuitBreakers
+from utils.http_client import HTTPClient, create_http_client
+from utils.rate_limiter import UpstreamLimiters
+
+BODY = b"<html>" + b"article text " * 4000 + b"</html>"
+
+
+def _limiters(max_concurrency: int = 10) -> UpstreamLimiters:
+    settings = {"qps": 0, "burst": 1, "max_concurrency": max_concurrency}
+    return UpstreamLimiters(wikipedia=settings, gemini=settings, max_wait=30)
+
+
+def _client(max_concurrency: int = 10) -> HTTPClient:
+    return create_http_client(_limiters(max_concurrency), CircuitBreakers(5, 30))
+
+
+async def _serve(request):
+    await asyncio.sleep(0.001)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return ok(gzip.compress(BODY), {"Content-Encoding": "gzip"})
+    return ok(BODY)
+
+
+def test_connections_are_reused_across_fetches():
+    async def scenario():
+        async with StubServer(_serve) as server:
+            client = _client()
+            try:
+                for index in range(20):
+                    response = await client.get(f"{server.url}/wiki/Page_{index}")
+                    assert response.content == BODY
+            finally:
+                await client.aclose()
+            return server.connections, server.requests
+
+    connections, requests = asyncio.run(scenario())
+    assert requests == 20
+    assert connections == 1
+
+
+def test_responses_are_compressed_on_the_wire():
+    seen = {}
+
+    async def serve(request):
+        seen["accept-encoding"] = request.headers.get("accept-encoding", "")
+        return await _serve(request)
+
+    async def scenario():
+        async with StubServer(serve) as server:
+            client = _client()
+            try:
+                return await client.get(f"{server.url}/wiki/Compressed")
+            finally:
+                await client.aclose()
+
+    response = asyncio.run(scenario())
+    assert "gzip" in seen["accept-encoding"]
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == BODY
+
+
+def test_per_host_concurrency_is_capped():
+    async def serve(request):
+        await asyncio.sleep(0.05)
+        return ok(b"ok")
+
+    async def scenario():
+        async with StubServer(serve) as server:
+            client = _client(max_concurrency=3)
+            try:
+                await asyncio.gather(*(client.get(f"{server.url}/wiki/P{index}") for index in range(20)))
+            finally:
+                await client.aclose()
+            return server.max_in_flight, server.connections
+
+    max_in_flight, connections = asyncio.run(scenario())
+    assert max_in_flight == 3
+    assert connections <= 3
+
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    return statistics.median(ordered) * 1000, ordered[int(len(ordered) * 0.99) - 1] * 1000
+
+
+@pytest.mark.benchmark
+def test_fetch_latency_benchmark():
+    """p50/p99 per fetch: a new client (new connection) per fetch, as the
+    per-request scraper did, against the shared pooled client"""
+    fetches = 300
+
+    async def one_client_per_fetch(url):
+        samples = []
+        for index in range(fetches):
+            started = time.perf_counter()
+            async with httpx.AsyncClient() as client:
+                (await client.get(f"{url}/wiki/P{index}")).raise_for_status()
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    async def pooled(url):
+        client = _client()
+        samples = []
+        try:
+            for index in range(fetches):
+                started = time.perf_counter()
+                (await client.get(f"{url}/wiki/P{index}")).raise_for_status()
+                samples.append(time.perf_counter() - started)
+        finally:
+            await client.aclose()
+        return samples
+
+    async def scenario():
+        async with StubServer(_serve) as server:
+            before = await one_client_per_fetch(server.url)
+            before_connections = server.connections
+            after = await pooled(server.url)
+            return before, after, before_connections, server.connections - before_connections
+
+    before, after, before_connections, after_connections = asyncio.run(scenario())
+    print(f"\nper-fetch client: p50 {_percentiles(before)[0]:.2f}ms p99 {_percentiles(before)[1]:.2f}ms, "
+          f"{before_connections} connections")
+    print(f"pooled client:    p50 {_percentiles(after)[0]:.2f}ms p99 {_percentiles(after)[1]:.2f}ms, "
+          f"{after_connections} connections")
+    assert after_connections == 1
+    assert _percentiles(after)[0] < _percentiles(before)[0]
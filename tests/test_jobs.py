@@ -0,0 +1,245 @@
+"""Durable job queue: claims, retries, requeue on shutdown, lease expiry"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import OperationalError
+
+import utils.jobs as jobs_module
+from utils.jobs import JobQueue
+
+
+def _queue(run_job=None, **overrides) -> JobQueue:
+    async def done(job):
+        return 1000 + job["id"]
+
+    settings = {"workers": 1, "poll_interval": 0.02, "lease_ttl": 5.0, "max_attempts": 3, "retry_backoff": 0.01}
+    settings.update(overrides)
+    return JobQueue(run_job or done, **settings)
+
+
+async def _until(queue: JobQueue, job_id: int, status: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = await queue.get(job_id)
+        if job["status"] == status:
+            return job
+        assert time.monotonic() < deadline, f"job {job_id} stuck in {job['status']}"
+        await asyncio.sleep(0.01)
+
+
+def test_concurrent_claims_are_unique(db):
+    queues = [_queue() for _ in range(4)]
+
+    async def submit():
+        return [await queues[0].submit(f"https://en.wikipedia.org/wiki/P{index}", "ai") for index in range(30)]
+    submitted = asyncio.run(submit())
+
+    def drain(queue):
+        claimed = []
+        while (job := queue._claim()) is not None:
+            claimed.append((job["id"], job["owner"]))
+        return claimed
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(drain, queues))
+
+    ids = [job_id for claimed in results for job_id, _ in claimed]
+    assert sorted(ids) == sorted(job["id"] for job in submitted)
+    for queue, claimed in zip(queues, results):
+        assert all(owner == queue.owner for _, owner in claimed)
+
+
+def test_higher_priority_is_claimed_first(db):
+    queue = _queue()
+
+    async def submit():
+        low = await queue.submit("https://en.wikipedia.org/wiki/Low", "ai")
+        high = await queue.submit("https://en.wikipedia.org/wiki/High", "ai", priority=5)
+        return low, high
+    low, high = asyncio.run(submit())
+
+    assert [queue._claim()["id"], queue._claim()["id"]] == [high["id"], low["id"]]
+    assert queue._claim() is None
+
+
+def test_jobs_run_to_completion(db):
+    async def scenario():
+        queue = _queue(workers=2)
+        queue.start()
+        try:
+            submitted = [await queue.submit(f"https://en.wikipedia.org/wiki/P{index}", "ai") for index in range(5)]
+            return [await _until(queue, job["id"], "done") for job in submitted], queue.stats()
+        finally:
+            await queue.stop()
+
+    finished, stats = asyncio.run(scenario())
+    assert [job["quiz_id"] for job in finished] == [1000 + job["id"] for job in finished]
+    assert all(job["attempts"] == 1 and job["lease_expires_at"] is None for job in finished)
+    assert stats["completed"] == 5
+
+
+def test_failures_are_retried_then_succeed(db):
+    calls = []
+
+    async def flaky(job):
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            raise RuntimeError("upstream hiccup")
+        return 7
+
+    async def scenario():
+        queue = _queue(flaky, retry_backoff=0.05)
+        queue.start()
+        try:
+            job = await queue.submit("https://en.wikipedia.org/wiki/Flaky", "ai")
+            return await _until(queue, job["id"], "done"), queue.stats()
+        finally:
+            await queue.stop()
+
+    job, stats = asyncio.run(scenario())
+    assert job["quiz_id"] == 7 and job["attempts"] == 3 and job["error"] is None
+    assert stats["retried"] == 2
+    # Jittered exponential backoff: 0.05 * 2**(attempt-1) * [0.5, 1.5)
+    assert calls[1] - calls[0] >= 0.025
+    assert calls[2] - calls[1] >= 0.05
+
+
+def test_retries_are_exhausted(db):
+    async def broken(job):
+        raise ValueError("Invalid Wikipedia URL")
+
+    async def scenario():
+        queue = _queue(broken, max_attempts=2)
+        queue.start()
+        try:
+            job = await queue.submit("https://example.com", "ai")
+            return await _until(queue, job["id"], "failed"), queue.stats()
+        finally:
+            await queue.stop()
+
+    job, stats = asyncio.run(scenario())
+    assert job["attempts"] == 2 and job["error"] == "Invalid Wikipedia URL"
+    assert stats["retried"] == 1 and stats["failed"] == 1
+
+
+def test_retry_waits_for_its_backoff(db):
+    queue = _queue(retry_backoff=10)
+    job = asyncio.run(queue.submit("https://en.wikipedia.org/wiki/Later", "ai"))
+    claimed = queue._claim()
+    before = time.time()
+    queue._fail(claimed, "boom")
+
+    requeued = asyncio.run(queue.get(job["id"]))
+    assert requeued["status"] == "queued" and requeued["owner"] is None
+    assert before + 5 <= requeued["run_after"] <= time.time() + 15
+    assert queue._claim() is None
+
+
+def test_stop_requeues_the_running_job(db):
+    async def scenario():
+        running = asyncio.Event()
+
+        async def slow(job):
+            running.set()
+            await asyncio.sleep(60)
+
+        queue = _queue(slow)
+        queue.start()
+        job = await queue.submit("https://en.wikipedia.org/wiki/Slow", "ai")
+        await asyncio.wait_for(running.wait(), 5)
+        await queue.stop()
+        return await queue.get(job["id"])
+
+    job = asyncio.run(scenario())
+    assert job["status"] == "queued" and job["owner"] is None and job["lease_expires_at"] is None
+    # Shutdown is not the job's fault: the attempt is not counted
+    assert job["attempts"] == 0
+
+
+def test_expired_lease_is_reclaimed(db):
+    dead = _queue(lease_ttl=0.05)
+    alive = _queue(lease_ttl=0.05)
+    job = asyncio.run(dead.submit("https://en.wikipedia.org/wiki/Orphan", "ai"))
+
+    assert dead._claim()["id"] == job["id"]
+    assert alive._claim() is None
+    time.sleep(0.1)
+    reclaimed = alive._claim()
+    assert reclaimed["id"] == job["id"] and reclaimed["owner"] == alive.owner and reclaimed["attempts"] == 2
+
+    # The old owner no longer owns the job; its late writes are ignored
+    dead._finish(job["id"], 1)
+    assert asyncio.run(alive.get(job["id"]))["status"] == "running"
+
+
+def test_job_that_keeps_killing_its_worker_fails(db):
+    queue = _queue(lease_ttl=0.01, max_attempts=2)
+    job = asyncio.run(queue.submit("https://en.wikipedia.org/wiki/Poison", "ai"))
+    for _ in range(2):
+        assert queue._claim()["id"] == job["id"]
+        time.sleep(0.02)
+
+    assert queue._claim() is None
+    failed = asyncio.run(queue.get(job["id"]))
+    assert failed["status"] == "failed" and "lease expired" in failed["error"]
+
+
+def test_heartbeat_keeps_a_long_job_leased(db):
+    async def scenario():
+        async def long_job(job):
+            await asyncio.sleep(0.6)
+            return 1
+
+        queue = _queue(long_job, lease_ttl=0.2)
+        other = _queue(lease_ttl=0.2)
+        queue.start()
+        try:
+            job = await queue.submit("https://en.wikipedia.org/wiki/Long", "ai")
+            await _until(queue, job["id"], "running")
+            stolen = []
+            for _ in range(5):
+                await asyncio.sleep(0.1)
+                stolen.append(other._claim())
+            return await _until(queue, job["id"], "done"), stolen
+        finally:
+            await queue.stop()
+
+    job, stolen = asyncio.run(scenario())
+    assert stolen == [None] * 5
+    assert job["attempts"] == 1
+
+
+def test_workers_survive_status_write_failures(db, monkeypatch):
+    monkeypatch.setattr(jobs_module, "WRITE_RETRY_DELAY", 0.01)
+    original_finish = JobQueue._finish
+    failures = []
+    locked = {}
+
+    def finish(self, job_id, quiz_id):
+        # Every write for the first job fails; the second job's go through
+        if job_id == locked.get("id"):
+            failures.append(job_id)
+            raise OperationalError("UPDATE quiz_jobs", {}, Exception("database is locked"))
+        return original_finish(self, job_id, quiz_id)
+
+    monkeypatch.setattr(JobQueue, "_finish", finish)
+
+    async def scenario():
+        queue = _queue(workers=1)
+        first = await queue.submit("https://en.wikipedia.org/wiki/Locked", "ai")
+        locked["id"] = first["id"]
+        queue.start()
+        try:
+            second = await queue.submit("https://en.wikipedia.org/wiki/Fine", "ai")
+            done = await _until(queue, second["id"], "done")
+            return await queue.get(first["id"]), done, queue.stats()
+        finally:
+            await queue.stop()
+
+    first, second, stats = asyncio.run(scenario())
+    assert len(failures) == jobs_module.WRITE_ATTEMPTS
+    # The first job keeps its lease and will be reclaimed when it expires
+    assert first["status"] == "running"
+    assert second["quiz_id"] == 1000 + second["id"]
+    assert stats["workers"] == 1
@@ -0,0 +1,95 @@
+"""QuizStreamParser on the shapes model output actually comes in"""
+import json
+
+import pytest
+
+from fakes import quiz_json
+from utils.json_stream import QuizStreamParser, parse_quiz_json
+
+QUIZ = quiz_json(count=4)
+
+
+def _feed(text: str, chunk_size: int) -> QuizStreamParser:
+    parser = QuizStreamParser()
+    for start in range(0, len(text), chunk_size):
+        parser.feed(text[start:start + chunk_size])
+    return parser
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 100000])
+@pytest.mark.parametrize("text", [
+    QUIZ,
+    "```json\n" + QUIZ + "\n```",
+    "```\n" + QUIZ + "\n```\n",
+    "Here is the quiz you asked for:\n\n" + QUIZ + "\n\nLet me know if you want {more} questions!",
+    "Sure! ```json\n" + QUIZ + "\n``` I hope this helps: {\"not\": \"parsed\"}",
+], ids=["bare", "fenced", "fenced-no-language", "prose-wrapped", "prose-and-second-object"])
+def test_wrapped_output(text, chunk_size):
+    parser = _feed(text, chunk_size)
+    assert parser.items == json.loads(QUIZ)["questions"]
+    assert parser.finish() == json.loads(QUIZ)
+
+
+def test_items_are_emitted_as_soon_as_they_close():
+    parser = QuizStreamParser()
+    first_end = QUIZ.index("}", QUIZ.index('"difficulty"')) + 1
+    assert parser.feed(QUIZ[:first_end - 1]) == []
+    completed = parser.feed(QUIZ[first_end - 1:first_end])
+    assert completed == [json.loads(QUIZ)["questions"][0]]
+
+
+def test_braces_quotes_and_escapes_inside_strings():
+    quiz = {
+        "questions": [
+            {"question": 'What does "}" close in C? {', "options": {"A": "]", "B": "[", "C": "\\", "D": "{}"},
+             "correct_answer": "A", "explanation": "A brace } is not a bracket ].\nNew \"line\"."},
+            {"question": "Second?", "options": {"A": "1", "B": "2", "C": "3", "D": "4"}, "correct_answer": "B"},
+        ],
+        "related_topics": ["{braces}", "[brackets]"]
+    }
+    text = json.dumps(quiz)
+    for chunk_size in (1, 3, len(text)):
+        parser = _feed(text, chunk_size)
+        assert parser.items == quiz["questions"]
+        assert parser.finish() == quiz
+
+
+def test_only_top_level_questions_are_items():
+    text = json.dumps({
+        "meta": {"questions": [{"question": "nested"}], "note": "questions"},
+        "questions": [{"question": "real"}],
+        "related_topics": [{"questions": "no"}]
+    })
+    assert _feed(text, 5).items == [{"question": "real"}]
+
+
+@pytest.mark.parametrize("cut", [0.1, 0.3, 0.6, 0.95])
+def test_truncated_output_keeps_completed_items(cut):
+    items = json.loads(QUIZ)["questions"]
+    text = "```json\n" + json.dumps({"questions": items, "related_topics": ["Physics"]})
+    ends = [text.index(json.dumps(item)) + len(json.dumps(item)) for item in items]
+    truncated = text[:int(len(text) * cut)]
+    expected = [item for item, item_end in zip(items, ends) if item_end <= len(truncated)]
+
+    parser = _feed(truncated, 16)
+    assert parser.items == expected
+    if expected:
+        assert parser.finish() == {"questions": expected}
+    else:
+        with pytest.raises(ValueError):
+            parser.finish()
+
+
+def test_malformed_item_is_skipped():
+    text = ('{"questions": [{"question": "bad", "options": {"A": 1,}}, '
+            '{"question": "good"}], "related_topics": []}')
+    parser = _feed(text, 4)
+    assert parser.items == [{"question": "good"}]
+    # The whole object is not valid JSON either: fall back to the good items
+    assert parser.finish() == {"questions": [{"question": "good"}]}
+
+
+@pytest.mark.parametrize("text", ["", "I cannot help with that.", "```json\n```", "[1, 2, 3]"])
+def test_no_object_is_an_error(text):
+    with pytest.raises(ValueError):
+        parse_quiz_json(text)
@@ -0,0 +1,97 @@
+"""LLM response cache: counted in prompts actually sent to the model"""
+import asyncio
+import random
+import time
+
+from fakes import FakeGemini
+from pages import sentence
+from utils.circuit_breaker import CircuitBreakers
+from utils.llm_cache import LLMResponseCache, llm_cache_key
+from utils.quiz_generator import AdvancedQuizGenerator
+from utils.rate_limiter import UpstreamLimiters
+
+_NO_LIMITS = {"qps": 0, "burst": 1, "max_concurrency": 4}
+
+
+def _article(seed: int) -> str:
+    return " ".join(sentence(random.Random(seed * 100 + index)) for index in range(30))
+
+
+def _generator(cache: LLMResponseCache, model: FakeGemini) -> AdvancedQuizGenerator:
+    generator = AdvancedQuizGenerator(cache, UpstreamLimiters(_NO_LIMITS, _NO_LIMITS, 30), CircuitBreakers(5, 30))
+    generator.api_key = "test-key"
+    generator.model = model
+    return generator
+
+
+def _quiz(generator: AdvancedQuizGenerator, seed: int = 1, **flags) -> dict:
+    return asyncio.run(generator.generate_quiz(_article(seed), f"Article {seed}", **flags))
+
+
+def test_repeat_generation_is_served_from_the_cache(db):
+    model = FakeGemini(latency=lambda: 0.05)
+    cache = LLMResponseCache(ttl=3600, max_entries=100)
+    generator = _generator(cache, model)
+
+    first = _quiz(generator)
+    again = _quiz(generator)
+    bypassed = _quiz(generator, use_cache=False)
+
+    assert first == again == bypassed and first["source"] == "llm"
+    assert len(model.prompts) == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert stats["llm_seconds_saved"] >= 0.05
+
+
+def test_entries_expire_after_the_ttl(db):
+    model = FakeGemini()
+    generator = _generator(LLMResponseCache(ttl=0.2, max_entries=100), model)
+
+    _quiz(generator)
+    _quiz(generator)
+    time.sleep(0.3)
+    _quiz(generator)
+
+    assert len(model.prompts) == 2
+
+
+def test_least_recently_used_entries_are_evicted(db):
+    model = FakeGemini()
+    generator = _generator(LLMResponseCache(ttl=3600, max_entries=2, prune_every=1), model)
+
+    for seed in (1, 2, 3):
+        _quiz(generator, seed)
+        time.sleep(0.01)
+    assert len(model.prompts) == 3
+
+    # Article 1 was the least recently used when article 3 was stored
+    _quiz(generator, 3)
+    _quiz(generator, 2)
+    assert len(model.prompts) == 3
+    _quiz(generator, 1)
+    assert len(model.prompts) == 4
+
+
+def test_key_includes_prompt_version_and_model(db):
+    model = FakeGemini()
+    generator = _generator(LLMResponseCache(ttl=3600, max_entries=100), model)
+
+    _quiz(generator)
+    generator.PROMPT_VERSION = "smart-test"
+    _quiz(generator)
+    generator.model_name = "other-model"
+    _quiz(generator)
+    del generator.PROMPT_VERSION
+    _quiz(generator)
+    assert len(model.prompts) == 4
+
+    generator.model_name = AdvancedQuizGenerator(None).model_name
+    _quiz(generator)
+    assert len(model.prompts) == 4
+
+    keys = {llm_cache_key("content", "Title", version, model_name)
+            for version in ("v1", "v2") for model_name in ("m1", "m2")}
+    assert len(keys) == 4
+    # Parts are delimited, so shifting text between them changes the key
+    assert llm_cache_key("ab", "c", "v", "m") != llm_cache_key("b", "ca", "v", "m")
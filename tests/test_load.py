@@ -0,0 +1,123 @@
+"""Concurrent quiz requests must overlap instead of serializing on the
+event loop, and the loop must stay responsive while they run."""
+import asyncio
+import random
+import time
+
+import pytest
+
+from fakes import FakeGemini, serve_app
+from pages import sentence
+from utils.circuit_breaker import CircuitBreakers
+from utils.quiz_generator import AdvancedQuizGenerator
+from utils.rate_limiter import UpstreamLimiters
+
+FETCH_LATENCY = 0.2
+LLM_LATENCY = 0.3
+REQUESTS = 8
+
+
+async def _timed_post(client, url):
+    started = time.perf_counter()
+    response = await client.post("/api/generate_quiz", json={"url": url, "mode": "single"})
+    return response, time.perf_counter() - started
+
+
+async def _health_latencies(client, stop: asyncio.Event):
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/health")
+        assert response.status_code == 200
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.02)
+    return latencies
+
+
+def test_concurrent_generations_overlap(db):
+    async def scenario():
+        async with serve_app(FakeGemini(latency=lambda: LLM_LATENCY), FETCH_LATENCY) as client:
+            stop = asyncio.Event()
+            health = asyncio.create_task(_health_latencies(client, stop))
+            started = time.perf_counter()
+            results = await asyncio.gather(*(
+                _timed_post(client, f"https://en.wikipedia.org/wiki/Load_test_{index}") for index in range(REQUESTS)
+            ))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            return results, elapsed, await health
+
+    results, elapsed, health = asyncio.run(scenario())
+
+    assert all(response.status_code == 200 for response, _ in results)
+    assert len({response.json()["id"] for response, _ in results}) == REQUESTS
+    serial = REQUESTS * (FETCH_LATENCY + LLM_LATENCY)
+    print(f"\n{REQUESTS} concurrent requests: {elapsed:.2f}s (serial would be {serial:.1f}s); "
+          f"/health max {max(health) * 1000:.0f}ms over {len(health)} probes")
+    # Overlapping requests finish in about one request's latency, far from the serial sum
+    assert elapsed < serial / 3
+    # Parsing, DB writes and quiz building stay off the loop
+    assert max(health) < 0.25
+
+
+def test_fast_mode_keeps_the_loop_responsive(db):
+    """fast mode runs the CPU-bound offline generator; it must not stall other requests"""
+    async def scenario():
+        async with serve_app(fetch_latency=0.05) as client:
+            stop = asyncio.Event()
+            health = asyncio.create_task(_health_latencies(client, stop))
+            responses = await asyncio.gather(*(
+                client.post("/api/generate_quiz", json={"url": f"https://en.wikipedia.org/wiki/Fast_{index}",
+                                                        "mode": "fast"})
+                for index in range(REQUESTS)
+            ))
+            stop.set()
+            return responses, await health
+
+    responses, health = asyncio.run(scenario())
+    assert all(response.status_code == 200 for response in responses)
+    assert all(len(response.json()["quiz_data"]["questions"]) >= 3 for response in responses)
+    assert max(health) < 0.25
+
+
+class CountingGemini(FakeGemini):
+    """FakeGemini that records how many calls it serves at once"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_content_async(self, prompt, stream: bool = False, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await super().generate_content_async(prompt, stream, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.mark.parametrize("max_concurrency,waves", [(16, 1), (4, 4)])
+def test_generations_scale_with_the_concurrency_limit(max_concurrency, waves):
+    """16 generations take one model latency when the limit allows them all,
+    and one latency per wave of `max_concurrency` when it does not"""
+    model = CountingGemini(latency=lambda: LLM_LATENCY)
+    settings = {"qps": 0, "burst": 1, "max_concurrency": max_concurrency}
+    generator = AdvancedQuizGenerator(limiters=UpstreamLimiters(settings, settings, 30),
+                                      breakers=CircuitBreakers(5, 30))
+    generator.api_key = "test-key"
+    generator.model = model
+    articles = [" ".join(sentence(random.Random(seed * 100 + index)) for index in range(30)) for seed in range(16)]
+
+    async def scenario():
+        started = time.perf_counter()
+        quizzes = await asyncio.gather(*(
+            generator.generate_quiz(article, f"Article {index}") for index, article in enumerate(articles)
+        ))
+        return quizzes, time.perf_counter() - started
+
+    quizzes, elapsed = asyncio.run(scenario())
+    assert all(quiz["source"] == "llm" for quiz in quizzes)
+    assert len(model.prompts) == 16
+    assert model.max_in_flight == max_concurrency
+    assert waves * LLM_LATENCY <= elapsed < (waves + 0.5) * LLM_LATENCY
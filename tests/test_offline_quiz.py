@@ -0,0 +1,111 @@
+"""Offline extractive quizzes: grounded, deterministic, off the event loop"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from fakes import FakeGemini
+from pages import corpus
+from utils.circuit_breaker import CircuitBreakers
+from utils.offline_quiz import BLANK, OfflineQuizGenerator
+from utils.parsers import SoupBackend
+from utils.quiz_generator import AdvancedQuizGenerator
+from utils.rate_limiter import UpstreamLimiters
+
+ARTICLE = (
+    "Marie Curie was a Polish and naturalised French physicist and chemist who conducted pioneering research. "
+    "In 1903, Marie Curie shared the Nobel Prize in Physics with Pierre Curie and Henri Becquerel. "
+    "She founded the Curie Institute in Paris together with the University of Paris and the Pasteur Institute. "
+    "By 1911 she had received the Nobel Prize in Chemistry for the discovery of polonium and radium. "
+    "During World War I she developed mobile radiography units that the French Army used near the front. "
+    "Pierre Curie died in 1906 in Paris after a street accident involving a horse-drawn wagon. "
+    "Her daughter Irène Joliot-Curie received the Nobel Prize in Chemistry with Frédéric Joliot in 1935. "
+    "The Radium Institute in Warsaw opened in 1932 with her sister Bronisława Dłuska as its director."
+)
+
+
+def _articles():
+    backend = SoupBackend("html.parser")
+    return [(name, backend.parse(html)) for name, html in corpus()]
+
+
+def test_sentence_initial_dates_become_year_questions():
+    quiz = OfflineQuizGenerator().generate(ARTICLE, "Marie Curie")
+    year_questions = [question for question in quiz["questions"] if "in which year" in question["question"]]
+    answers = {question["options"][question["correct_answer"]] for question in year_questions}
+
+    assert "1903" in answers
+    statements = [question["question"] for question in year_questions]
+    assert 'According to the article, in which year: "Marie Curie shared the Nobel Prize in Physics ' \
+           'with Pierre Curie and Henri Becquerel"?' in statements
+
+
+def test_questions_are_grounded_and_well_formed():
+    for _, article in _articles():
+        quiz = OfflineQuizGenerator().generate(article["full_content"], article["title"])
+        for question in quiz["questions"]:
+            options = list(question["options"].values())
+            answer = question["options"][question["correct_answer"]]
+            sentence = question["explanation"][len('The article states: "'):-1]
+            assert len(set(options)) == 4
+            assert answer in sentence and sentence in article["full_content"]
+            if BLANK in question["question"]:
+                assert answer not in question["question"]
+
+
+def test_output_is_deterministic():
+    _, article = _articles()[3]
+    first = OfflineQuizGenerator().generate(article["full_content"], article["title"])
+    second = OfflineQuizGenerator().generate(article["full_content"], article["title"])
+    assert first == second and first["questions"]
+
+
+def test_fallback_runs_off_the_event_loop():
+    settings = {"qps": 0, "burst": 1, "max_concurrency": 4}
+    generator = AdvancedQuizGenerator(limiters=UpstreamLimiters(settings, settings, 30),
+                                      breakers=CircuitBreakers(5, 30))
+    generator.api_key = "test-key"
+    generator.model = FakeGemini(latency=lambda: 5.0)
+    generator.timeout = 0.05
+    threads = []
+    original = generator.generate_offline_quiz
+
+    def recording(*args):
+        threads.append(threading.current_thread().name)
+        return original(*args)
+    generator.generate_offline_quiz = recording
+
+    quiz = asyncio.run(generator.generate_quiz(ARTICLE * 2, "Marie Curie", use_cache=False))
+
+    assert quiz["source"] == "offline"
+    assert threads and threads[0].startswith("scrape-worker")
+
+
+@pytest.mark.benchmark
+def test_offline_quiz_benchmark():
+    """Throughput and quality over the page corpus"""
+    generator = OfflineQuizGenerator()
+    articles = _articles()
+    print()
+    totals = {"questions": 0, "year": 0, "cloze": 0, "grounded": 0}
+    for name, article in articles:
+        rounds = 3 if name.startswith("large") else 20
+        started = time.process_time()
+        for _ in range(rounds):
+            quiz = generator.generate(article["full_content"], article["title"])
+        cpu_ms = (time.process_time() - started) * 1000 / rounds
+
+        questions = quiz["questions"]
+        year = sum("in which year" in question["question"] for question in questions)
+        grounded = sum(question["options"][question["correct_answer"]] in article["full_content"]
+                       for question in questions)
+        totals["questions"] += len(questions)
+        totals["year"] += year
+        totals["cloze"] += len(questions) - year
+        totals["grounded"] += grounded
+        difficulties = sorted(question["difficulty"] for question in questions)
+        print(f"{name:11} {len(article['full_content']):6} chars  {cpu_ms:6.2f}ms  {len(questions)} questions "
+              f"({year} year, {len(questions) - year} cloze)  {difficulties}")
+    print(f"total: {totals['questions']} questions over {len(articles)} articles, {totals['year']} year / "
+          f"{totals['cloze']} cloze, {totals['grounded']}/{totals['questions']} answers found in the article")
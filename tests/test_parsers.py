@@ -0,0 +1,98 @@
+"""Every parser backend must extract exactly what html.parser extracts"""
+import time
+
+import pytest
+
+from pages import corpus
+from utils.parsers import LXML_AVAILABLE, SELECTOLAX_AVAILABLE, SoupBackend, get_parser_backend
+
+BACKENDS = [
+    pytest.param("lxml", marks=pytest.mark.skipif(not LXML_AVAILABLE, reason="lxml not installed")),
+    pytest.param("selectolax", marks=pytest.mark.skipif(not SELECTOLAX_AVAILABLE, reason="selectolax not installed")),
+]
+
+_CONTENT = '<div id="mw-content-text"><div class="mw-parser-output">{}</div></div>'
+_TITLE = '<h1 id="firstHeading" class="firstHeading">{}</h1>'
+
+EDGE_CASES = {
+    "no content div": f'<html><body>{_TITLE.format("Lonely")}<p>Outside</p></body></html>',
+    "no title": '<html><body>' + _CONTENT.format('<p>Body</p><h2>Only</h2>') + '</body></html>',
+    "empty document": '',
+    "implied end tags": _TITLE.format("Loose") + _CONTENT.format(
+        '<ul><li><p>First</li><li>Second</ul><p>Third'),
+    "entities and unicode": _TITLE.format("Caf&eacute; &amp; Cr&egrave;me") + _CONTENT.format(
+        '<p>&lt;tag&gt; &quot;q&quot; &#8212; &nbsp;Zürich 日本 &#x1F600;</p>'),
+    "nested tables": _TITLE.format("Tables") + _CONTENT.format(
+        '<table><tr><td><table><tr><td><p>Deep</p></td></tr></table><p>Cell</p></td></tr></table><p>After</p>'),
+    "script, style and comments": _TITLE.format("Noise") + _CONTENT.format(
+        '<script>var p = "<p>not a paragraph</p>";</script><style>p{}</style><!-- <p>gone</p> --><p>Kept</p>'),
+    "two content divs": _TITLE.format("Twice") + _CONTENT.format('<p>One</p>') + _CONTENT.format('<p>Two</p>'),
+    "heading markup": _TITLE.format('<span>Nested</span> <i>title</i>') + _CONTENT.format(
+        '<h2><span class="mw-headline">Early <i>life</i></span></h2><p>x</p><h3>See also</h3><p>y</p>'),
+}
+
+
+# Only HTML5 builders close <p> implicitly at a block element; Wikipedia's
+# parser output never relies on that, so the backends are not expected to agree.
+MALFORMED = '<h1 class="firstHeading">Loose</h1>' + _CONTENT.format('<p>First<p>Second <b>bold<h2>Section</h2><p>Third')
+
+
+def _baseline(html: bytes) -> dict:
+    return SoupBackend("html.parser").parse(html)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("name,html", corpus(), ids=[name for name, _ in corpus()])
+def test_backends_match_on_articles(backend, name, html):
+    assert get_parser_backend(backend).parse(html) == _baseline(html)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("case", EDGE_CASES)
+def test_backends_match_on_edge_cases(backend, case):
+    html = EDGE_CASES[case].encode("utf-8")
+    assert get_parser_backend(backend).parse(html) == _baseline(html)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.xfail(strict=True, reason="html.parser does not apply HTML5 implied end tags")
+def test_backends_differ_on_malformed_markup(backend):
+    assert get_parser_backend(backend).parse(MALFORMED.encode()) == _baseline(MALFORMED.encode())
+
+
+def test_edge_case_baseline():
+    assert _baseline(EDGE_CASES["no content div"].encode())["full_content"] == ""
+    assert _baseline(EDGE_CASES["no title"].encode())["title"] == "Unknown Title"
+    assert _baseline(EDGE_CASES["nested tables"].encode())["full_content"] == "After"
+    assert _baseline(EDGE_CASES["script, style and comments"].encode())["full_content"] == "Kept"
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        get_parser_backend("regex")
+
+
+@pytest.mark.benchmark
+def test_backend_throughput_benchmark():
+    pages = corpus()
+    total = sum(len(html) for _, html in pages)
+    print()
+    for name in ("html.parser", "lxml", "selectolax"):
+        backend = get_parser_backend(name)
+        if backend.name != name:
+            print(f"{name:11} not installed")
+            continue
+        rounds = 5
+        started = time.process_time()
+        for _ in range(rounds):
+            for _, html in pages:
+                backend.parse(html)
+        elapsed = time.process_time() - started
+        per_article = elapsed * 1000 / (rounds * len(pages))
+        typical = [html for page, html in pages if page.startswith("article")][0]
+        started = time.process_time()
+        for _ in range(50):
+            backend.parse(typical)
+        typical_ms = (time.process_time() - started) * 1000 / 50
+        print(f"{name:11} {rounds * total / elapsed / 2 ** 20:6.1f} MB/s  {per_article:6.2f}ms mean per page  "
+              f"{typical_ms:5.2f}ms per 23KB article")
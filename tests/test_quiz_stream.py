@@ -0,0 +1,112 @@
+"""stream_quiz: what the client sees as it streams is what it ends up with"""
+import asyncio
+import json
+import random
+
+import pytest
+
+from fakes import FakeGemini, quiz_json
+from pages import sentence
+from utils.circuit_breaker import CircuitBreakers
+from utils.quiz_generator import AdvancedQuizGenerator
+from utils.rate_limiter import UpstreamLimiters
+
+ARTICLE = " ".join(sentence(random.Random(index)) for index in range(60))
+
+
+def _generator(model=None, timeout: float = 5.0) -> AdvancedQuizGenerator:
+    settings = {"qps": 0, "burst": 1, "max_concurrency": 4}
+    generator = AdvancedQuizGenerator(limiters=UpstreamLimiters(settings, settings, 30),
+                                      breakers=CircuitBreakers(5, 30))
+    if model is not None:
+        generator.api_key = "test-key"
+        generator.model = model
+    generator.timeout = timeout
+    return generator
+
+
+def _collect(generator: AdvancedQuizGenerator, consumer_delay: float = 0.0):
+    async def scenario():
+        events = []
+        async for event in generator.stream_quiz(ARTICLE, "Radioactivity", use_cache=False):
+            events.append(event)
+            if event["event"] == "question" and consumer_delay:
+                await asyncio.sleep(consumer_delay)
+        return events
+    events = asyncio.run(scenario())
+    questions = [event["data"] for event in events if event["event"] == "question"]
+    assert events[-1]["event"] == "quiz"
+    assert [event["event"] for event in events].count("quiz") == 1
+    return events, questions, events[-1]["data"]
+
+
+def test_final_quiz_is_the_streamed_questions():
+    # Some questions lack a difficulty, which validation fills in
+    response = json.loads(quiz_json(count=6))
+    for question in response["questions"][::2]:
+        del question["difficulty"]
+    model = FakeGemini("Here you go:\n```json\n" + json.dumps(response) + "\n```", chunk_size=17)
+
+    events, questions, quiz = _collect(_generator(model))
+
+    assert events[0] == {"event": "prompt_sent"}
+    assert len(questions) == 6
+    assert quiz["questions"] == questions
+    assert [question["difficulty"] for question in quiz["questions"]] == ["medium", "medium", "medium",
+                                                                           "easy", "medium", "hard"]
+    assert quiz["related_topics"] == ["Physics", "Chemistry"]
+
+
+def test_truncated_response_keeps_streamed_questions():
+    text = quiz_json(count=6)
+    model = FakeGemini(text[:int(len(text) * 0.7)], chunk_size=25)
+
+    _, questions, quiz = _collect(_generator(model))
+
+    assert 0 < len(questions) < 6
+    assert quiz["questions"][:len(questions)] == questions
+    assert len(quiz["questions"]) >= 3
+
+
+def test_unparseable_response_falls_back_to_offline_questions():
+    _, questions, quiz = _collect(_generator(FakeGemini("I'd rather not.")))
+
+    assert questions == quiz["questions"]
+    assert len(questions) >= 3
+
+
+def test_slow_consumer_gets_the_whole_quiz():
+    """The timeout covers only each wait for the model: a consumer slower than
+    the timeout gets every question and the breaker records no failure"""
+    model = FakeGemini(quiz_json(count=6), chunk_size=40, chunk_delay=0.01)
+    generator = _generator(model, timeout=0.3)
+
+    _, questions, quiz = _collect(generator, consumer_delay=0.5)
+
+    assert len(questions) == 6 and quiz["questions"] == questions
+    assert quiz["source"] == "llm"
+    assert generator.breaker.stats()["failures"] == 0
+
+
+def test_stalled_model_counts_against_the_breaker():
+    model = FakeGemini(quiz_json(count=6), chunk_size=40, chunk_delay=0.5)
+    generator = _generator(model, timeout=0.2)
+
+    _, questions, quiz = _collect(generator)
+
+    assert questions == quiz["questions"] and quiz["source"] == "offline"
+    assert generator.breaker.stats()["failures"] == 1
+
+
+def test_without_a_model_questions_come_from_the_offline_generator():
+    events, questions, quiz = _collect(_generator())
+
+    assert "prompt_sent" not in [event["event"] for event in events]
+    assert questions == quiz["questions"]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 1000])
+def test_chunking_does_not_change_the_quiz(chunk_size):
+    _, _, quiz = _collect(_generator(FakeGemini(chunk_size=chunk_size)))
+    _, _, reference = _collect(_generator(FakeGemini(chunk_size=40)))
+    assert quiz == reference
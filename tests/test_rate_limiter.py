@@ -0,0 +1,192 @@
+"""Upstream limiter: token rate, concurrency cap, deadlines and Retry-After"""
+import asyncio
+import time
+from email.utils import formatdate
+
+import httpx
+import pytest
+
+from stubs import StubServer, ok
+from utils.circuit_breaker import CircuitBreakers
+from utils.http_client import HTTPClient
+from utils.rate_limiter import RateLimitExceeded, UpstreamLimiter, UpstreamLimiters, parse_retry_after
+
+
+def _limiter(qps: float = 0, burst: int = 1, max_concurrency: int = 10, max_wait: float = 30) -> UpstreamLimiter:
+    return UpstreamLimiter("test", qps, burst, max_concurrency, max_wait)
+
+
+async def _timed(awaitable):
+    started = time.monotonic()
+    try:
+        await awaitable
+    except RateLimitExceeded:
+        return False, time.monotonic() - started
+    return True, time.monotonic() - started
+
+
+def test_burst_then_steady_rate():
+    async def scenario():
+        limiter = _limiter(qps=20, burst=5)
+        started = time.monotonic()
+        for _ in range(25):
+            async with limiter.slot():
+                pass
+        return time.monotonic() - started
+
+    # 5 tokens at once, then one every 50ms
+    assert 0.9 <= asyncio.run(scenario()) <= 1.3
+
+
+def test_concurrent_callers_share_the_rate():
+    async def scenario():
+        limiter = _limiter(qps=50, burst=1)
+        started = time.monotonic()
+        times = []
+
+        async def call():
+            async with limiter.slot():
+                times.append(time.monotonic() - started)
+        await asyncio.gather(*(call() for _ in range(20)))
+        return sorted(times)
+
+    times = asyncio.run(scenario())
+    assert 0.35 <= times[-1] <= 0.6
+    assert all(later - earlier >= 0.015 for earlier, later in zip(times, times[1:]))
+
+
+def test_zero_wait_rejects_at_once_without_spending_a_token():
+    async def scenario():
+        limiter = _limiter(qps=5, burst=1)
+        await limiter.acquire()
+        limiter.release()
+        rejected = await _timed(limiter.acquire(max_wait=0))
+        await asyncio.sleep(0.2)
+        accepted = await _timed(limiter.acquire(max_wait=0))
+        return rejected, accepted, limiter.stats()
+
+    (got_rejected, rejected_after), (got_accepted, accepted_after), stats = asyncio.run(scenario())
+    assert not got_rejected and rejected_after < 0.02
+    assert got_accepted and accepted_after < 0.02
+    assert stats["rejected"] == 1 and stats["acquired"] == 2
+
+
+def test_zero_wait_succeeds_when_capacity_is_free():
+    async def scenario():
+        return await _timed(_limiter(qps=1, burst=1, max_concurrency=1).acquire(max_wait=0))
+    assert asyncio.run(scenario())[0]
+
+
+def test_token_past_the_deadline_is_rejected_immediately():
+    async def scenario():
+        limiter = _limiter(qps=1, burst=1)
+        await limiter.acquire()
+        limiter.release()
+        too_late = await _timed(limiter.acquire(max_wait=0.3))
+        # The rejected caller did not push the next token back
+        in_time = await _timed(limiter.acquire(max_wait=1.2))
+        return too_late, in_time
+
+    (ok_late, late_after), (ok_in_time, in_time_after) = asyncio.run(scenario())
+    assert not ok_late and late_after < 0.02
+    assert ok_in_time and 0.8 <= in_time_after <= 1.1
+
+
+def test_concurrency_cap_and_its_deadline():
+    async def scenario():
+        limiter = _limiter(max_concurrency=2)
+        await limiter.acquire()
+        await limiter.acquire()
+        no_wait = await _timed(limiter.acquire(max_wait=0))
+        short_wait = await _timed(limiter.acquire(max_wait=0.1))
+
+        waiter = asyncio.create_task(_timed(limiter.acquire(max_wait=1)))
+        await asyncio.sleep(0.1)
+        limiter.release()
+        freed = await waiter
+        return no_wait, short_wait, freed, limiter.stats()
+
+    no_wait, short_wait, freed, stats = asyncio.run(scenario())
+    assert not no_wait[0] and no_wait[1] < 0.02
+    assert not short_wait[0] and 0.09 <= short_wait[1] < 0.2
+    assert freed[0] and 0.09 <= freed[1] < 0.2
+    assert stats["in_flight"] == 2 and stats["rejected"] == 2
+
+
+def test_penalty_pauses_new_calls():
+    async def scenario():
+        limiter = _limiter()
+        limiter.penalize(0.3)
+        short = await _timed(limiter.acquire(max_wait=0.1))
+        long = await _timed(limiter.acquire(max_wait=1))
+        return short, long, limiter.stats()
+
+    short, long, stats = asyncio.run(scenario())
+    assert not short[0] and short[1] < 0.02
+    assert long[0] and 0.25 <= long[1] <= 0.45
+    assert stats["throttled"] == 1
+
+
+def test_penalty_reaches_callers_already_waiting_for_a_token():
+    async def scenario():
+        limiter = _limiter(qps=5, burst=1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(_timed(limiter.acquire(max_wait=2)))
+        await asyncio.sleep(0.05)
+        limiter.penalize(0.5)
+        return await waiter
+
+    accepted, waited = asyncio.run(scenario())
+    assert accepted and 0.5 <= waited <= 0.7
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("5", 5.0), ("0.5", 0.5), ("-3", 0.0), (None, None), ("", None), ("soon", None),
+])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    assert 25 <= parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert parse_retry_after(formatdate(time.time() - 30, usegmt=True)) == 0.0
+
+
+def test_limiters_by_upstream():
+    limiters = UpstreamLimiters(
+        wikipedia={"qps": 10, "burst": 20, "max_concurrency": 10},
+        gemini={"qps": 1, "burst": 5, "max_concurrency": 8},
+        max_wait=30,
+        overrides={"de.wikipedia.org": {"qps": 2}}
+    )
+    assert limiters.get("en.wikipedia.org") is limiters.get("en.wikipedia.org")
+    assert (limiters.get("en.wikipedia.org").qps, limiters.get("en.wikipedia.org").burst) == (10, 20)
+    assert (limiters.get("de.wikipedia.org").qps, limiters.get("de.wikipedia.org").burst) == (2, 20)
+    assert (limiters.get("gemini:gemini-pro").qps, limiters.get("gemini:gemini-pro").burst) == (1, 5)
+    assert set(limiters.stats()) == {"en.wikipedia.org", "de.wikipedia.org", "gemini:gemini-pro"}
+
+
+def test_retry_after_from_the_upstream_pauses_the_host():
+    replies = [(429, {"Retry-After": "0.3"}, b"slow down"), ok(b"fine")]
+    seen = []
+
+    async def serve(request):
+        seen.append(time.monotonic())
+        return replies.pop(0)
+
+    async def scenario():
+        settings = {"qps": 0, "burst": 1, "max_concurrency": 10}
+        limiters = UpstreamLimiters(settings, settings, 30)
+        client = HTTPClient(httpx.AsyncClient(), limiters, CircuitBreakers(5, 30),
+                            retries=2, retry_backoff=0.01, max_backoff=5)
+        async with StubServer(serve) as server:
+            try:
+                response = await client.get(f"{server.url}/wiki/Busy")
+            finally:
+                await client.aclose()
+            return response, limiters.get(server.host).stats()
+
+    response, stats = asyncio.run(scenario())
+    assert response.status_code == 200
+    assert seen[1] - seen[0] >= 0.3
+    assert stats["throttled"] == 1
@@ -0,0 +1,301 @@
+"""Circuit breakers, retries and fault injection against stub upstreams"""
+import asyncio
+import random
+import socket
+import time
+
+import httpx
+import pytest
+
+from fakes import FakeGemini
+from pages import article_html, sentence
+from stubs import StubServer, ok
+from utils.circuit_breaker import CircuitBreaker, CircuitBreakers, CircuitOpen
+from utils.html_cache import HTMLCache
+from utils.http_client import HTTPClient
+from utils.quiz_generator import AdvancedQuizGenerator
+from utils.rate_limiter import UpstreamLimiters
+from utils.scraper import WikipediaScraper
+
+_NO_LIMITS = {"qps": 0, "burst": 1, "max_concurrency": 10}
+
+
+def _client(transport=None, timeout: float = 5.0, retries: int = 2, retry_backoff: float = 0.01,
+            max_backoff: float = 5.0, breakers: CircuitBreakers = None) -> HTTPClient:
+    return HTTPClient(httpx.AsyncClient(transport=transport, timeout=timeout),
+                      UpstreamLimiters(_NO_LIMITS, _NO_LIMITS, 30), breakers or CircuitBreakers(5, 30),
+                      retries=retries, retry_backoff=retry_backoff, max_backoff=max_backoff)
+
+
+# Breaker state machine
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()  # a success resets the count
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    assert breaker.stats() == {"state": "open", "opened": 1, "short_circuited": 1, "failures": 5, "successes": 1}
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=0.05)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == "open" and breaker.stats()["opened"] == 2
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+
+
+def test_abandoned_probe_is_replaced():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()  # this probe never reports back
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    time.sleep(0.06)
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+# Fault injection against real sockets
+
+def _refused_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def test_stalled_upstream_costs_a_bounded_time():
+    async def stall(request):
+        await asyncio.sleep(3600)
+
+    async def scenario():
+        async with StubServer(stall) as server:
+            client = _client(timeout=0.2, retries=2, retry_backoff=0.05)
+            started = time.monotonic()
+            try:
+                with pytest.raises(httpx.ReadTimeout):
+                    await client.get(f"{server.url}/wiki/Stuck")
+            finally:
+                await client.aclose()
+            return time.monotonic() - started, server.requests, client.breakers.get(server.host).stats()
+
+    elapsed, requests, stats = asyncio.run(scenario())
+    # 3 attempts x 0.2s timeout + at most 0.05 + 0.1 (x1.5 jitter) of backoff
+    assert requests == 3
+    assert 0.6 <= elapsed < 1.1
+    assert stats["failures"] == 3 and stats["state"] == "closed"
+
+
+def test_flaky_upstream_is_retried():
+    replies = [(500, {}, b"oops"), (502, {}, b"oops"), ok(b"finally")]
+
+    async def flaky(request):
+        return replies.pop(0)
+
+    async def scenario():
+        async with StubServer(flaky) as server:
+            client = _client(retries=2)
+            try:
+                response = await client.get(f"{server.url}/wiki/Flaky")
+            finally:
+                await client.aclose()
+            return response, client.stats(), client.breakers.get(server.host).stats()
+
+    response, stats, breaker = asyncio.run(scenario())
+    assert response.content == b"finally"
+    assert stats["retried"] == 2
+    assert (breaker["failures"], breaker["successes"], breaker["state"]) == (2, 1, "closed")
+
+
+def test_refused_connections_open_the_circuit():
+    url = _refused_url()
+
+    async def scenario():
+        client = _client(retries=0, breakers=CircuitBreakers(3, 30))
+        try:
+            for _ in range(3):
+                with pytest.raises(httpx.ConnectError):
+                    await client.get(f"{url}/wiki/Down")
+            started = time.monotonic()
+            with pytest.raises(CircuitOpen):
+                await client.get(f"{url}/wiki/Down")
+            return time.monotonic() - started, client.breakers.get(url[len("http://"):]).stats()
+        finally:
+            await client.aclose()
+
+    fail_fast, stats = asyncio.run(scenario())
+    assert fail_fast < 0.01
+    assert stats["state"] == "open" and stats["short_circuited"] == 1
+
+
+def test_recovered_upstream_closes_the_circuit():
+    healthy = {"up": False}
+
+    async def serve(request):
+        return ok(b"back") if healthy["up"] else (503, {}, b"down")
+
+    async def scenario():
+        async with StubServer(serve) as server:
+            client = _client(retries=0, breakers=CircuitBreakers(2, 0.1))
+            try:
+                for _ in range(2):
+                    assert (await client.get(f"{server.url}/wiki/P")).status_code == 503
+                with pytest.raises(CircuitOpen):
+                    await client.get(f"{server.url}/wiki/P")
+                healthy["up"] = True
+                await asyncio.sleep(0.12)
+                response = await client.get(f"{server.url}/wiki/P")
+            finally:
+                await client.aclose()
+            return response, client.breakers.get(server.host).stats()
+
+    response, stats = asyncio.run(scenario())
+    assert response.content == b"back"
+    assert stats["state"] == "closed" and stats["opened"] == 1
+
+
+def test_backoff_is_capped_and_every_retry_happens():
+    async def down(request):
+        return 503, {}, b"down"
+
+    async def scenario():
+        async with StubServer(down) as server:
+            # Uncapped, the backoff would be 10s, 20s, 40s
+            client = _client(retries=3, retry_backoff=10, max_backoff=0.05)
+            started = time.monotonic()
+            try:
+                response = await client.get(f"{server.url}/wiki/P")
+            finally:
+                await client.aclose()
+            return response, time.monotonic() - started, server.requests
+
+    response, elapsed, requests = asyncio.run(scenario())
+    assert response.status_code == 503
+    assert requests == 4
+    assert elapsed < 0.5
+
+
+def test_long_retry_after_is_not_waited_for():
+    async def busy(request):
+        return 503, {"Retry-After": "120"}, b"maintenance"
+
+    async def scenario():
+        async with StubServer(busy) as server:
+            client = _client(retries=3, max_backoff=5)
+            try:
+                response = await client.get(f"{server.url}/wiki/P")
+            finally:
+                await client.aclose()
+            return response, server.requests
+
+    response, requests = asyncio.run(scenario())
+    assert response.status_code == 503 and requests == 1
+
+
+# Degraded modes
+
+def test_cached_html_is_served_stale_when_wikipedia_fails(tmp_path):
+    html = article_html(4, title="Stale Article")
+    state = {"fault": None}
+
+    def wikipedia(request):
+        if state["fault"] == "refused":
+            raise httpx.ConnectError("connection refused", request=request)
+        if state["fault"] == "5xx":
+            return httpx.Response(503)
+        return httpx.Response(200, content=html, headers={"ETag": '"v1"'})
+
+    async def scenario():
+        breakers = CircuitBreakers(2, 30)
+        scraper = WikipediaScraper(_client(httpx.MockTransport(wikipedia), retries=0, breakers=breakers),
+                                   html_cache=HTMLCache(str(tmp_path), 10 * 2 ** 20))
+        url = "https://en.wikipedia.org/wiki/Stale_Article"
+        try:
+            fresh = await scraper.scrape_article(url)
+            results = []
+            # Two failures open the circuit, so the third fetch is never attempted
+            for fault in ("refused", "5xx", "refused"):
+                state["fault"] = fault
+                results.append(await scraper.scrape_article(url))
+            return fresh, results, breakers.get("en.wikipedia.org").stats()
+        finally:
+            await scraper.http_client.aclose()
+
+    fresh, stale, stats = asyncio.run(scenario())
+    assert all(article == fresh for article in stale)
+    assert stats["state"] == "open" and stats["short_circuited"] == 1
+
+
+def test_uncached_article_still_fails_when_wikipedia_is_down(tmp_path):
+    def refused(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    async def scenario():
+        scraper = WikipediaScraper(_client(httpx.MockTransport(refused), retries=0),
+                                   html_cache=HTMLCache(str(tmp_path), 10 * 2 ** 20))
+        try:
+            await scraper.scrape_article("https://en.wikipedia.org/wiki/Never_Fetched")
+        finally:
+            await scraper.http_client.aclose()
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(scenario())
+
+
+def test_gemini_breaker_falls_back_to_offline_quizzes():
+    article = " ".join(sentence(random.Random(index)) for index in range(60))
+    model = FakeGemini(latency=lambda: 5.0)
+
+    async def scenario():
+        generator = AdvancedQuizGenerator(limiters=UpstreamLimiters(_NO_LIMITS, _NO_LIMITS, 30),
+                                          breakers=CircuitBreakers(2, 30))
+        generator.api_key = "test-key"
+        generator.model = model
+        generator.timeout = 0.05
+        timings = []
+        for _ in range(4):
+            started = time.monotonic()
+            quiz = await generator.generate_quiz(article, "Radioactivity", use_cache=False)
+            timings.append(time.monotonic() - started)
+            assert len(quiz["questions"]) >= 3
+        return timings, generator.breaker.stats()
+
+    timings, stats = asyncio.run(scenario())
+    # Two timeouts open the circuit; after that Gemini is not called at all
+    assert len(model.prompts) == 2 and model.cancelled == 2
+    assert stats["state"] == "open" and stats["short_circuited"] == 2
+    assert max(timings[2:]) < 0.05
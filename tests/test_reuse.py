@@ -0,0 +1,94 @@
+"""Quiz reuse: stored quizzes are served again only when the model wrote them"""
+import asyncio
+import statistics
+import time
+
+import pytest
+
+import main
+from fakes import FakeGemini, serve_app
+
+URL = "https://en.wikipedia.org/wiki/Marie_Curie"
+
+
+async def _generate(client, url: str = URL, **flags) -> dict:
+    response = await client.post("/api/generate_quiz", json={"url": url, "mode": "single", **flags})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_fresh_quiz_is_reused_and_force_flags_regenerate(db):
+    model = FakeGemini()
+
+    async def scenario():
+        async with serve_app(model) as client:
+            first = await _generate(client)
+            reused = await _generate(client, "http://en.m.wikipedia.org/wiki/Marie_Curie#Life")
+            # New quiz row, same LLM output from the response cache
+            forced = await _generate(client, force_regenerate=True)
+            prompts_after_forced = len(model.prompts)
+            # New quiz row and a new model call
+            bypassed = await _generate(client, force_regenerate=True, bypass_llm_cache=True)
+            return first, reused, forced, prompts_after_forced, bypassed
+
+    first, reused, forced, prompts_after_forced, bypassed = asyncio.run(scenario())
+    assert first["quiz_data"]["source"] == "llm"
+    assert reused["id"] == first["id"]
+    assert forced["id"] != first["id"] and prompts_after_forced == 1
+    assert bypassed["id"] not in (first["id"], forced["id"]) and len(model.prompts) == 2
+
+
+@pytest.mark.parametrize("reuse_ttl", [86400, 0], ids=["fresh-quiz reuse", "same-revision reuse"])
+def test_offline_fallback_is_not_reused_after_gemini_recovers(db, monkeypatch, reuse_ttl):
+    monkeypatch.setattr(main.config, "QUIZ_REUSE_TTL", reuse_ttl)
+    latency = {"seconds": 5.0}
+    model = FakeGemini(latency=lambda: latency["seconds"])
+
+    async def scenario():
+        async with serve_app(model) as client:
+            main.app.state.quiz_generator.timeout = 0.1
+            during_outage = await _generate(client)
+            latency["seconds"] = 0.0
+            recovered = await _generate(client)
+            again = await _generate(client)
+            return during_outage, recovered, again
+
+    during_outage, recovered, again = asyncio.run(scenario())
+    assert during_outage["quiz_data"]["source"] == "offline"
+    assert recovered["id"] != during_outage["id"]
+    assert recovered["quiz_data"]["source"] == "llm"
+    assert again["id"] == recovered["id"]
+    assert len(model.prompts) == 2
+
+
+def test_fast_mode_quizzes_are_not_reused(db):
+    async def scenario():
+        async with serve_app(FakeGemini()) as client:
+            fast = await client.post("/api/generate_quiz", json={"url": URL, "mode": "fast"})
+            single = await _generate(client)
+            return fast.json(), single
+
+    fast, single = asyncio.run(scenario())
+    assert fast["quiz_data"]["source"] == "offline"
+    assert single["id"] != fast["id"] and single["quiz_data"]["source"] == "llm"
+
+
+@pytest.mark.benchmark
+def test_reuse_latency_benchmark(db):
+    """Serving a stored quiz must stay far below a generation (target: p50 < 10ms)"""
+    async def scenario():
+        async with serve_app(FakeGemini(latency=lambda: 0.5), fetch_latency=0.2) as client:
+            started = time.perf_counter()
+            await _generate(client)
+            generation = time.perf_counter() - started
+            samples = []
+            for _ in range(200):
+                started = time.perf_counter()
+                await _generate(client)
+                samples.append(time.perf_counter() - started)
+            return generation, sorted(samples)
+
+    generation, samples = asyncio.run(scenario())
+    p50, p99 = statistics.median(samples) * 1000, samples[int(len(samples) * 0.99) - 1] * 1000
+    print(f"\ngeneration {generation * 1000:.0f}ms; reuse p50 {p50:.2f}ms p99 {p99:.2f}ms")
+    assert p50 < 10
@@ -0,0 +1,134 @@
+"""API mode against a stub MediaWiki Action API: same article dict as HTML mode"""
+import asyncio
+import json
+from html import escape
+
+import httpx
+import pytest
+
+from stubs import StubServer, ok
+from utils.circuit_breaker import CircuitBreakers
+from utils.http_client import HTTPClient
+from utils.rate_limiter import UpstreamLimiters
+from utils.scraper import WikipediaScraper
+
+TITLE = "What Is Life?"
+REVISION = 4242
+LEAD = ["What Is Life? is a 1944 book by Erwin Schrödinger.", "It draws on lectures given in Dublin."]
+SECTIONS = [
+    ("Background", 2, ["Schrödinger lectured at Trinity College & the Institute.", "The talks drew 400 people."]),
+    ("Reception", 3, ["Crick & Watson cited it; 100% of reviewers did not."]),
+    ("Legacy", 2, ["It shaped molecular biology."]),
+]
+
+
+def _extract() -> str:
+    lines = LEAD[:]
+    for heading, level, paragraphs in SECTIONS:
+        marks = "=" * level
+        lines += ["", f"{marks} {heading} {marks}"] + paragraphs
+    lines += ["", "== See also ==", "Molecular biology", "", "== References =="]
+    return "\n".join(lines)
+
+
+def _html() -> bytes:
+    def paragraph(text: str) -> str:
+        return f"<p>{escape(text)}<sup class=\"reference\">[1]</sup></p>"
+
+    body = "".join(paragraph(text) for text in LEAD)
+    for heading, level, paragraphs in SECTIONS:
+        body += f"<h{level}>{heading}</h{level}>" + "".join(paragraph(text) for text in paragraphs)
+    body += "<h2>See also</h2><ul><li>Molecular biology</li></ul><h2>References</h2>"
+    page_name = json.dumps(TITLE.replace(" ", "_"))
+    return (f'<script>RLCONF={{"wgPageName":{page_name},"wgRevisionId":{REVISION}}};</script>'
+            f'<h1 class="firstHeading">{TITLE}</h1><div id="mw-content-text">{body}</div>').encode("utf-8")
+
+
+def _http_client(transport=None) -> HTTPClient:
+    settings = {"qps": 0, "burst": 1, "max_concurrency": 10}
+    return HTTPClient(httpx.AsyncClient(transport=transport), UpstreamLimiters(settings, settings, 30),
+                      CircuitBreakers(5, 30), retries=0, retry_backoff=0, max_backoff=0)
+
+
+class StubMediaWiki:
+    """Answers action=query for the titles it knows, following redirects"""
+
+    def __init__(self, pages: dict, redirects: dict = None):
+        self.pages = pages
+        self.redirects = redirects or {}
+        self.queries = []
+
+    async def __call__(self, request):
+        self.queries.append(request.query)
+        if request.path != "/w/api.php" or request.query.get("action") != "query":
+            return 400, {}, b"bad request"
+        requested = request.query["titles"].replace("_", " ")
+        title = self.redirects.get(requested, requested)
+        if title in self.pages:
+            page = {"title": title, "extract": self.pages[title], "revisions": [{"revid": REVISION}]}
+        else:
+            page = {"title": title, "missing": True}
+        return ok(json.dumps({"query": {"pages": [page]}}).encode(), {"Content-Type": "application/json"})
+
+
+def _scrape_api(url: str, wiki: StubMediaWiki) -> dict:
+    async def scenario():
+        async with StubServer(wiki) as server:
+            scraper = WikipediaScraper(_http_client(), mode="api", api_url=f"{server.url}/w/api.php")
+            try:
+                return await scraper.scrape_article(url)
+            finally:
+                await scraper.http_client.aclose()
+    return asyncio.run(scenario())
+
+
+def _scrape_html(url: str) -> dict:
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=_html()))
+
+    async def scenario():
+        scraper = WikipediaScraper(_http_client(transport), mode="html")
+        try:
+            return await scraper.scrape_article(url)
+        finally:
+            await scraper.http_client.aclose()
+    return asyncio.run(scenario())
+
+
+def test_api_mode_matches_html_mode():
+    url = "https://en.wikipedia.org/wiki/What_Is_Life%3F"
+    via_api = _scrape_api(url, StubMediaWiki({TITLE: _extract()}))
+    via_html = _scrape_html(url)
+
+    assert via_api == via_html
+    assert via_api["canonical_url"] == url
+    assert via_api["revision_id"] == REVISION
+    assert via_api["sections"] == ["Background", "Reception", "Legacy"]
+    assert [chunk["heading"] for chunk in via_api["section_texts"]] == ["Introduction", "Background", "Legacy"]
+
+
+@pytest.mark.parametrize("url,title", [
+    ("https://en.wikipedia.org/wiki/What_Is_Life%3F", "What_Is_Life?"),
+    ("https://en.wikipedia.org/w/index.php?title=What_Is_Life%3F", "What_Is_Life?"),
+    ("https://en.m.wikipedia.org/wiki/AT%26T", "AT&T"),
+    ("https://en.wikipedia.org/wiki/100%25_Pure", "100%_Pure"),
+    ("https://en.wikipedia.org/wiki/C++", "C++"),
+])
+def test_reserved_characters_reach_the_api_intact(url, title):
+    wiki = StubMediaWiki({title.replace("_", " "): _extract()})
+    article = _scrape_api(url, wiki)
+
+    assert wiki.queries[0]["titles"] == title
+    assert article["title"] == title.replace("_", " ")
+
+
+def test_api_redirects_set_the_canonical_url():
+    wiki = StubMediaWiki({TITLE: _extract()}, redirects={"Schrodinger book": TITLE})
+    article = _scrape_api("https://en.wikipedia.org/wiki/Schrodinger_book", wiki)
+
+    assert wiki.queries[0]["redirects"] == "1"
+    assert article["canonical_url"] == "https://en.wikipedia.org/wiki/What_Is_Life%3F"
+
+
+def test_missing_article_is_an_error():
+    with pytest.raises(ValueError, match="not found"):
+        _scrape_api("https://en.wikipedia.org/wiki/Nope", StubMediaWiki({}))
@@ -0,0 +1,127 @@
+"""Section-parallel generation: merge, dedupe and difficulty balance, and
+quiz modes kept apart"""
+import asyncio
+import json
+
+from fakes import FakeGemini, serve_app
+from pages import article_html
+from utils.circuit_breaker import CircuitBreakers
+from utils.parsers import SoupBackend
+from utils.quiz_generator import AdvancedQuizGenerator
+from utils.rate_limiter import UpstreamLimiters
+
+
+def _generator(model=None) -> AdvancedQuizGenerator:
+    settings = {"qps": 0, "burst": 1, "max_concurrency": 8}
+    generator = AdvancedQuizGenerator(limiters=UpstreamLimiters(settings, settings, 30),
+                                      breakers=CircuitBreakers(5, 30))
+    if model is not None:
+        generator.api_key = "test-key"
+        generator.model = model
+    return generator
+
+
+def _question(text: str, answer: str, difficulty: str = "medium") -> dict:
+    return {"question": text, "options": {"A": answer, "B": "Other one", "C": "Other two", "D": "Other three"},
+            "correct_answer": "A", "difficulty": difficulty}
+
+
+def _texts(questions):
+    return [question["question"] for question in questions]
+
+
+def test_near_duplicates_across_sections_are_dropped():
+    per_section = [
+        [_question("Which prize did Marie Curie receive for physics research in 1903?", "Nobel Prize"),
+         _question("Where was the radium institute founded by Marie Curie located?", "Paris")],
+        [_question("Which prize did Marie Curie receive for her physics research in 1903?", "Nobel Prize"),
+         _question("Which element did Pierre and Marie Curie isolate after polonium?", "Radium")],
+    ]
+    merged = _generator()._merge_section_questions(per_section, limit=10)
+
+    assert _texts(merged) == [
+        "Which prize did Marie Curie receive for physics research in 1903?",
+        "Where was the radium institute founded by Marie Curie located?",
+        "Which element did Pierre and Marie Curie isolate after polonium?",
+    ]
+
+
+def test_same_answer_lowers_the_duplicate_threshold():
+    generator = _generator()
+    first = _question("Which prize did Marie Curie receive for physics in 1903?", "Nobel Prize")
+    reworded = _question("Marie Curie was awarded which prize in 1903?", "Nobel Prize")
+    other_answer = _question("Marie Curie was awarded which prize in 1911?", "Nobel Prize in Chemistry")
+
+    assert len(generator._merge_section_questions([[first], [reworded]], limit=10)) == 1
+    assert len(generator._merge_section_questions([[first], [other_answer]], limit=10)) == 2
+
+
+def test_sections_take_turns_so_none_loses_everything():
+    later_duplicate = _question("Which institute in Warsaw studied radioactivity after 1932?", "Radium Institute")
+    per_section = [
+        [_question("Who discovered polonium together with Marie Curie in Paris?", "Pierre Curie"), later_duplicate],
+        [_question("Which institute in Warsaw studied radioactivity after the year 1932?", "Radium Institute")],
+    ]
+    merged = _generator()._merge_section_questions(per_section, limit=10)
+
+    assert _texts(merged) == [
+        "Who discovered polonium together with Marie Curie in Paris?",
+        "Which institute in Warsaw studied radioactivity after the year 1932?",
+    ]
+
+
+def test_difficulties_are_balanced_within_the_limit_in_article_order():
+    topics = ["polonium", "radium", "uranium", "thorium", "actinium", "radon", "helium", "xenon", "argon"]
+    difficulties = ["easy"] * 6 + ["hard"] * 3
+    per_section = [
+        [_question(f"Which laboratory first measured {topic} samples in section {index}?", topic, difficulty)
+         for topic, difficulty in zip(topics[index::3], difficulties[index::3])]
+        for index in range(3)
+    ]
+    merged = _generator()._merge_section_questions(per_section, limit=4)
+
+    assert sorted(question["difficulty"] for question in merged) == ["easy", "easy", "hard", "hard"]
+    positions = [(section_index, position)
+                 for question in merged
+                 for section_index, questions in enumerate(per_section)
+                 for position, candidate in enumerate(questions) if candidate is question]
+    assert positions == sorted(positions)
+
+
+def test_sectioned_quiz_calls_the_model_once_per_section():
+    article = SoupBackend("html.parser").parse(article_html(3))
+    topics = ["polonium", "radium", "uranium", "thorium", "actinium", "radon"]
+    response = {"questions": [_question(f"Which laboratory first isolated {topic} samples?", topic.title())
+                              for topic in topics]}
+    # The same questions for every section: only the first section's copies survive the merge
+    model = FakeGemini(json.dumps(response))
+    generator = _generator(model)
+
+    quiz = asyncio.run(generator.generate_sectioned_quiz(article, use_cache=False))
+
+    sections = generator._select_sections(article["section_texts"])
+    assert len(model.prompts) == len(sections) >= 2
+    assert len(quiz["questions"]) == 6
+    assert len(set(_texts(quiz["questions"]))) == 6
+    assert all(question["section"] for question in quiz["questions"])
+    assert quiz["source"] == "llm"
+
+
+def test_each_mode_has_its_own_quiz(db):
+    model = FakeGemini()
+    url = "https://en.wikipedia.org/wiki/Henri_Becquerel"
+
+    async def scenario():
+        async with serve_app(model) as client:
+            ids = {}
+            for mode in ("fast", "single", "sections", "single", "sections"):
+                response = await client.post("/api/generate_quiz", json={"url": url, "mode": mode})
+                assert response.status_code == 200, response.text
+                ids.setdefault(mode, set()).add(response.json()["id"])
+            return ids
+
+    ids = asyncio.run(scenario())
+    assert len(ids["single"]) == 1 and len(ids["sections"]) == 1
+    assert len(ids["fast"] | ids["single"] | ids["sections"]) == 3
+    # One call for the single quiz, one per section for the sectioned one; the repeats are reused
+    assert len(model.prompts) > 2
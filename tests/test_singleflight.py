@@ -0,0 +1,103 @@
+"""Single-flight generation: one producer per article, in and across processes"""
+import asyncio
+
+import pytest
+
+from utils.singleflight import RequestCoalescer
+
+
+class Quiz:
+    def __init__(self, quiz_id: int):
+        self.id = quiz_id
+
+
+def _coalescer(lease_ttl: float = 5.0) -> RequestCoalescer:
+    async def load(quiz_id):
+        return Quiz(quiz_id)
+    return RequestCoalescer(load, lease_ttl=lease_ttl, completed_grace=5.0, poll_interval=0.02)
+
+
+def _producer(calls: list, name: str, quiz_id: int, seconds: float = 0.1):
+    async def produce():
+        calls.append(name)
+        await asyncio.sleep(seconds)
+        return Quiz(quiz_id)
+    return produce
+
+
+def test_concurrent_callers_share_one_generation(db):
+    async def scenario():
+        coalescer = _coalescer()
+        calls = []
+        results = await asyncio.gather(*(coalescer.run("en/Alan_Turing", _producer(calls, f"c{index}", index))
+                                          for index in range(10)))
+        return calls, results, coalescer.stats()
+
+    calls, results, stats = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert {result.id for result in results} == {int(calls[0][1:])}
+    assert stats["leaders"] == 1 and stats["local_followers"] == 9
+
+
+def test_other_processes_wait_for_the_lease_holder(db):
+    async def scenario():
+        first, second = _coalescer(), _coalescer()
+        calls = []
+        leader = asyncio.create_task(first.run("en/Radium", _producer(calls, "first", 1, 0.2)))
+        await asyncio.sleep(0.05)
+        follower = await second.run("en/Radium", _producer(calls, "second", 2))
+        # Finished recently: reused unless regeneration is forced
+        reused = await second.run("en/Radium", _producer(calls, "third", 3))
+        forced = await second.run("en/Radium", _producer(calls, "forced", 4), reuse_completed=False)
+        return calls, (await leader).id, follower.id, reused.id, forced.id, second.stats()
+
+    calls, leader, follower, reused, forced, stats = asyncio.run(scenario())
+    assert calls == ["first", "forced"]
+    assert (leader, follower, reused, forced) == (1, 1, 1, 4)
+    assert stats["lease_followers"] == 2
+
+
+def test_lease_is_renewed_while_generation_runs_past_its_ttl(db):
+    async def scenario():
+        first, second = _coalescer(lease_ttl=0.3), _coalescer(lease_ttl=0.3)
+        calls = []
+        leader = asyncio.create_task(first.run("en/Polonium", _producer(calls, "first", 1, 1.0)))
+        await asyncio.sleep(0.05)
+        follower = await second.run("en/Polonium", _producer(calls, "second", 2))
+        return calls, (await leader).id, follower.id
+
+    calls, leader, follower = asyncio.run(scenario())
+    assert calls == ["first"]
+    assert leader == follower == 1
+
+
+def test_failed_generation_releases_the_lease(db):
+    async def scenario():
+        first, second = _coalescer(), _coalescer()
+
+        async def broken():
+            await asyncio.sleep(0.05)
+            raise RuntimeError("Gemini down")
+
+        with pytest.raises(RuntimeError):
+            await first.run("en/Radon", broken)
+        calls = []
+        return calls, (await second.run("en/Radon", _producer(calls, "second", 2))).id
+
+    calls, result = asyncio.run(scenario())
+    assert calls == ["second"] and result == 2
+
+
+def test_unreusable_result_is_not_left_in_the_lease(db):
+    async def load(quiz_id):
+        return Quiz(quiz_id)
+
+    async def scenario():
+        first, second = (RequestCoalescer(load, lease_ttl=5.0, completed_grace=5.0, poll_interval=0.02,
+                                          reusable=lambda quiz: quiz.id != 1) for _ in range(2))
+        calls = []
+        fallback = await first.run("en/Xenon", _producer(calls, "first", 1, 0.01))
+        retried = await second.run("en/Xenon", _producer(calls, "second", 2, 0.01))
+        return calls, fallback.id, retried.id
+
+    assert asyncio.run(scenario()) == (["first", "second"], 1, 2)
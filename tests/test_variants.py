@@ -0,0 +1,95 @@
+"""Quiz variants: seeded, reproducible, and the answer moves with its option"""
+import asyncio
+import copy
+
+from fakes import FakeGemini, serve_app
+from utils.variants import LETTERS, make_variant, shuffle_options
+
+
+def _question(index: int) -> dict:
+    return {
+        "question": f"Question {index}: which element did the Curies discover in 189{index}?",
+        "options": {letter: f"Option {letter} of {index}" for letter in LETTERS},
+        "correct_answer": LETTERS[index % 4],
+        "difficulty": "medium"
+    }
+
+
+QUIZ = {"questions": [_question(index) for index in range(10)], "related_topics": ["Radium"]}
+
+
+def _answer(question: dict) -> str:
+    return question["options"][question["correct_answer"]]
+
+
+def test_answer_follows_the_correct_option():
+    moved = 0
+    for index in range(40):
+        question = _question(index)
+        expected = _answer(question)
+        shuffled = shuffle_options(copy.deepcopy(question), salt=str(index))
+
+        assert _answer(shuffled) == expected
+        assert sorted(shuffled["options"].values()) == sorted(question["options"].values())
+        moved += shuffled["correct_answer"] != question["correct_answer"]
+    # Not a fixed permutation: most answers land on another letter
+    assert moved > 20
+
+
+def test_shuffle_is_idempotent_and_ignores_incoming_order():
+    question = _question(1)
+    once = shuffle_options(copy.deepcopy(question), "salt")
+    twice = shuffle_options(copy.deepcopy(once), "salt")
+    reordered = copy.deepcopy(question)
+    reordered["options"] = dict(zip(LETTERS, reversed(list(question["options"].values()))))
+    reordered["correct_answer"] = LETTERS[3 - LETTERS.index(question["correct_answer"])]
+
+    assert once == twice == shuffle_options(reordered, "salt")
+
+
+def test_malformed_questions_are_left_alone():
+    three_options = {"question": "Q", "options": {"A": "1", "B": "2", "C": "3"}, "correct_answer": "A"}
+    bad_answer = {"question": "Q", "options": {letter: letter for letter in LETTERS}, "correct_answer": "E"}
+
+    assert shuffle_options(copy.deepcopy(three_options)) == three_options
+    assert shuffle_options(copy.deepcopy(bad_answer)) == bad_answer
+
+
+def test_same_seed_gives_the_same_variant():
+    stored = copy.deepcopy(QUIZ)
+    first = make_variant(stored, quiz_id=7, variant=2, size=5)
+
+    assert first == make_variant(stored, quiz_id=7, variant=2, size=5)
+    assert stored == QUIZ
+    assert first["variant"] == 2 and first["related_topics"] == ["Radium"]
+    assert len(first["questions"]) == 5
+
+    originals = {question["question"]: _answer(question) for question in QUIZ["questions"]}
+    assert all(_answer(question) == originals[question["question"]] for question in first["questions"])
+
+    others = [make_variant(stored, quiz_id=7, variant=variant, size=5) for variant in range(3, 8)]
+    assert all(other["questions"] != first["questions"] for other in others)
+    assert make_variant(stored, quiz_id=8, variant=2, size=5)["questions"] != first["questions"]
+
+
+def test_full_variant_is_a_reordering():
+    variant = make_variant(QUIZ, quiz_id=1, variant=0)
+    assert sorted(question["question"] for question in variant["questions"]) == \
+           sorted(question["question"] for question in QUIZ["questions"])
+    assert make_variant(QUIZ, quiz_id=1, variant=0, size=50)["questions"] == variant["questions"]
+
+
+def test_variant_endpoint_is_stable(db):
+    async def scenario():
+        async with serve_app(FakeGemini()) as client:
+            quiz = (await client.post("/api/generate_quiz", json={
+                "url": "https://en.wikipedia.org/wiki/Marie_Curie", "mode": "single"
+            })).json()
+            responses = [await client.get(f"/api/quiz/{quiz['id']}", params={"variant": 3, "questions": 3})
+                         for _ in range(2)]
+            return quiz, [response.json()["quiz_data"] for response in responses]
+
+    quiz, (first, second) = asyncio.run(scenario())
+    assert first == second and len(first["questions"]) == 3
+    stored = {question["question"]: _answer(question) for question in quiz["quiz_data"]["questions"]}
+    assert all(_answer(question) == stored[question["question"]] for question in first["questions"])